@@ -0,0 +1,52 @@
+"""
+Project-wide sweep of duplicate auto-generated Jira Tests.
+
+Pages through every parent issue of the project, groups linked Tests by
+signature (also across parents) and writes a report to dedupe_sweep_report.json.
+Nothing is deleted unless --apply is passed.
+"""
+import argparse
+import json
+import os
+import sys
+import logging
+
+from dotenv import load_dotenv
+
+load_dotenv()
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), 'src')))
+
+from core import dedupe as D
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+log = logging.getLogger("dedupe_sweep")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find (and optionally delete) duplicate Tests across a Jira project")
+    parser.add_argument("--project", required=True, help="Jira project key (e.g., ALL)")
+    parser.add_argument("--prefer", choices=["newest", "oldest"], default="newest", help="Which Test to keep per group")
+    parser.add_argument("--per-parent", action="store_true", help="Only group duplicates within the same parent")
+    parser.add_argument("--jql", help="Custom JQL to select parent issues")
+    parser.add_argument("--workers", type=int, default=5, help="Concurrent deletions")
+    parser.add_argument("--apply", action="store_true", help="Delete the duplicates (default: dry run)")
+    args = parser.parse_args()
+
+    report = D.sweep_project(
+        args.project, prefer=args.prefer, dry_run=not args.apply,
+        cross_parent=not args.per_parent, parent_jql=args.jql, max_workers=args.workers,
+    )
+    with open("dedupe_sweep_report.json", "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    log.info(f"{len(report['duplicate_groups'])} duplicate groups, {report['to_delete']} Tests to delete "
+             f"-> dedupe_sweep_report.json")
+    if args.apply:
+        log.info(f"{len(report['relinked'])} links moved to kept Tests, {len(report['deleted'])} deleted, "
+                 f"{len(report['skipped'])} groups skipped (re-link failed)")
+    if not args.apply and report["to_delete"]:
+        log.info("Dry run: re-run with --apply to delete them.")
+
+
+if __name__ == "__main__":
+    main()
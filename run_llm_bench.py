@@ -0,0 +1,137 @@
+"""
+Throughput benchmark of the scenario-generation pipeline without a network.
+
+--pipeline picks what is timed over N synthetic issues:
+  - llm      only the generation step (generate_scenarios_batch), the default.
+  - jira     fetch -> generate -> create end to end: jira_generate_tests with
+             Jira served by core.stub_transport (issue, comments, linked Tests,
+             bulk create, links).
+  - clickup  the same for clickup_generate_tests (task read, streamed creates).
+
+The LLM backend is the configured one (default: the deterministic stub from
+core.providers); --transport-latency-ms adds latency to each Jira/ClickUp call.
+Use --provider replay with recordings from LLM_PROVIDER=record runs to
+benchmark with real payloads. The response cache and the Jira mirror are
+disabled and usage is kept in memory, so a benchmark never pollutes cache/ or
+the usage log.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+load_dotenv()
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), 'src')))
+
+from core import gemini as GM
+from core import llm as L
+from core import llm_cache as LC
+from core import mirror as MR
+from core import providers as P
+from core import stub_transport as ST
+from core import usage as U
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))] if ordered else 0
+
+
+async def _run(jobs, concurrency):
+    total = 0
+    start = time.monotonic()
+    async for res in L.generate_scenarios_batch(jobs, concurrency=concurrency):
+        total += len(res["scenarios"])
+    return time.monotonic() - start, total
+
+
+class _Tools:
+    """Collects the @mcp.tool() functions registered by jt.register_tools."""
+
+    def tool(self):
+        def register(fn):
+            setattr(self, fn.__name__, fn)
+            return fn
+        return register
+
+
+def _run_pipeline(pipeline, n_issues, concurrency, max_tests, transport):
+    import jt
+    tools = _Tools()
+    jt.register_tools(tools)
+    if pipeline == "jira":
+        ST.install_jira(transport)
+        run_one = lambda i: tools.jira_generate_tests(f"BENCH-{i}", target_project_key="BENCH", max_tests=max_tests, use_cache=False)
+        created = lambda res: len(res.get("report", {}).get("created", []))
+    else:
+        ST.install_clickup(transport)
+        run_one = lambda i: tools.clickup_generate_tests(f"bench{i}", list_id="bench-list", max_tests=max_tests, use_cache=False)
+        created = lambda res: len(res.get("created_tasks", []))
+
+    latencies, total = [], 0
+
+    def timed(i):
+        start = time.monotonic()
+        res = run_one(i)
+        return time.monotonic() - start, res
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        for elapsed, res in pool.map(timed, range(1, n_issues + 1)):
+            latencies.append(int(elapsed * 1000))
+            total += created(res) if res.get("ok") else 0
+    return time.monotonic() - start, total, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LLM scenario generation offline")
+    parser.add_argument("--provider", default=os.getenv("LLM_PROVIDER", "stub"), help="stub | replay | local | google")
+    parser.add_argument("--issues", type=int, default=50, help="Synthetic issues to generate for")
+    parser.add_argument("--concurrency", type=int, default=L.LLM_CONCURRENCY, help="Calls in flight")
+    parser.add_argument("--latency-ms", type=float, help="Stub/replay latency per call")
+    parser.add_argument("--jitter-ms", type=float, help="Stub/replay latency jitter")
+    parser.add_argument("--context-chars", type=int, default=4000, help="Size of each synthetic ticket")
+    parser.add_argument("--pipeline", choices=("llm", "jira", "clickup"), default="llm",
+                        help="llm = generation only; jira/clickup = fetch -> generate -> create against a stub transport")
+    parser.add_argument("--transport-latency-ms", type=float, default=0, help="Stub Jira/ClickUp latency per request")
+    parser.add_argument("--max-tests", type=int, default=20, help="Scenarios per issue in the jira/clickup pipelines")
+    args = parser.parse_args()
+
+    os.environ["LLM_PROVIDER"] = args.provider
+    if args.latency_ms is not None: P.STUB_LATENCY_MS = args.latency_ms
+    if args.jitter_ms is not None: P.STUB_JITTER_MS = args.jitter_ms
+    GM.reset_client()
+    LC.ENABLED = False
+    MR.MIRROR_ENABLED = False
+    U._STORE = U.UsageStore(":memory:")
+
+    if args.pipeline != "llm":
+        stub = (ST.StubJira if args.pipeline == "jira" else ST.StubClickUp)(
+            latency_ms=args.transport_latency_ms, context_chars=args.context_chars)
+        wall, created, per_issue = _run_pipeline(args.pipeline, args.issues, args.concurrency, args.max_tests, stub)
+        print(f"pipeline={args.pipeline} provider={GM.provider_name()} issues={args.issues} concurrency={args.concurrency}")
+        print(f"wall={wall:.2f}s  throughput={args.issues / wall:.1f} issues/s  created={created}  transport_calls={stub.calls}")
+        print(f"issue latency p50={_percentile(per_issue, 50)}ms p95={_percentile(per_issue, 95)}ms max={max(per_issue, default=0)}ms")
+        return
+
+    filler = "The user opens the screen, fills the form and submits it. " * (args.context_chars // 60 + 1)
+    jobs = [{
+        "issue_key": f"BENCH-{i}", "summary": f"Benchmark story {i}",
+        "full_context": f"DESCRIPTION:\n{filler[:args.context_chars]}\nStory {i}", "use_cache": False,
+    } for i in range(1, args.issues + 1)]
+
+    wall, scenarios = asyncio.run(_run(jobs, args.concurrency))
+    calls = U._STORE._conn.execute("SELECT latency_ms FROM llm_calls WHERE status = 'ok'").fetchall()
+    lat = [r[0] for r in calls]
+    print(f"provider={GM.provider_name()} issues={args.issues} concurrency={args.concurrency}")
+    print(f"wall={wall:.2f}s  throughput={args.issues / wall:.1f} issues/s  scenarios={scenarios}")
+    print(f"call latency p50={_percentile(lat, 50)}ms p95={_percentile(lat, 95)}ms max={max(lat, default=0)}ms")
+    print(f"errors={args.issues - len(lat)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Report of Gemini usage recorded by core.usage (tokens, cost, latency, retries).
+
+Groups the local call log by issue, operation, model, request id or status so
+it is easy to see which tickets and prompts burn budget and time.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), 'src')))
+
+from core import usage as U
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize recorded LLM usage")
+    parser.add_argument("--by", choices=U.GROUPS, default="issue_key", help="Grouping column")
+    parser.add_argument("--days", type=float, default=7, help="Only calls from the last N days (0 = all)")
+    parser.add_argument("--limit", type=int, default=20, help="Rows to show")
+    parser.add_argument("--json", action="store_true", help="Print JSON instead of a table")
+    args = parser.parse_args()
+
+    since = time.time() - args.days * 86400 if args.days else None
+    rows = U.summarize(by=args.by, since=since, limit=args.limit)
+    if args.json:
+        print(json.dumps(rows, indent=2, ensure_ascii=False))
+        return
+
+    cols = ["key", "calls", "retries", "errors", "cache_hits", "prompt_tokens", "output_tokens", "cost_usd", "avg_latency_ms"]
+    widths = [max(len(c), *(len(str(r[c])) for r in rows)) if rows else len(c) for c in cols]
+    print("  ".join(c.ljust(w) for c, w in zip(cols, widths)))
+    for r in rows:
+        print("  ".join(str(r[c]).ljust(w) for c, w in zip(cols, widths)))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,8 @@
 Extract test cases from documentation sources using Google Gemini.
 
 Supports three documentation sources:
-  - PDF file (default: documentacion_oficial.pdf)
+  - PDF file (default: documentacion_oficial.pdf); --window-pages N splits it into
+    page windows extracted in parallel and merged (see core/doc_windows.py)
   - ClickUp Task (screenshots + description)
   - ClickUp Doc (rich-text pages)
 
@@ -21,9 +22,13 @@ from dotenv import load_dotenv
 load_dotenv()
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), 'src')))
 
-from google import genai
 from google.genai import types
 
+from core import gemini as GM
+from core import usage as U
+from core import structured as S
+from core import doc_windows as DW
+
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 log = logging.getLogger("docs_extractor")
 
@@ -37,35 +42,16 @@ SYSTEM_PROMPT = (
 )
 
 
-def _init_client():
-    """Initialize the Gemini client with API key (preferred) or Vertex AI."""
-    api_key = os.getenv("GOOGLE_API_KEY")
-    project_id = os.getenv("GOOGLE_CLOUD_PROJECT_ID")
-    location = os.getenv("GOOGLE_CLOUD_REGION", "us-central1")
-
-    if api_key:
-        log.info("Using Google AI Studio (API key)")
-        return genai.Client(api_key=api_key)
-    elif project_id:
-        log.info(f"Using Vertex AI (project: {project_id}, region: {location})")
-        return genai.Client(vertexai=True, project=project_id, location=location)
-    else:
-        return None
-
-
-def _parse_response(response) -> list:
-    """Parse Gemini response text into a list of test dicts."""
-    text = response.text
-    if "```" in text:
-        text = "\n".join(l for l in text.splitlines() if not l.strip().startswith("```"))
-    data = json.loads(text.strip())
-    return data.get("tests_from_docs", [])
+def _parse_response(response, client=None, issue_key: str = None, model: str = None) -> list:
+    """Parse Gemini response text into a list of test dicts; broken items are re-asked one by one."""
+    return S.parse_list(response.text, "tests_from_docs", client, issue_key, model)
 
 
 def _gen_config() -> types.GenerateContentConfig:
     return types.GenerateContentConfig(
         system_instruction=SYSTEM_PROMPT,
         response_mime_type="application/json",
+        response_schema=S.DOCS_SCHEMA,
         temperature=0.2,
     )
 
@@ -79,13 +65,41 @@ def extract_from_pdf(client, pdf_path: str, model: str) -> list:
     pdf_part = types.Part.from_bytes(data=pdf_bytes, mime_type="application/pdf")
 
     log.info("Extracting business rules from PDF via Gemini...")
-    response = client.models.generate_content(
-        model=model,
-        contents=[pdf_part, "Extract all test cases from this document."],
-        config=_gen_config(),
-    )
-
-    return _parse_response(response)
+    with U.tags(source=os.path.basename(pdf_path)):
+        response = U.generate(
+            client, "docs_extract",
+            model=model,
+            contents=[pdf_part, "Extract all test cases from this document."],
+            config=_gen_config(),
+        )
+        return _parse_response(response, client, model=model)
+
+
+def extract_from_pdf_windows(client, pdf_path: str, model: str, window_pages: int = None) -> list:
+    """Map-reduce over page windows: each window is one request, retried on its own."""
+    n_pages, windows = DW.split_pdf(pdf_path, window_pages)
+    name = os.path.basename(pdf_path)
+    log.info(f"Extracting {n_pages} pages from {name} in {len(DW.page_windows(n_pages, window_pages))} windows...")
+
+    def extract(window: DW.Window) -> list:
+        with U.tags(source=name):  # each worker thread starts with empty tags
+            response = U.generate(
+                client, "docs_extract",
+                model=model,
+                contents=[
+                    types.Part.from_bytes(data=window.data, mime_type="application/pdf"),
+                    f"These are {window.label} of {n_pages} of the document. "
+                    "Extract all test cases from these pages.",
+                ],
+                config=_gen_config(),
+            )
+            return _parse_response(response, client, model=model)
+
+    run = DW.run_windows(windows, extract)
+    log.info(f"{run.raw_count} tests from windows, {len(run.tests)} after dedupe")
+    for window, error in run.failed:
+        log.error(f"Not covered: {window.label} ({error})")
+    return run.tests
 
 
 def extract_from_clickup_task(client, task_id: str, model: str) -> list:
@@ -109,13 +123,14 @@ def extract_from_clickup_task(client, task_id: str, model: str) -> list:
     )
 
     log.info("Extracting business rules from ClickUp task via Gemini...")
-    response = client.models.generate_content(
+    response = U.generate(
+        client, "docs_extract", task_id,
         model=model,
         contents=contents,
         config=_gen_config(),
     )
 
-    return _parse_response(response)
+    return _parse_response(response, client, task_id, model)
 
 
 def extract_from_clickup_doc(client, doc_id: str, model: str) -> list:
@@ -128,13 +143,14 @@ def extract_from_clickup_doc(client, doc_id: str, model: str) -> list:
         return []
 
     log.info("Extracting business rules from ClickUp Doc via Gemini...")
-    response = client.models.generate_content(
-        model=model,
-        contents=[content + "\n\nExtract all test cases from this documentation."],
-        config=_gen_config(),
-    )
-
-    return _parse_response(response)
+    with U.tags(source=f"clickup-doc:{doc_id}"):
+        response = U.generate(
+            client, "docs_extract",
+            model=model,
+            contents=[content + "\n\nExtract all test cases from this documentation."],
+            config=_gen_config(),
+        )
+        return _parse_response(response, client, model=model)
 
 
 def main():
@@ -152,12 +168,17 @@ def main():
         "--clickup-doc", metavar="DOC_ID",
         help="ClickUp Doc ID (from URL: app.clickup.com/.../v/dc/DOC_ID/...)"
     )
+    parser.add_argument(
+        "--window-pages", type=int, default=DW.WINDOW_PAGES, metavar="N",
+        help="Split the PDF into windows of N pages extracted in parallel (0 = single request)"
+    )
     args = parser.parse_args()
 
-    client = _init_client()
+    client = GM.get_client()
     if not client:
         log.error("No AI credentials found. Set GOOGLE_API_KEY or GOOGLE_CLOUD_PROJECT_ID in .env")
         return
+    log.info(f"Using {GM.provider_name()}")
 
     model = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
 
@@ -174,7 +195,10 @@ def main():
                 log.error(f"PDF not found: '{pdf_path}'")
                 return
             log.info(f"Source: PDF {pdf_path}")
-            tests = extract_from_pdf(client, pdf_path, model)
+            if args.window_pages > 0:
+                tests = extract_from_pdf_windows(client, pdf_path, model, args.window_pages)
+            else:
+                tests = extract_from_pdf(client, pdf_path, model)
 
         output = {"tests_from_docs": tests}
         with open("tests_from_docs.json", "w", encoding="utf-8") as f:
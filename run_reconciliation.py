@@ -8,15 +8,20 @@ Auth priority:
 """
 import json
 import os
+import sys
 import logging
 
 from dotenv import load_dotenv
 
 load_dotenv()
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), 'src')))
 
-from google import genai
 from google.genai import types
 
+from core import gemini as GM
+from core import usage as U
+from core import structured as S
+
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 log = logging.getLogger("reconciliation")
 
@@ -37,22 +42,6 @@ RULES:
 5. Return ONLY a JSON object: {"final_tests": [{"title": "...", "steps": "...", "status": "..."}]}"""
 
 
-def _init_client():
-    """Initialize the Gemini client with API key (preferred) or Vertex AI."""
-    api_key = os.getenv("GOOGLE_API_KEY")
-    project_id = os.getenv("GOOGLE_CLOUD_PROJECT_ID")
-    location = os.getenv("GOOGLE_CLOUD_REGION", "us-central1")
-
-    if api_key:
-        log.info("Using Google AI Studio (API key)")
-        return genai.Client(api_key=api_key)
-    elif project_id:
-        log.info(f"Using Vertex AI (project: {project_id}, region: {location})")
-        return genai.Client(vertexai=True, project=project_id, location=location)
-    else:
-        return None
-
-
 def main():
     log.info("Starting intelligent reconciliation (Docs vs UI)...")
 
@@ -65,10 +54,11 @@ def main():
         log.error(f"Missing input file: {e}")
         return
 
-    client = _init_client()
+    client = GM.get_client()
     if not client:
         log.error("No AI credentials found. Set GOOGLE_API_KEY or GOOGLE_CLOUD_PROJECT_ID in .env")
         return
+    log.info(f"Using {GM.provider_name()}")
 
     model = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
     user_prompt = f"SOURCE A (Documentation):\n{docs_data}\n\nSOURCE B (UI Screen):\n{web_data}"
@@ -76,21 +66,19 @@ def main():
     log.info(f"Gemini ({model}) is reconciling both sources...")
 
     try:
-        response = client.models.generate_content(
+        response = U.generate(
+            client, "reconciliation",
             model=model,
             contents=[user_prompt],
             config=types.GenerateContentConfig(
                 system_instruction=SYSTEM_PROMPT,
                 response_mime_type="application/json",
+                response_schema=S.FINAL_TESTS_SCHEMA,
                 temperature=0.2,
             ),
         )
 
-        text = response.text
-        if "```" in text:
-            text = "\n".join(l for l in text.splitlines() if not l.strip().startswith("```"))
-
-        parsed = json.loads(text.strip())
+        parsed = {"final_tests": S.parse_list(response.text, "final_tests", client, model=model)}
         with open("final_tests_to_create.json", "w", encoding="utf-8") as f:
             json.dump(parsed, f, indent=2, ensure_ascii=False)
 
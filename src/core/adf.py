@@ -1,100 +1,156 @@
 # src/core/adf.py
 import re
-from typing import Any, List, Dict
+from typing import Any, List, Dict, Optional, Tuple
 
-def adf_to_text(adf: dict) -> str:
-    parts: List[str] = []
-    def walk(node: Any):
-        if not isinstance(node, dict): return
-        t = node.get("type"); 
-        if not t: return
-        if t in ("doc","blockquote","panel"):
-            for c in node.get("content", []): walk(c)
-        elif t in ("paragraph","heading"):
-            line=[]
-            for c in node.get("content", []):
-                if isinstance(c, dict) and c.get("type")=="text":
-                    line.append(c.get("text",""))
-                elif isinstance(c, dict) and c.get("type")=="hardBreak":
-                    line.append("\n")
-            parts.append("".join(line).strip())
-        elif t in ("bulletList","orderedList"):
-            for li in node.get("content", []):
-                if li.get("type")=="listItem":
-                    for c in li.get("content", []):
-                        if c.get("type")=="paragraph":
-                            seg=[]
-                            for cc in c.get("content", []):
-                                if cc.get("type")=="text":
-                                    seg.append(cc.get("text",""))
-                            if seg: parts.append("- " + "".join(seg).strip())
-                        else:
-                            walk(c)
-        else:
-            for c in node.get("content", []): walk(c)
-    walk(adf or {})
-    txt = "\n".join([p for p in parts if p])
-    return "\n".join([line.rstrip() for line in txt.splitlines()]).strip()
+# Modos de la traversal para el texto (replican las reglas del walker recursivo original)
+_WALK, _OFF, _LIST_ITEM, _LIST_CHILD = range(4)
 
-def _adf_collect_text(node: dict) -> str:
+
+def _children(node: dict) -> list:
     out = []
-    def walk(n):
-        if isinstance(n, dict):
-            if n.get("type") == "text":
-                out.append(n.get("text",""))
-            for c in n.get("content",[]) or []:
-                walk(c)
-        elif isinstance(n, list):
-            for x in n: walk(x)
-    walk(node)
-    return "".join(out).strip()
+    for c in node.get("content") or []:
+        if isinstance(c, list):
+            out.extend(x for x in c if isinstance(x, dict))
+        elif isinstance(c, dict):
+            out.append(c)
+    return out
 
-def extract_tables_from_adf(adf: dict) -> List[List[List[str]]]:
-    tables = []
-    if not (isinstance(adf, dict) and adf.get("type") == "doc"): return tables
-    def walk(n):
-        if not isinstance(n, dict): return
-        if n.get("type") == "table":
-            rows = []
-            for r in n.get("content",[]) or []:
-                if (r or {}).get("type") != "tableRow": continue
-                cells = []
-                for c in r.get("content",[]) or []:
-                    cells.append(_adf_collect_text(c))
-                rows.append(cells)
-            if rows: tables.append(rows)
-        for c in n.get("content",[]) or []:
-            walk(c)
-    walk(adf)
-    return tables
 
-def adf_collect_links(adf: dict) -> List[str]:
-    links = []
-    def walk(n):
-        if isinstance(n, dict):
-            for m in n.get("marks") or []:
-                if m.get("type") == "link":
+class ADFAnalysis:
+    """
+    Resultado de recorrer un documento ADF UNA sola vez (traversal iterativa con stack,
+    sin límite de recursión): texto, tablas, links, media y code blocks.
+    El recorrido se hace recién al leer la primera propiedad.
+    """
+
+    def __init__(self, adf: Any):
+        self._adf = adf
+        self._done = False
+
+    def _run(self) -> None:
+        if self._done: return
+        self._done = True
+        parts: List[Tuple[str, bool]] = []  # (línea, viene de una celda de tabla)
+        tables: List[list] = []
+        links: List[str] = []
+        codeblocks: List[Tuple[Optional[str], str]] = []
+        has_media = False
+
+        root = self._adf if isinstance(self._adf, dict) else {}
+        want_tables = root.get("type") == "doc"
+        # (node, text_mode, cell buffers in scope, table ctx)
+        stack: List[tuple] = [(root, _WALK, (), None)]
+        while stack:
+            node, mode, cells, ctx = stack.pop()
+            t = node.get("type")
+
+            # --- tablas: filas dentro de table, celdas dentro de tableRow ---
+            child_ctx = None
+            if ctx is not None and ctx[0] == "table" and t == "tableRow":
+                row: list = []
+                ctx[1].append(row)
+                child_ctx = ("row", row)
+            elif ctx is not None and ctx[0] == "row":
+                buf: List[str] = []
+                ctx[1].append(buf)
+                cells = cells + (buf,)
+            if want_tables and t == "table":
+                rows: list = []
+                tables.append(rows)
+                child_ctx = ("table", rows)
+
+            if t == "text":
+                for buf in cells:
+                    buf.append(node.get("text", ""))
+            for m in node.get("marks") or []:
+                if isinstance(m, dict) and m.get("type") == "link":
                     href = (m.get("attrs") or {}).get("href")
                     if href: links.append(href)
-            for c in n.get("content",[]) or []:
-                walk(c)
-        elif isinstance(n, list):
-            for x in n: walk(x)
-    walk(adf or {})
-    # unique
-    return list(dict.fromkeys(links))
+            if t in ("media", "mediaSingle"):
+                has_media = True
+            kids = _children(node)
+            if t == "codeBlock":
+                lang = (node.get("attrs") or {}).get("language")
+                codeblocks.append((lang, "".join(c.get("text", "") for c in kids if c.get("type") == "text")))
+
+            # --- texto (reglas de adf_to_text) ---
+            if mode == _LIST_ITEM:
+                child_mode = _LIST_CHILD if t == "listItem" else _OFF
+            elif mode == _LIST_CHILD and t == "paragraph":
+                seg = [c.get("text", "") for c in kids if c.get("type") == "text"]
+                if seg: parts.append(("- " + "".join(seg).strip(), bool(cells)))
+                child_mode = _OFF
+            elif mode in (_WALK, _LIST_CHILD) and t:
+                if t in ("paragraph", "heading"):
+                    line = []
+                    for c in kids:
+                        if c.get("type") == "text": line.append(c.get("text", ""))
+                        elif c.get("type") == "hardBreak": line.append("\n")
+                    parts.append(("".join(line).strip(), bool(cells)))
+                    child_mode = _OFF
+                elif t in ("bulletList", "orderedList"):
+                    child_mode = _LIST_ITEM
+                else:
+                    child_mode = _WALK
+            else:
+                child_mode = _OFF
+
+            for c in reversed(kids):
+                stack.append((c, child_mode, cells, child_ctx))
+
+        self._text = self._join(p for p, _ in parts)
+        self._text_without_tables = self._join(p for p, in_table in parts if not in_table)
+        self._tables = [[["".join(buf).strip() for buf in row] for row in rows] for rows in tables if rows]
+        self._links = list(dict.fromkeys(links))
+        self._codeblocks = codeblocks
+        self._has_media = has_media
+
+    @staticmethod
+    def _join(parts) -> str:
+        txt = "\n".join([p for p in parts if p])
+        return "\n".join([line.rstrip() for line in txt.splitlines()]).strip()
+
+    @property
+    def text(self) -> str:
+        self._run(); return self._text
+
+    @property
+    def text_without_tables(self) -> str:
+        """El texto sin las celdas de las tablas, para cuando las tablas viajan aparte (`tables`)."""
+        self._run(); return self._text_without_tables
+
+    @property
+    def tables(self) -> List[List[List[str]]]:
+        self._run(); return self._tables
+
+    @property
+    def links(self) -> List[str]:
+        self._run(); return self._links
+
+    @property
+    def has_media(self) -> bool:
+        self._run(); return self._has_media
+
+    def codeblocks(self, lang: str = "gherkin") -> List[str]:
+        self._run()
+        return [text for block_lang, text in self._codeblocks if not lang or block_lang == lang]
+
+
+def analyze_adf(adf: Any) -> ADFAnalysis:
+    """Un solo recorrido para todo: usar cuando se necesitan varios resultados del mismo documento."""
+    return ADFAnalysis(adf)
+
+def adf_to_text(adf: dict) -> str:
+    return analyze_adf(adf).text
+
+def extract_tables_from_adf(adf: dict) -> List[List[List[str]]]:
+    return analyze_adf(adf).tables
+
+def adf_collect_links(adf: dict) -> List[str]:
+    return analyze_adf(adf).links
 
 def adf_has_media(adf: dict) -> bool:
-    hit = False
-    def walk(n):
-        nonlocal hit
-        if hit: return
-        if isinstance(n, dict) and n.get("type") in ("media","mediaSingle"):
-            hit = True; return
-        for c in n.get("content",[]) or []:
-            walk(c)
-    walk(adf or {})
-    return hit
+    return analyze_adf(adf).has_media
 
 def plain_to_adf(text: str) -> dict:
     content = []
@@ -116,21 +172,7 @@ def adf_with_code_block(title: str, code_text: str) -> dict:
     return {"type":"doc","version":1,"content":blocks}
 
 def adf_extract_codeblocks(adf: dict, lang: str = "gherkin") -> list[str]:
-    blocks = []
-    def walk(n):
-        if not isinstance(n, dict): return
-        if n.get("type") == "codeBlock":
-            a = n.get("attrs") or {}
-            if not lang or a.get("language") == lang:
-                text = []
-                for c in n.get("content", []) or []:
-                    if isinstance(c, dict) and c.get("type") == "text":
-                        text.append(c.get("text", "")) 
-                blocks.append("".join(text))
-        for c in n.get("content", []) or []:
-            walk(c)
-    walk(adf or {})
-    return blocks
+    return analyze_adf(adf).codeblocks(lang)
 
 def dedupe_tests(tests: List[dict]) -> List[dict]:
     """
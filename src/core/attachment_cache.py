@@ -0,0 +1,75 @@
+# src/core/attachment_cache.py
+"""
+Cache local de adjuntos (imágenes de ClickUp/Jira) direccionada por contenido.
+
+- keys/<sha1(clave)>   -> sha256 del contenido (la clave es source + id + size + date)
+- blobs/<ab>/<sha256>  -> bytes del adjunto (un mismo archivo se guarda una sola vez)
+
+El mtime de cada blob se usa como marca LRU; al superar ATTACHMENT_CACHE_MAX_MB se
+borran los blobs menos usados (core.disk_lru, sin recorrer el disco en cada put).
+Una clave cuyo blob fue desalojado es simplemente un miss.
+"""
+import os
+import hashlib
+import logging
+from typing import Optional
+
+from . import disk_lru as DL
+
+log = logging.getLogger(__name__)
+
+CACHE_DIR = os.getenv("ATTACHMENT_CACHE_DIR") or os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "cache", "attachments")
+)
+MAX_BYTES = int(float(os.getenv("ATTACHMENT_CACHE_MAX_MB", "500")) * 1024 * 1024)
+
+
+def attachment_key(source: str, att_id: str, size=None, date=None) -> str:
+    """Clave estable de un adjunto: si cambia el tamaño o la fecha, es otro archivo."""
+    return f"{source}:{att_id}:{size or ''}:{date or ''}"
+
+
+def _key_path(key: str) -> str:
+    return os.path.join(CACHE_DIR, "keys", hashlib.sha1(key.encode("utf-8")).hexdigest())
+
+
+def _blob_path(digest: str) -> str:
+    return os.path.join(CACHE_DIR, "blobs", digest[:2], digest)
+
+
+def _blobs_root() -> str:
+    return os.path.join(CACHE_DIR, "blobs")
+
+
+def get(key: str) -> Optional[bytes]:
+    """Devuelve los bytes cacheados para `key` o None."""
+    try:
+        with open(_key_path(key), "r", encoding="utf-8") as f:
+            digest = f.read().strip()
+        path = _blob_path(digest)
+        with open(path, "rb") as f:
+            data = f.read()
+        os.utime(path)  # LRU
+        return data
+    except OSError:
+        return None
+
+
+def put(key: str, data: bytes) -> None:
+    """Guarda `data` bajo `key`. Nunca lanza: un fallo de cache no debe romper la descarga."""
+    try:
+        digest = hashlib.sha256(data).hexdigest()
+        path = _blob_path(digest)
+        if os.path.exists(path):
+            os.utime(path)
+        else:
+            DL.atomic_write(path, data)
+            DL.note_write(_blobs_root(), len(data), MAX_BYTES)
+        DL.atomic_write(_key_path(key), digest.encode("utf-8"))
+    except OSError as e:
+        log.warning(f"No se pudo cachear el adjunto {key}: {e}")
+
+
+def evict(max_bytes: int = None) -> int:
+    """Borra blobs por orden LRU hasta quedar bajo `max_bytes`. Devuelve cuántos borró."""
+    return DL.evict(_blobs_root(), MAX_BYTES if max_bytes is None else max_bytes)
@@ -1,26 +1,53 @@
 # src/core/clickup.py
 import time
 import logging
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Any, Optional
-from .config import CLICKUP_API_KEY, CLICKUP_API_BASE, CLICKUP_SPACES, CLICKUP_TEST_CASE_TYPE_ID
+from .config import (
+    CLICKUP_API_KEY, CLICKUP_API_BASE, CLICKUP_SPACES, CLICKUP_TEST_CASE_TYPE_ID,
+    CLICKUP_POOL_SIZE, CLICKUP_RATE_LIMIT_PER_MIN, CLICKUP_HIERARCHY_TTL,
+)
+from . import http as H
+from . import attachment_cache as AC
+from . import context as CTX
 
 log = logging.getLogger(__name__)
 
 _CACHED_TEAM_ID = None
 _CACHED_TEST_TYPE_ID = None
 
+_SESSION: Optional[requests.Session] = None
+_SESSION_LOCK = threading.Lock()
+_HYDRATE_WORKERS = 8
+_ATTACHMENT_TIMEOUT = 20
+_LIMITER = H.TokenBucket(rate=CLICKUP_RATE_LIMIT_PER_MIN / 60.0, capacity=CLICKUP_RATE_LIMIT_PER_MIN)
+
 def _headers() -> dict:
     if not CLICKUP_API_KEY: raise ValueError("Falta CLICKUP_API_KEY")
     return {"Authorization": CLICKUP_API_KEY, "Content-Type": "application/json"}
 
+def _session() -> requests.Session:
+    """Session keep-alive compartida por todas las llamadas a ClickUp."""
+    global _SESSION
+    if _SESSION is None:
+        with _SESSION_LOCK:
+            if _SESSION is None:
+                _SESSION = H.build_session(pool_size=CLICKUP_POOL_SIZE)
+    return _SESSION
+
 def clickup_request(method: str, path: str, params: dict = None, body: dict = None) -> dict:
     url = f"{CLICKUP_API_BASE.rstrip('/')}{path}"
     for attempt in range(1, 4):
+        _LIMITER.acquire()
         try:
-            resp = requests.request(method, url, headers=_headers(), params=params, json=body, timeout=30)
-            if resp.status_code == 429:
-                time.sleep(2)
+            resp = _session().request(method, url, headers=_headers(), params=params, json=body, timeout=30)
+            _LIMITER.update_from_headers(resp.headers)
+            if resp.status_code == 429 and attempt < 3:
+                wait = H.retry_after_seconds(resp, default=2)
+                log.warning(f"ClickUp 429, reintentando en {wait:.1f}s")
+                time.sleep(wait)
                 continue
             resp.raise_for_status()
             return resp.json() if resp.text else {}
@@ -60,14 +87,16 @@ def find_test_case_type_id() -> Optional[int]:
 
     try:
         data = clickup_request("GET", f"/team/{team_id}/custom_task_type")
-        types = data.get("custom_task_types", [])
-        target_names = ["test case", "test", "prueba", "caso de prueba"]
-        for t in types:
-            if t.get("name", "").lower() in target_names:
-                _CACHED_TEST_TYPE_ID = t.get("id")
-                return _CACHED_TEST_TYPE_ID
+        _CACHED_TEST_TYPE_ID = _match_test_case_type(data)
     except Exception: pass
     
+    return _CACHED_TEST_TYPE_ID
+
+def _match_test_case_type(data: dict) -> Optional[int]:
+    target_names = ["test case", "test", "prueba", "caso de prueba"]
+    for t in data.get("custom_task_types", []):
+        if t.get("name", "").lower() in target_names:
+            return t.get("id")
     return None
 
 
@@ -80,67 +109,169 @@ def get_lists_in_folder(folder_id: str) -> List[dict]:
     data = clickup_request("GET", f"/folder/{folder_id}/list")
     return data.get("lists", [])
 
-def get_testing_lists() -> List[Dict[str, str]]:
-    options = []
-    for project_name, space_id in CLICKUP_SPACES.items():
-        if not space_id: continue
-        folders = get_folders_in_space(space_id)
-        target_folder = None
-        for f in folders:
-            if "testing" in f["name"].lower() and "repository" in f["name"].lower():
-                target_folder = f
-                break
-        if target_folder:
-            lists = get_lists_in_folder(target_folder["id"])
-            for l in lists:
-                options.append({
-                    "label": f"{project_name} - {l['name']}",
-                    "value": l["id"],
-                    "description": f"Carpeta: {target_folder['name']}"
-                })
-    return options
+def _find_testing_folder(folders: List[dict]) -> Optional[dict]:
+    for f in folders:
+        if "testing" in f["name"].lower() and "repository" in f["name"].lower():
+            return f
+    return None
+
+def _list_options(project_name: str, folder: dict, lists: List[dict]) -> List[Dict[str, str]]:
+    return [{
+        "label": f"{project_name} - {l['name']}",
+        "value": l["id"],
+        "description": f"Carpeta: {folder['name']}"
+    } for l in lists]
+
+class _HierarchyIndex:
+    """
+    Índice cacheado de listas de testing. Pasado el TTL se sigue sirviendo el dato
+    viejo mientras un único refresco corre en segundo plano. `generation` sube con
+    cada invalidate()/store(): un refresco lanzado antes no pisa lo que vino después.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.options: Optional[List[Dict[str, str]]] = None
+        self.loaded_at = 0.0
+        self.refreshing = False
+        self.generation = 0
+        self._refresh_generation = 0
+        self._lock = threading.Lock()
+
+    def is_fresh(self) -> bool:
+        return self.options is not None and time.monotonic() - self.loaded_at < self.ttl
+
+    def store(self, options: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        with self._lock:
+            self.options, self.loaded_at = options, time.monotonic()
+            self.generation += 1
+        return list(options)
+
+    def store_refresh(self, options: List[Dict[str, str]]) -> bool:
+        """Guarda el resultado del refresco en segundo plano salvo que el índice haya cambiado desde claim_refresh()."""
+        with self._lock:
+            if self.generation != self._refresh_generation:
+                return False
+            self.options, self.loaded_at = options, time.monotonic()
+            return True
+
+    def claim_refresh(self) -> bool:
+        with self._lock:
+            if self.refreshing: return False
+            self.refreshing = True
+            self._refresh_generation = self.generation
+            return True
+
+    def release_refresh(self) -> None:
+        with self._lock:
+            self.refreshing = False
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self.options, self.loaded_at = None, 0.0
+            self.generation += 1
+
+_HIERARCHY = _HierarchyIndex(ttl=CLICKUP_HIERARCHY_TTL)
+
+def _space_options(project_name: str, space_id: str) -> List[Dict[str, str]]:
+    target_folder = _find_testing_folder(get_folders_in_space(space_id))
+    if not target_folder: return []
+    return _list_options(project_name, target_folder, get_lists_in_folder(target_folder["id"]))
+
+def _load_testing_lists() -> List[Dict[str, str]]:
+    spaces = [(name, sid) for name, sid in CLICKUP_SPACES.items() if sid]
+    if not spaces: return []
+    with ThreadPoolExecutor(max_workers=len(spaces)) as pool:
+        results = list(pool.map(lambda sp: _space_options(*sp), spaces))
+    return [opt for options in results for opt in options]
+
+def _background_refresh() -> None:
+    try: _HIERARCHY.store_refresh(_load_testing_lists())
+    except Exception as e: log.warning(f"No se pudo refrescar el índice de listas: {e}")
+    finally: _HIERARCHY.release_refresh()
+
+def invalidate_testing_lists() -> None:
+    """Descarta el índice cacheado; la próxima llamada vuelve a recorrer los spaces."""
+    _HIERARCHY.invalidate()
+
+def get_testing_lists(force_refresh: bool = False) -> List[Dict[str, str]]:
+    options = _HIERARCHY.options  # una sola lectura: invalidate() puede ponerlo en None en cualquier momento
+    if force_refresh or options is None:
+        return _HIERARCHY.store(_load_testing_lists())
+    if not _HIERARCHY.is_fresh() and _HIERARCHY.claim_refresh():
+        threading.Thread(target=_background_refresh, daemon=True).start()
+    return list(options)
+
+def _is_image(att: dict) -> bool:
+    return (att.get("type") or "").startswith("image/")
+
+def _attachment_key(att: dict) -> str:
+    return AC.attachment_key("clickup", att.get("id") or att.get("url"), att.get("size"), att.get("date"))
+
+def _download_attachment(att: dict) -> Optional[Dict[str, Any]]:
+    key = _attachment_key(att)
+    cached = AC.get(key)
+    if cached is not None:
+        return {"mime_type": att.get("type"), "data": cached, "name": att.get("name")}
+    try:
+        img_resp = _session().get(att.get("url"), headers={"Authorization": CLICKUP_API_KEY}, timeout=_ATTACHMENT_TIMEOUT)
+        if img_resp.status_code == 200:
+            AC.put(key, img_resp.content)
+            return {"mime_type": att.get("type"), "data": img_resp.content, "name": att.get("name")}
+    except Exception as e:
+        log.warning(f"No se pudo descargar {att.get('name')}: {e}")
+    return None
+
+def _collect_images(futures) -> List[Dict[str, Any]]:
+    return [img for img in (f.result() for f in futures) if img]
 
 def get_task_images(task_id: str) -> List[Dict[str, Any]]:
     try:
         data = clickup_request("GET", f"/task/{task_id}")
-        attachments = data.get("attachments", [])
-        image_data = []
-        for att in attachments:
-            if att.get("type", "").startswith("image/"):
-                url = att.get("url")
-                img_resp = requests.get(url, headers={"Authorization": CLICKUP_API_KEY})
-                if img_resp.status_code == 200:
-                    image_data.append({"mime_type": att.get("type"), "data": img_resp.content, "name": att.get("name")})
-        return image_data
+        atts = [att for att in data.get("attachments", []) if _is_image(att)]
+        if not atts: return []
+        with ThreadPoolExecutor(max_workers=min(len(atts), _HYDRATE_WORKERS)) as pool:
+            return _collect_images([pool.submit(_download_attachment, att) for att in atts])
     except Exception: return []
 
+def _task_result(data: dict, comments_data: dict, images: List[Dict[str, Any]]) -> dict:
+    """Arma el dict que consumen el bot y los scripts a partir de la tarea y sus comentarios."""
+    desc = data.get("description", "") or ""
+    name = data.get("name", "")
+    return {
+        "ok": True, "key": data.get("id"), "summary": name, "description": desc,
+        "full_context": CTX.pack_ticket(name, desc, CTX.clickup_comments(comments_data)),
+        "images": images
+    }
+
 def get_task(task_id: str) -> dict:
+    """Lee la tarea una sola vez y baja comentarios y adjuntos en paralelo."""
     try:
         data = clickup_request("GET", f"/task/{task_id}")
-        desc = data.get("description", "") or ""
-        name = data.get("name", "")
-        comments_data = clickup_request("GET", f"/task/{task_id}/comment")
-        comments_list = [f"{c['user']['username']}: {c['comment_text']}" for c in comments_data.get("comments", [])]
-        return {
-            "ok": True, "key": data.get("id"), "summary": name, "description": desc,
-            "full_context": f"TITLE: {name}\nDESCRIPTION:\n{desc}\nCOMMENTS:\n{chr(10).join(comments_list)}",
-            "images": get_task_images(task_id)
-        }
+        atts = [att for att in data.get("attachments", []) if _is_image(att)]
+        with ThreadPoolExecutor(max_workers=min(len(atts) + 1, _HYDRATE_WORKERS)) as pool:
+            comments_future = pool.submit(clickup_request, "GET", f"/task/{task_id}/comment")
+            image_futures = [pool.submit(_download_attachment, att) for att in atts]
+            comments_data = comments_future.result()
+            images = _collect_images(image_futures)
+        return _task_result(data, comments_data, images)
     except Exception as e: return {"ok": False, "error": str(e)}
 
-def create_test_task(parent_task_id: str, summary: str, gherkin: str, list_id: str) -> dict:
-    if not list_id: raise ValueError("Falta lista destino.")
-
-    custom_type_id = find_test_case_type_id()
-
+def _test_task_body(summary: str, gherkin: str, custom_type_id: Optional[int]) -> dict:
     body = {
         "name": summary,
         "description": f"```gherkin\n{gherkin}\n```",
         "tags": ["auto-generated", "mcp-test"],
     }
-
     if custom_type_id:
         body["custom_task_type_id"] = custom_type_id
+    return body
+
+def create_test_task(parent_task_id: str, summary: str, gherkin: str, list_id: str) -> dict:
+    if not list_id: raise ValueError("Falta lista destino.")
+
+    custom_type_id = find_test_case_type_id()
+    body = _test_task_body(summary, gherkin, custom_type_id)
 
     print(f"🛑 [DEBUG CLICKUP] Tipo ID: {custom_type_id} | Título: {summary}")
 
@@ -0,0 +1,244 @@
+# src/core/clickup_async.py
+"""
+Variante asyncio de core.clickup (misma superficie de funciones) para el bot de Discord.
+Usa una única aiohttp.ClientSession por event loop y comparte el rate limiter con
+el cliente sincrónico, así ambos respetan el mismo presupuesto de la API key.
+"""
+import asyncio
+import json
+import logging
+from typing import AsyncIterator, Dict, List, Any, Optional
+
+import aiohttp
+
+from . import clickup as C
+from . import http as H
+from . import attachment_cache as AC
+from .config import CLICKUP_API_KEY, CLICKUP_API_BASE, CLICKUP_SPACES, CLICKUP_TEST_CASE_TYPE_ID, CLICKUP_ASYNC_POOL_SIZE, CLICKUP_CREATE_CONCURRENCY
+
+log = logging.getLogger(__name__)
+
+_TIMEOUT = aiohttp.ClientTimeout(total=30)
+_SESSION: Optional[aiohttp.ClientSession] = None
+
+
+def _session() -> aiohttp.ClientSession:
+    """Session compartida (pool de conexiones keep-alive). Debe llamarse dentro del event loop."""
+    global _SESSION
+    if _SESSION is None or _SESSION.closed:
+        _SESSION = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=CLICKUP_ASYNC_POOL_SIZE),
+            timeout=_TIMEOUT,
+        )
+    return _SESSION
+
+
+async def close() -> None:
+    """Cierra la session compartida (llamar al apagar el bot)."""
+    global _SESSION
+    if _SESSION is not None and not _SESSION.closed:
+        await _SESSION.close()
+    _SESSION = None
+
+
+async def _acquire() -> None:
+    wait = C._LIMITER.reserve()
+    if wait > 0:
+        await asyncio.sleep(wait)
+
+
+async def clickup_request(method: str, path: str, params: dict = None, body: dict = None) -> dict:
+    url = f"{CLICKUP_API_BASE.rstrip('/')}{path}"
+    for attempt in range(1, 4):
+        await _acquire()
+        try:
+            async with _session().request(method, url, headers=C._headers(), params=params, json=body) as resp:
+                C._LIMITER.update_from_headers(resp.headers)
+                if resp.status == 429 and attempt < 3:
+                    wait = H.retry_after_seconds(resp, default=2)
+                    log.warning(f"ClickUp 429, reintentando en {wait:.1f}s")
+                    await asyncio.sleep(wait)
+                    continue
+                resp.raise_for_status()
+                text = await resp.text()
+                return json.loads(text) if text else {}
+        except Exception as e:
+            log.warning(f"Error ClickUp: {e}")
+            if attempt == 3: raise
+            await asyncio.sleep(1)
+
+
+async def get_team_id() -> Optional[str]:
+    if C._CACHED_TEAM_ID: return C._CACHED_TEAM_ID
+    try:
+        data = await clickup_request("GET", "/team")
+        teams = data.get("teams", [])
+        if teams:
+            C._CACHED_TEAM_ID = teams[0]["id"]
+            return C._CACHED_TEAM_ID
+    except Exception: pass
+    return None
+
+
+async def find_test_case_type_id() -> Optional[int]:
+    """Busca el ID de 'Test Case'. Prioriza variable de config."""
+    if C._CACHED_TEST_TYPE_ID: return C._CACHED_TEST_TYPE_ID
+
+    if CLICKUP_TEST_CASE_TYPE_ID:
+        try:
+            C._CACHED_TEST_TYPE_ID = int(CLICKUP_TEST_CASE_TYPE_ID)
+            return C._CACHED_TEST_TYPE_ID
+        except ValueError:
+            pass
+
+    team_id = await get_team_id()
+    if not team_id: return None
+
+    try:
+        data = await clickup_request("GET", f"/team/{team_id}/custom_task_type")
+        C._CACHED_TEST_TYPE_ID = C._match_test_case_type(data)
+    except Exception: pass
+
+    return C._CACHED_TEST_TYPE_ID
+
+
+async def get_folders_in_space(space_id: str) -> List[dict]:
+    if not space_id: return []
+    data = await clickup_request("GET", f"/space/{space_id}/folder")
+    return data.get("folders", [])
+
+
+async def get_lists_in_folder(folder_id: str) -> List[dict]:
+    data = await clickup_request("GET", f"/folder/{folder_id}/list")
+    return data.get("lists", [])
+
+
+async def _space_options(project_name: str, space_id: str) -> List[Dict[str, str]]:
+    target_folder = C._find_testing_folder(await get_folders_in_space(space_id))
+    if not target_folder: return []
+    return C._list_options(project_name, target_folder, await get_lists_in_folder(target_folder["id"]))
+
+
+async def _load_testing_lists() -> List[Dict[str, str]]:
+    spaces = [(name, sid) for name, sid in CLICKUP_SPACES.items() if sid]
+    results = await asyncio.gather(*(_space_options(name, sid) for name, sid in spaces))
+    return [opt for options in results for opt in options]
+
+
+async def _background_refresh() -> None:
+    try: C._HIERARCHY.store_refresh(await _load_testing_lists())
+    except Exception as e: log.warning(f"No se pudo refrescar el índice de listas: {e}")
+    finally: C._HIERARCHY.release_refresh()
+
+
+_REFRESH_TASKS = set()
+
+
+async def get_testing_lists(force_refresh: bool = False) -> List[Dict[str, str]]:
+    """Comparte el índice cacheado con core.clickup (mismo TTL e invalidación)."""
+    options = C._HIERARCHY.options  # una sola lectura: invalidate() puede correr desde otro hilo
+    if force_refresh or options is None:
+        return C._HIERARCHY.store(await _load_testing_lists())
+    if not C._HIERARCHY.is_fresh() and C._HIERARCHY.claim_refresh():
+        task = asyncio.create_task(_background_refresh())
+        _REFRESH_TASKS.add(task)
+        task.add_done_callback(_REFRESH_TASKS.discard)
+    return list(options)
+
+
+def invalidate_testing_lists() -> None:
+    C.invalidate_testing_lists()
+
+
+async def _download_image(att: dict) -> Optional[Dict[str, Any]]:
+    key = C._attachment_key(att)
+    cached = await asyncio.to_thread(AC.get, key)
+    if cached is not None:
+        return {"mime_type": att.get("type"), "data": cached, "name": att.get("name")}
+    try:
+        timeout = aiohttp.ClientTimeout(total=C._ATTACHMENT_TIMEOUT)
+        async with _session().get(att.get("url"), headers={"Authorization": CLICKUP_API_KEY}, timeout=timeout) as resp:
+            if resp.status != 200: return None
+            data = await resp.read()
+        await asyncio.to_thread(AC.put, key, data)
+        return {"mime_type": att.get("type"), "data": data, "name": att.get("name")}
+    except Exception as e:
+        log.warning(f"No se pudo descargar {att.get('name')}: {e}")
+        return None
+
+
+async def _images_from_task(data: dict) -> List[Dict[str, Any]]:
+    atts = [att for att in data.get("attachments", []) if C._is_image(att)]
+    images = await asyncio.gather(*(_download_image(att) for att in atts))
+    return [img for img in images if img]
+
+
+async def get_task_images(task_id: str) -> List[Dict[str, Any]]:
+    try:
+        return await _images_from_task(await clickup_request("GET", f"/task/{task_id}"))
+    except Exception: return []
+
+
+async def get_task(task_id: str) -> dict:
+    try:
+        data, comments_data = await asyncio.gather(
+            clickup_request("GET", f"/task/{task_id}"),
+            clickup_request("GET", f"/task/{task_id}/comment"),
+        )
+        return C._task_result(data, comments_data, await _images_from_task(data))
+    except Exception as e: return {"ok": False, "error": str(e)}
+
+
+async def create_test_task(parent_task_id: str, summary: str, gherkin: str, list_id: str) -> dict:
+    if not list_id: raise ValueError("Falta lista destino.")
+
+    custom_type_id = await find_test_case_type_id()
+    body = C._test_task_body(summary, gherkin, custom_type_id)
+
+    data = await clickup_request("POST", f"/list/{list_id}/task", body=body)
+    new_task_id = data.get("id")
+    task_url = f"https://app.clickup.com/t/{new_task_id}"
+
+    try: await clickup_request("POST", f"/task/{parent_task_id}/link/{new_task_id}")
+    except Exception: pass
+
+    return {"ok": True, "key": new_task_id, "url": task_url}
+
+
+async def create_test_tasks(parent_task_id: str, items: List[Dict[str, str]], list_id: str, concurrency: int = CLICKUP_CREATE_CONCURRENCY) -> List[dict]:
+    """
+    Crea varios tests en paralelo (máximo `concurrency` a la vez) respetando el rate limit.
+    `items` son dicts {"summary", "gherkin"}; el resultado conserva el orden de entrada y
+    cada fallo se reporta como {"ok": False, "error": ...} sin abortar el resto del lote.
+    """
+    if not list_id: raise ValueError("Falta lista destino.")
+    await find_test_case_type_id()  # se resuelve una vez antes de lanzar el lote
+    sem = asyncio.Semaphore(max(1, concurrency))
+    return list(await asyncio.gather(*(_create_guarded(sem, parent_task_id, item, list_id) for item in items)))
+
+
+async def _create_guarded(sem: asyncio.Semaphore, parent_task_id: str, item: Dict[str, str], list_id: str) -> dict:
+    async with sem:
+        try:
+            return await create_test_task(parent_task_id, item["summary"], item["gherkin"], list_id)
+        except Exception as e:
+            log.warning(f"No se pudo crear '{item['summary']}': {e}")
+            return {"ok": False, "error": str(e)}
+
+
+async def create_test_tasks_stream(parent_task_id: str, items: AsyncIterator[Dict[str, str]], list_id: str, concurrency: int = CLICKUP_CREATE_CONCURRENCY) -> List[dict]:
+    """
+    Como create_test_tasks, pero consume `items` a medida que llegan (p. ej. escenarios
+    que el LLM sigue escribiendo) y lanza cada creación en cuanto el item está listo.
+    El resultado conserva el orden de llegada.
+    """
+    if not list_id: raise ValueError("Falta lista destino.")
+    await find_test_case_type_id()
+    sem = asyncio.Semaphore(max(1, concurrency))
+    pending = []
+    try:
+        async for item in items:
+            pending.append(asyncio.create_task(_create_guarded(sem, parent_task_id, item, list_id)))
+    finally:
+        results = list(await asyncio.gather(*pending))
+    return results
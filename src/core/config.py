@@ -9,6 +9,13 @@ JIRA_API_TOKEN = os.environ.get("JIRA_API_TOKEN")
 JIRA_URL = os.environ.get("JIRA_URL")
 DEFAULT_PROJECT_KEY = os.environ.get("DEFAULT_PROJECT_KEY")
 RELATES_LINK_TYPE = os.environ.get("RELATES_LINK_TYPE", "Relates")
+JIRA_MAX_RETRIES = int(os.environ.get("JIRA_MAX_RETRIES", "3"))
+JIRA_BACKOFF = float(os.environ.get("JIRA_BACKOFF", "0.6"))
+JIRA_POOL_SIZE = int(os.environ.get("JIRA_POOL_SIZE", "10"))
+# Escrituras (links/updates/labels) simultáneas contra Jira
+JIRA_WRITE_CONCURRENCY = int(os.environ.get("JIRA_WRITE_CONCURRENCY", "5"))
+# Búsquedas JQL simultáneas (search_issues_by_keys); lecturas, independientes del límite de escrituras
+JIRA_READ_CONCURRENCY = int(os.environ.get("JIRA_READ_CONCURRENCY", "8"))
 
 CLICKUP_API_KEY = os.environ.get("CLICKUP_API_KEY")
 CLICKUP_API_BASE = "https://api.clickup.com/api/v2"
@@ -17,6 +24,16 @@ CLICKUP_DEFAULT_LIST_ID = os.environ.get("CLICKUP_LIST_ID")
 
 CLICKUP_TEST_CASE_TYPE_ID = os.environ.get("CLICKUP_TEST_CASE_TYPE_ID")
 
+# Transporte HTTP: tamaño del pool keep-alive y límite de requests/minuto del plan de ClickUp
+CLICKUP_POOL_SIZE = int(os.environ.get("CLICKUP_POOL_SIZE", "10"))
+CLICKUP_RATE_LIMIT_PER_MIN = int(os.environ.get("CLICKUP_RATE_LIMIT_PER_MIN", "100"))
+# Conexiones simultáneas del cliente asyncio (core.clickup_async) usado por el bot
+CLICKUP_ASYNC_POOL_SIZE = int(os.environ.get("CLICKUP_ASYNC_POOL_SIZE", "100"))
+# Tests que el bot crea en paralelo por historia
+CLICKUP_CREATE_CONCURRENCY = int(os.environ.get("CLICKUP_CREATE_CONCURRENCY", "5"))
+# Segundos que se considera vigente el índice de listas de testing (spaces/folders/lists)
+CLICKUP_HIERARCHY_TTL = int(os.environ.get("CLICKUP_HIERARCHY_TTL", "600"))
+
 CLICKUP_SPACES = {
     "Herald": os.environ.get("CLICKUP_HERALD_SPACE_ID"),
     "Kupyo": os.environ.get("CLICKUP_KUPYO_SPACE_ID")
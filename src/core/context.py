@@ -0,0 +1,189 @@
+# src/core/context.py
+"""
+Packs the ticket context sent to the LLM into a fixed budget.
+
+The ticket is split into sections (summary, acceptance criteria, description,
+tables, comments). Noise comments ("ok", "done", one-word replies) and repeated
+text are dropped first; the rest is admitted by priority until the budget is
+full. Comments are ranked newest first. The section that no longer fits is cut
+at a line boundary and everything after it is left out. The packed text keeps
+the usual reading order (summary, description, ..., comments).
+
+Tokens are estimated as characters / CHARS_PER_TOKEN, which is close enough for
+Gemini on English/Spanish text and avoids a tokenizer round-trip.
+"""
+from __future__ import annotations
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List
+
+MAX_CONTEXT_CHARS = int(os.getenv("LLM_MAX_CONTEXT_CHARS", "16000"))
+MAX_COMMENTS = int(os.getenv("LLM_MAX_COMMENTS", "10"))
+MAX_COMMENT_CHARS = int(os.getenv("LLM_MAX_COMMENT_CHARS", "600"))
+CHARS_PER_TOKEN = 4
+
+NOISE = ("listo", "hecho", "done", "ok", "gracias", "de acuerdo", "thanks", "lgtm", "+1")
+TRUNCATED = " [...]"
+
+_AC_RX = re.compile(
+    r"^\s*(#+\s*)?(acceptance criteria|criterios de aceptaci[oó]n|expected (behavior|result))\s*:?\s*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+_HEADING_RX = re.compile(r"^\s*(#+\s*\S.*|[A-Z][A-Za-zÁÉÍÓÚáéíóúñ ]{2,40}:)\s*$", re.MULTILINE)
+
+# Lower rank = admitted first. Display order is the order sections are passed in.
+RANK = {"summary": 0, "acceptance_criteria": 1, "description": 2, "tables": 3, "comment": 4}
+HEADERS = {
+    "summary": "SUMMARY",
+    "acceptance_criteria": "ACCEPTANCE CRITERIA",
+    "description": "DESCRIPTION",
+    "tables": "TABLES",
+    "comment": "COMMENTS",
+}
+
+
+@dataclass
+class Section:
+    kind: str
+    text: str
+    rank: int = 0
+    label: str = ""  # comment author; not part of the duplicate check
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text or "") + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _fingerprint(text: str) -> str:
+    return re.sub(r"\W+", " ", (text or "").lower()).strip()
+
+
+def is_noise(text: str) -> bool:
+    t = (text or "").strip()
+    return not t or len(t.split()) < 3 or t.lower().strip(" .!") in NOISE
+
+
+def split_acceptance_criteria(description: str) -> tuple:
+    """(description_without_ac, acceptance_criteria). The AC block runs until the next heading."""
+    m = _AC_RX.search(description or "")
+    if not m:
+        return description or "", ""
+    rest = description[m.end():]
+    nxt = _HEADING_RX.search(rest)
+    ac = rest[:nxt.start()] if nxt else rest
+    remaining = description[:m.start()] + (rest[nxt.start():] if nxt else "")
+    return remaining.strip(), ac.strip()
+
+
+def _clip(text: str, limit: int) -> str:
+    """Cuts at the last line break that fits; hard cut if the first line alone is too long."""
+    if len(text) <= limit:
+        return text
+    room = max(limit - len(TRUNCATED), 0)
+    cut = text.rfind("\n", 0, room)
+    return (text[:cut] if cut > 0 else text[:room]).rstrip() + TRUNCATED
+
+
+def clip_context(text: str, max_chars: int = None) -> str:
+    """Last-resort guard for callers that hand over an already built context string."""
+    return _clip(text or "", MAX_CONTEXT_CHARS if max_chars is None else max_chars)
+
+
+def pack(sections: List[Section], max_chars: int = None) -> str:
+    budget = MAX_CONTEXT_CHARS if max_chars is None else max_chars
+    seen = set()
+    candidates = []
+    for pos, s in enumerate(sections):
+        text = (s.text or "").strip()
+        fp = _fingerprint(text)
+        if not fp or fp in seen:
+            continue
+        seen.add(fp)
+        candidates.append((s.rank, pos, s.kind, f"{s.label}: {text}" if s.label else text))
+
+    admitted: Dict[int, tuple] = {}
+    used = 0
+    for rank, pos, kind, text in sorted(candidates):
+        overhead = len(HEADERS.get(kind, kind.upper())) + 3
+        room = budget - used - overhead
+        if room <= len(TRUNCATED):
+            break
+        piece = _clip(text, room)
+        admitted[pos] = (kind, piece)
+        used += len(piece) + overhead
+        if piece is not text:
+            break
+
+    out: List[str] = []
+    last_kind = None
+    for pos in sorted(admitted):
+        kind, piece = admitted[pos]
+        if kind != last_kind:
+            out.append(f"\n{HEADERS.get(kind, kind.upper())}:")
+            last_kind = kind
+        out.append(f"- {piece}" if kind == "comment" else piece)
+    return "\n".join(out).strip()
+
+
+def build_sections(
+    summary: str,
+    description: str,
+    comments: List[Dict[str, Any]] = None,
+    tables: List[List[List[str]]] = None,
+) -> List[Section]:
+    """
+    comments: [{"author", "text", "created"}], kept newest first by `created`
+    (ISO timestamps / ClickUp epoch-ms strings both sort as text).
+    tables: rows of cells; `description` should not repeat them (ADFAnalysis.text_without_tables).
+    """
+    desc, ac = split_acceptance_criteria(description)
+    sections = [Section("summary", summary, RANK["summary"])]
+    if ac:
+        sections.append(Section("acceptance_criteria", ac, RANK["acceptance_criteria"]))
+    sections.append(Section("description", desc, RANK["description"]))
+    for table in tables or []:
+        rows = [" | ".join(cells) for cells in table if any(cells)]
+        if rows:
+            sections.append(Section("tables", "\n".join(rows), RANK["tables"]))
+
+    kept = [c for c in (comments or []) if not is_noise(c.get("text"))]
+    kept.sort(key=lambda c: str(c.get("created") or ""), reverse=True)
+    for order, c in enumerate(kept[:MAX_COMMENTS]):
+        text = c["text"].strip()
+        if len(text) > MAX_COMMENT_CHARS:
+            text = text[:MAX_COMMENT_CHARS] + TRUNCATED
+        sections.append(Section("comment", text, RANK["comment"] + order, c.get("author") or "User"))
+    return sections
+
+
+def pack_ticket(
+    summary: str,
+    description: str,
+    comments: List[Dict[str, Any]] = None,
+    tables: List[List[List[str]]] = None,
+    max_chars: int = None,
+) -> str:
+    return pack(build_sections(summary, description, comments, tables), max_chars)
+
+
+def jira_comments(raw: List[dict], to_text: Callable[[Any], str]) -> List[Dict[str, Any]]:
+    """Jira comment payloads -> [{"author", "text", "created"}]. `to_text` renders the ADF body."""
+    out = []
+    for c in raw or []:
+        body = c.get("body")
+        out.append({
+            "author": (c.get("author") or {}).get("displayName"),
+            "text": to_text(body) if isinstance(body, dict) else str(body or ""),
+            "created": c.get("created") or "",
+        })
+    return out
+
+
+def clickup_comments(comments_data: dict) -> List[Dict[str, Any]]:
+    """ClickUp /task/{id}/comment payload -> [{"author", "text", "created"}]."""
+    return [{
+        "author": (c.get("user") or {}).get("username"),
+        "text": c.get("comment_text") or "",
+        "created": str(c.get("date") or ""),
+    } for c in (comments_data or {}).get("comments", [])]
@@ -1,11 +1,13 @@
 # src/core/dedupe.py
 from __future__ import annotations
 import re, hashlib, logging
+from functools import partial
 from typing import List, Dict, Set, Tuple
 
 from . import jira as J
 from . import adf as A
 from . import gherkin as G
+from . import mirror as MR
 
 log = logging.getLogger(__name__)
 
@@ -26,13 +28,18 @@ def make_signature(title_norm: str, feature_text: str) -> str:
 # ------------------------
 # Reading linked tests
 # ------------------------
-def _group_linked_tests_by_signature(parent_key: str, project_key: str) -> Dict[str, List[Dict]]:
+def _group_linked_tests_by_signature(parent_key: str, project_key: str, mirror=None) -> Dict[str, List[Dict]]:
     """
     Reads all Tests linked to the parent and groups them by signature.
+    With a mirror (core.mirror.TestMirror; by default the configured one, see
+    mirror.ensure_synced) the buckets come from the local index instead of Jira.
     Returns {signature: [ {key, created, norm_title, feature, summary}, ... ] }
     """
+    mirror = mirror or MR.ensure_synced(project_key)
+    if mirror is not None:
+        return mirror.signature_buckets(parent_key, project_key)
     buckets: Dict[str, List[Dict]] = {}
-    for t in J.get_linked_test_issues(parent_key, project_key):
+    for t in J.iter_linked_test_issues(parent_key, project_key):
         full = (t.get("fields") or {}).get("summary", "")
         parts = [p.strip() for p in full.split("|")]
         raw_title = parts[-1] if parts else full                      # right of the last "|"
@@ -57,13 +64,13 @@ def _group_linked_tests_by_signature(parent_key: str, project_key: str) -> Dict[
 # ------------------------
 # Dedupe in-Jira
 # ------------------------
-def find_duplicates(parent_key: str, project_key: str, prefer: str = "newest") -> Tuple[List[Dict], List[Dict]]:
+def find_duplicates(parent_key: str, project_key: str, prefer: str = "newest", mirror=None) -> Tuple[List[Dict], List[Dict]]:
     """
     Returns (keep, drop) as lists of Test items.
     prefer: "newest" (default) or "oldest" to decide which one to keep.
     """
     keep, drop = [], []
-    buckets = _group_linked_tests_by_signature(parent_key, project_key)
+    buckets = _group_linked_tests_by_signature(parent_key, project_key, mirror=mirror)
 
     for sig, items in buckets.items():
         if len(items) == 1:
@@ -77,22 +84,26 @@ def find_duplicates(parent_key: str, project_key: str, prefer: str = "newest") -
         keep.append(keep_item); drop.extend(to_drop)
     return keep, drop
 
-def delete_issues(keys: List[str]) -> List[str]:
+def delete_issues(keys: List[str], max_workers: int = J.JIRA_WRITE_CONCURRENCY) -> List[str]:
+    """Deletes concurrently (bounded) and returns the keys actually deleted."""
+    out = J.run_concurrently([partial(J.delete_issue, k) for k in keys], max_workers=max_workers)
     deleted: List[str] = []
-    for k in keys:
-        try:
-            J.delete_issue(k)
+    for k, res in zip(keys, out["results"]):
+        if res.get("ok"):
             deleted.append(k)
-        except Exception as e:
-            log.warning(f"Could not delete {k}: {e}")
+        else:
+            log.warning(f"Could not delete {k}: {res.get('error')}")
     return deleted
 
-def dedupe_linked_tests(parent_key: str, project_key: str, prefer: str = "newest") -> Dict:
+def dedupe_linked_tests(parent_key: str, project_key: str, prefer: str = "newest", mirror=None) -> Dict:
     """
     Finds duplicates among the Tests linked to the parent and DELETES the extras.
     """
-    keep, drop = find_duplicates(parent_key, project_key, prefer=prefer)
+    mirror = mirror or MR.ensure_synced(project_key)
+    keep, drop = find_duplicates(parent_key, project_key, prefer=prefer, mirror=mirror)
     deleted = delete_issues([d["key"] for d in drop])
+    if mirror is not None:
+        mirror.remove(deleted)
     return {
         "kept":   [k["key"] for k in keep],
         "dropped": [d["key"] for d in drop],
@@ -100,6 +111,168 @@ def dedupe_linked_tests(parent_key: str, project_key: str, prefer: str = "newest
     }
 
 
+# ------------------------
+# Project-wide sweep
+# ------------------------
+def _split_keep_drop(items: List[Dict], prefer: str) -> Tuple[Dict, List[Dict]]:
+    items_sorted = sorted(items, key=lambda x: x["created"] or "")
+    if prefer == "oldest":
+        return items_sorted[0], items_sorted[1:]
+    return items_sorted[-1], items_sorted[:-1]
+
+def _project_parents(project_key: str, parent_jql: str = None) -> Dict[str, List[str]]:
+    """{parent_key: [linked keys]} for every non-Test issue of the project (paged)."""
+    jql = parent_jql or f'project = "{project_key}" AND issuetype != "Test"'
+    parents: Dict[str, List[str]] = {}
+    for issue in J.search_jql(jql, "issuelinks"):
+        linked = J._linked_keys_from_fields(issue.get("fields"))
+        if linked:
+            parents[issue["key"]] = linked
+    return parents
+
+def _content_key(norm_title: str, feature: str) -> str:
+    """
+    Parent-independent key: normalized title + steps_signature. The full feature
+    can't be used here because build_feature_single writes @KEY, "Feature: <summary>"
+    and "# Source: KEY" into it, so identical Tests under different parents never match.
+    """
+    steps = G.steps_signature(feature) or hashlib.sha1(_norm(feature).encode("utf-8")).hexdigest()
+    return hashlib.sha1(f"{_norm(norm_title)}|{steps}".encode("utf-8")).hexdigest()
+
+def _relink_pairs(group: Dict) -> List[Tuple[str, str]]:
+    """(kept Test, parent) links missing for the parents that only the dropped Tests covered."""
+    return [(group["keep"], p) for p in group["parents"] if p not in group["keep_parents"]]
+
+def _apply_sweep(duplicates: List[Dict], link_type: str, max_workers: int, mirror=None) -> Tuple[List[str], List[Dict], List[Dict]]:
+    """
+    Re-links the kept Test to every parent it inherits, then deletes the extras.
+    A group whose re-link fails is left untouched so no story loses its coverage.
+    Returns (deleted keys, links created, groups skipped).
+    """
+    pairs = [(g, pair) for g in duplicates for pair in _relink_pairs(g)]
+    out = J.run_concurrently(
+        [partial(J.link_issues, test, parent, link_type=link_type) for _, (test, parent) in pairs],
+        max_workers=max_workers,
+    )
+    relinked, broken = [], set()
+    for (group, (test, parent)), res in zip(pairs, out["results"]):
+        if res.get("ok"):
+            relinked.append({"test": test, "parent": parent})
+            if mirror is not None:
+                mirror.add_parent(test, parent)
+        else:
+            broken.add(group["keep"])
+            log.warning(f"Could not link {test} to {parent}; keeping its duplicates: {res.get('error')}")
+    skipped = [g for g in duplicates if g["keep"] in broken]
+    drop_keys = [k for g in duplicates if g["keep"] not in broken for k in g["drop"]]
+    deleted = delete_issues(drop_keys, max_workers=max_workers)
+    if mirror is not None:
+        mirror.remove(deleted)
+    return deleted, relinked, skipped
+
+def _sweep_entries_from_jira(project_key: str, parent_jql: str = None) -> Tuple[int, List[Dict]]:
+    """(parents scanned, [{key, created, summary, parents, norm_title, feature}]) read from Jira."""
+    parents = _project_parents(project_key, parent_jql)
+    test_parents: Dict[str, Set[str]] = {}
+    for parent, linked in parents.items():
+        for key in linked:
+            test_parents.setdefault(key, set()).add(parent)
+
+    entries = []
+    for t in J.search_issues_by_keys(
+        list(test_parents), fields="summary,created,description",
+        extra_jql=f'project = "{project_key}" AND issuetype = "Test"',
+    ):
+        fields = t.get("fields") or {}
+        full = fields.get("summary", "") or ""
+        owners = sorted(test_parents.get(t["key"], ()))
+        raw_title = [p.strip() for p in full.split("|")][-1]
+        blocks = A.adf_extract_codeblocks(fields.get("description"))
+        entries.append({
+            "key": t["key"], "created": fields.get("created") or "", "summary": full, "parents": owners,
+            "norm_title": G.sanitize_title(owners[0] if owners else "", raw_title),
+            "feature": "\n".join(blocks) if blocks else "",
+        })
+    return len(parents), entries
+
+def _sweep_entries_from_mirror(mirror, project_key: str) -> Tuple[int, List[Dict]]:
+    entries = [{
+        "key": t["key"], "created": t["created"] or "", "summary": t["summary"], "parents": t["parents"],
+        "norm_title": t["norm_title"], "feature": t["feature"],
+    } for t in mirror.project_tests(project_key) if t["parents"]]
+    return len({p for e in entries for p in e["parents"]}), entries
+
+def sweep_project(
+    project_key: str,
+    prefer: str = "newest",
+    dry_run: bool = True,
+    cross_parent: bool = True,
+    parent_jql: str = None,
+    max_workers: int = J.JIRA_WRITE_CONCURRENCY,
+    link_type: str = "Tests",
+    mirror=None,
+) -> Dict:
+    """
+    Finds duplicate Tests across every parent of a project. Tests match on the
+    normalized title + steps_signature; with cross_parent=True Tests linked to
+    different parents are grouped together. dry_run (default) only returns the
+    report; otherwise the kept Test is first linked to the parents of the dropped
+    ones and then the extras are deleted concurrently (bounded by max_workers).
+    With a synced mirror (the configured one by default) nothing is read from
+    Jira; a custom parent_jql always reads Jira.
+    """
+    mirror = mirror or (None if parent_jql else MR.ensure_synced(project_key))
+    if mirror is not None:
+        parents_scanned, entries = _sweep_entries_from_mirror(mirror, project_key)
+    else:
+        parents_scanned, entries = _sweep_entries_from_jira(project_key, parent_jql)
+
+    buckets: Dict[Tuple[str, ...], List[Dict]] = {}
+    for e in entries:
+        sig = _content_key(e["norm_title"], e["feature"])
+        entry = {"key": e["key"], "created": e["created"], "summary": e["summary"], "parents": e["parents"], "signature": sig}
+        groups = [(sig,)] if cross_parent else [(sig, p) for p in e["parents"]]
+        for group in groups:
+            buckets.setdefault(group, []).append(entry)
+
+    duplicates: List[Dict] = []
+    drop_keys: List[str] = []
+    for items in buckets.values():
+        unique = list({i["key"]: i for i in items}.values())
+        if len(unique) < 2:
+            continue
+        keep_item, to_drop = _split_keep_drop(unique, prefer)
+        to_drop = [d for d in to_drop if d["key"] not in drop_keys]
+        if not to_drop:
+            continue
+        drop_keys.extend(d["key"] for d in to_drop)
+        duplicates.append({
+            "signature": keep_item["signature"],
+            "keep": keep_item["key"],
+            "drop": [d["key"] for d in to_drop],
+            "parents": sorted({p for i in [keep_item, *to_drop] for p in i["parents"]}),
+            "keep_parents": keep_item["parents"],
+        })
+
+    report = {
+        "project": project_key,
+        "dry_run": dry_run,
+        "parents_scanned": parents_scanned,
+        "tests_scanned": len(entries),
+        "duplicate_groups": duplicates,
+        "to_delete": len(drop_keys),
+        "to_relink": sum(len(_relink_pairs(g)) for g in duplicates),
+        "deleted": [],
+        "relinked": [],
+        "skipped": [],
+    }
+    if not dry_run and drop_keys:
+        report["deleted"], report["relinked"], report["skipped"] = _apply_sweep(duplicates, link_type, max_workers, mirror)
+    log.info(f"Sweep {project_key}: {len(duplicates)} duplicate groups, "
+             f"{len(drop_keys)} extra Tests, {len(report['deleted'])} deleted.")
+    return report
+
+
 def normalize_text(s: str) -> str:
     return _norm(s)
 
@@ -0,0 +1,85 @@
+# src/core/disk_lru.py
+"""
+Helpers compartidos por las caches en disco (core.attachment_cache, core.llm_cache).
+
+- atomic_write(): escribe a un temporal y hace os.replace, así un lector nunca ve
+  un archivo a medias. Si la escritura falla, borra el temporal.
+- note_write(): lleva una estimación del tamaño de cada directorio de cache y
+  solo recorre el disco cuando la estimación supera el tope. Entonces borra por
+  orden LRU (mtime) hasta LOW_WATER del tope, para que las escrituras siguientes
+  no vuelvan a disparar un recorrido enseguida. Cada put cuesta O(1) y el
+  recorrido O(N) se amortiza entre muchas escrituras.
+"""
+import os
+import tempfile
+import threading
+from typing import Dict, List, Tuple
+
+LOW_WATER = 0.9
+
+_LOCK = threading.Lock()
+_SIZES: Dict[str, int] = {}
+
+
+def atomic_write(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)  # si no, queda un temporal huérfano en la cache
+        except OSError:
+            pass
+        raise
+
+
+def _scan(root: str) -> List[Tuple[float, int, str]]:
+    entries = []
+    for dirpath, _, files in os.walk(root):
+        for name in files:
+            path = os.path.join(dirpath, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+    return entries
+
+
+def _evict_locked(root: str, limit: int, target: int) -> int:
+    entries = _scan(root)
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    if total > limit:
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                removed += 1
+            except OSError:
+                pass
+    _SIZES[root] = total
+    return removed
+
+
+def evict(root: str, max_bytes: int) -> int:
+    """Borra archivos de `root` por orden LRU hasta quedar bajo `max_bytes`. Devuelve cuántos borró."""
+    with _LOCK:
+        return _evict_locked(root, max_bytes, max_bytes)
+
+
+def note_write(root: str, nbytes: int, max_bytes: int) -> int:
+    """Registra `nbytes` nuevos en `root`; desaloja solo si la estimación pasa el tope."""
+    with _LOCK:
+        if root not in _SIZES:
+            _SIZES[root] = sum(size for _, size, _ in _scan(root))  # primera escritura del proceso
+        else:
+            _SIZES[root] += nbytes
+        if _SIZES[root] <= max_bytes:
+            return 0
+        return _evict_locked(root, max_bytes, int(max_bytes * LOW_WATER))
@@ -0,0 +1,179 @@
+# src/core/doc_windows.py
+"""
+Extracción por ventanas de páginas para documentos grandes.
+
+Un manual de cientos de páginas en un solo request choca con el límite de
+salida de Gemini (la lista de tests se corta) y tarda mucho. Acá el PDF se
+parte en ventanas de N páginas (--window-pages o DOCS_WINDOW_PAGES; con DOCS_WINDOW_OVERLAP de
+solape, para las reglas que cruzan un salto de página), cada ventana se
+extrae en paralelo (DOCS_WINDOW_CONCURRENCY) y se reintenta por separado
+(DOCS_WINDOW_RETRIES) si falla. Los 429/5xx ya los reintenta core.usage, así
+que acá solo se reintentan los demás errores (timeouts, JSON roto): cada error
+tiene una sola capa de reintentos. Las ventanas se recortan a medida que los
+workers se liberan, nunca todas de una. Los resultados se unen y se deduplican
+con las firmas de core.gherkin / core.matching.
+
+Partir el PDF requiere `pypdf` (import perezoso: solo se pide en este modo).
+"""
+from __future__ import annotations
+import io
+import os
+import time
+import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+from . import gherkin as G
+from . import matching as M
+from . import usage as U
+
+log = logging.getLogger(__name__)
+
+WINDOW_PAGES = int(os.getenv("DOCS_WINDOW_PAGES", "0"))  # 0 = el PDF entero en un solo request
+DEFAULT_WINDOW_PAGES = 10
+WINDOW_OVERLAP = int(os.getenv("DOCS_WINDOW_OVERLAP", "1"))
+WINDOW_CONCURRENCY = int(os.getenv("DOCS_WINDOW_CONCURRENCY", "4"))
+WINDOW_RETRIES = int(os.getenv("DOCS_WINDOW_RETRIES", "2"))
+WINDOW_BACKOFF = float(os.getenv("DOCS_WINDOW_BACKOFF", "2.0"))
+
+
+@dataclass
+class Window:
+    """Páginas [start, end) del documento (0-based) y el PDF recortado a esas páginas."""
+    start: int
+    end: int
+    data: bytes = b""
+
+    @property
+    def label(self) -> str:
+        return f"pages {self.start + 1}-{self.end}"
+
+
+@dataclass
+class WindowRun:
+    tests: List[Dict[str, Any]] = field(default_factory=list)
+    failed: List[Tuple[Window, str]] = field(default_factory=list)
+    raw_count: int = 0
+
+
+def page_windows(n_pages: int, size: int = None, overlap: int = None) -> List[Tuple[int, int]]:
+    """Rangos [start, end) que cubren n_pages con ventanas de `size` y `overlap` páginas de solape."""
+    size = max(1, size or WINDOW_PAGES or DEFAULT_WINDOW_PAGES)
+    overlap = min(max(0, WINDOW_OVERLAP if overlap is None else overlap), size - 1)
+    ranges, start = [], 0
+    while start < n_pages:
+        end = min(start + size, n_pages)
+        ranges.append((start, end))
+        if end == n_pages:
+            break
+        start = end - overlap
+    return ranges
+
+
+def split_pdf(pdf_path: str, size: int = None, overlap: int = None) -> Tuple[int, Iterator[Window]]:
+    """
+    (total de páginas, generador de ventanas con el PDF de cada una). Cada ventana
+    se arma recién cuando se la pide, así en memoria solo están las que están en vuelo.
+    """
+    try:
+        from pypdf import PdfReader, PdfWriter
+    except ImportError as e:
+        raise RuntimeError("El modo por ventanas necesita pypdf: pip install pypdf") from e
+
+    reader = PdfReader(pdf_path)
+    n_pages = len(reader.pages)
+
+    def windows() -> Iterator[Window]:
+        for start, end in page_windows(n_pages, size, overlap):
+            writer, buf = PdfWriter(), io.BytesIO()
+            for i in range(start, end):
+                writer.add_page(reader.pages[i])
+            writer.write(buf)
+            yield Window(start, end, buf.getvalue())
+
+    return n_pages, windows()
+
+
+def _identity(test: Dict[str, Any]) -> Tuple[str, str]:
+    """(firma de steps, título normalizado) de un test."""
+    steps = test.get("steps", "")
+    steps = "\n".join(steps) if isinstance(steps, list) else str(steps or "")
+    return G.steps_signature(steps), M.normalize_title(test.get("title", ""))
+
+
+def merge_tests(batches: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Une los tests de cada ventana, en orden de página, descartando los repetidos por
+    el solape. Duplicado = misma firma de steps; el título solo decide cuando el test
+    no tiene steps (dos ventanas pueden traer tests distintos con el mismo título).
+    """
+    seen_steps, seen_titles, merged = set(), set(), []
+    for batch in batches:
+        for test in batch:
+            steps_sig, title = _identity(test)
+            key, seen = (steps_sig, seen_steps) if steps_sig else (title, seen_titles)
+            if key and key in seen:
+                continue
+            if key: seen.add(key)
+            merged.append(test)
+    return merged
+
+
+def _run_one(window: Window, extract: Callable[[Window], List[Dict[str, Any]]], retries: int) -> List[Dict[str, Any]]:
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            return extract(window)
+        except Exception as e:
+            if attempt > retries or U.retryable(e):  # los 429/5xx ya se reintentaron en U.generate
+                raise
+            delay = WINDOW_BACKOFF * (2 ** (attempt - 1))
+            log.warning(f"Ventana {window.label} falló ({e}); reintento {attempt}/{retries} en {delay:.0f}s")
+            time.sleep(delay)
+
+
+def run_windows(
+    windows: Iterable[Window],
+    extract: Callable[[Window], List[Dict[str, Any]]],
+    concurrency: int = None,
+    retries: int = None,
+) -> WindowRun:
+    """
+    Llama extract(window) para cada ventana con a lo sumo `concurrency` en vuelo.
+    `windows` se consume de a una a medida que se libera un worker. Cada ventana
+    se reintenta sola; las que agotan los reintentos quedan en `failed` y el
+    resto del documento igual se entrega.
+    """
+    retries = WINDOW_RETRIES if retries is None else retries
+    workers = max(1, concurrency or WINDOW_CONCURRENCY)
+    pending = enumerate(windows)
+    results: Dict[int, List[Dict[str, Any]]] = {}
+    run = WindowRun()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        in_flight: Dict[Any, Tuple[int, Window]] = {}
+
+        def submit_next() -> None:
+            nxt = next(pending, None)
+            if nxt is not None:
+                in_flight[pool.submit(_run_one, nxt[1], extract, retries)] = nxt
+
+        for _ in range(workers):
+            submit_next()
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for fut in done:
+                i, window = in_flight.pop(fut)
+                try:
+                    results[i] = fut.result()
+                    log.info(f"Ventana {window.label}: {len(results[i])} tests")
+                except Exception as e:
+                    log.error(f"Ventana {window.label} sin resultado: {e}")
+                    run.failed.append((window, str(e)))
+                submit_next()
+    batches = [results[i] for i in sorted(results)]
+    run.raw_count = sum(len(b) for b in batches)
+    run.tests = merge_tests(batches)
+    run.failed.sort(key=lambda f: f[0].start)
+    return run
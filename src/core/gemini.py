@@ -0,0 +1,77 @@
+# src/core/gemini.py
+"""
+Cliente de Gemini compartido por todo el proceso.
+
+El SDK (google-genai) se importa recién en el primer get_client(), así que
+importar core.llm, jt o el bot no paga ese costo. El cliente se crea una sola
+vez (thread-safe) y se reutiliza, con su pool de conexiones, en cada llamada.
+
+Credenciales: GOOGLE_API_KEY (AI Studio) o GOOGLE_CLOUD_PROJECT_ID +
+GOOGLE_CLOUD_REGION (Vertex AI). Sin ninguna, get_client() devuelve None.
+Con LLM_PROVIDER=stub|replay|record|local se usa un backend de core.providers
+con la misma interfaz (pruebas de carga y benchmarks sin red).
+"""
+import os
+import logging
+import threading
+from typing import Any, Optional
+
+log = logging.getLogger(__name__)
+
+_LOCK = threading.Lock()
+_CLIENT: Optional[Any] = None
+_PROVIDER = "unknown"
+_INITIALIZED = False
+
+
+def _build_google():
+    api_key = os.getenv("GOOGLE_API_KEY")
+    project_id = os.getenv("GOOGLE_CLOUD_PROJECT_ID")
+    location = os.getenv("GOOGLE_CLOUD_REGION", "us-central1")
+    if not (api_key or project_id):
+        log.warning("No hay credenciales de IA configuradas en el .env")
+        return None, "unknown"
+    from google import genai
+    if api_key:
+        return genai.Client(api_key=api_key), "google-ai-studio"
+    return genai.Client(vertexai=True, project=project_id, location=location), "vertex-ai"
+
+
+def _build():
+    """Cliente según LLM_PROVIDER (ver core.providers); por defecto Google."""
+    provider = os.getenv("LLM_PROVIDER", "google").strip().lower()
+    if provider in ("", "google"):
+        return _build_google()
+    from . import providers as P
+    google_client = _build_google()[0] if provider == "record" else None
+    backend = P.build(provider, google_client)
+    log.info(f"LLM provider: {backend.name}")
+    return backend, backend.name
+
+
+def get_client() -> Optional[Any]:
+    """genai.Client compartido, creado en el primer uso. None si no hay credenciales."""
+    global _CLIENT, _PROVIDER, _INITIALIZED
+    if _INITIALIZED:
+        return _CLIENT
+    with _LOCK:
+        if not _INITIALIZED:
+            try:
+                _CLIENT, _PROVIDER = _build()
+            except Exception as e:
+                log.error(f"Faltan librerías o credenciales de IA: {e}")
+                _CLIENT, _PROVIDER = None, "unknown"
+            _INITIALIZED = True
+    return _CLIENT
+
+
+def provider_name() -> str:
+    get_client()
+    return _PROVIDER
+
+
+def reset_client() -> None:
+    """Olvida el cliente (p. ej. después de cambiar credenciales en runtime)."""
+    global _CLIENT, _PROVIDER, _INITIALIZED
+    with _LOCK:
+        _CLIENT, _PROVIDER, _INITIALIZED = None, "unknown", False
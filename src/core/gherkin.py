@@ -43,8 +43,8 @@ def make_signature(title: str, feature_text: str) -> str:
     payload = (_norm_gherkin(title) + "|" + _norm_gherkin(feature_text)).encode("utf-8")
     return hashlib.sha1(payload).hexdigest()
 
-def steps_signature(steps: str) -> str:
-    """Signature based only on steps (useful for comparing content)."""
+def normalize_steps(steps: str) -> str:
+    """Only the Given/When/Then/And/But lines, lowercased, digits as '#', joined with ' | '."""
     STEP_RX = re.compile(r"^\s*(Given|When|Then|And|But)\b", re.IGNORECASE)
     lines = []
     for raw in (steps or "").splitlines():
@@ -55,5 +55,11 @@ def steps_signature(steps: str) -> str:
     t = " | ".join(lines)
     t = re.sub(r"\d+", "#", t)
     t = re.sub(r"[^a-z#\s|]+", "", t)
-    t = re.sub(r"\s+", " ", t).strip()
+    return re.sub(r"\s+", " ", t).strip()
+
+def steps_signature(steps: str) -> str:
+    """Signature based only on steps (useful for comparing content); "" when there are no step lines."""
+    t = normalize_steps(steps)
+    if not t:
+        return ""
     return hashlib.md5(t.encode("utf-8")).hexdigest()
\ No newline at end of file
@@ -0,0 +1,95 @@
+# src/core/http.py
+"""Shared HTTP transport: pooled sessions, rate limiting and Retry-After backoff."""
+import time
+import threading
+import email.utils
+from typing import Mapping, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def build_session(pool_size: int = 10, headers: Optional[dict] = None) -> requests.Session:
+    """Session con keep-alive y un pool de conexiones de tamaño `pool_size` por host."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if headers:
+        session.headers.update(headers)
+    return session
+
+
+def _to_float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    Token bucket thread-safe. Se rellena a `rate` tokens/seg hasta `capacity`
+    y se ajusta con los headers X-RateLimit-* que devuelve la API.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = max(rate, 0.001)
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        """Consume un token y devuelve cuántos segundos hay que esperar antes de usarlo."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            wait = 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+            return max(wait, self._blocked_until - now)
+
+    def acquire(self) -> None:
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    def update_from_headers(self, headers: Mapping[str, str]) -> None:
+        """Sincroniza el bucket con X-RateLimit-Remaining / X-RateLimit-Reset (epoch en segundos)."""
+        remaining = _to_float((headers or {}).get("X-RateLimit-Remaining"))
+        if remaining is None:
+            return
+        reset = _to_float((headers or {}).get("X-RateLimit-Reset"))
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens = min(self._tokens, remaining)
+            if remaining <= 0 and reset is not None:
+                self._blocked_until = max(self._blocked_until, now + max(reset - time.time(), 0.0))
+
+
+def retry_after_seconds(resp: requests.Response, default: float) -> float:
+    """
+    Segundos a esperar antes de reintentar: Retry-After (segundos o fecha HTTP),
+    luego X-RateLimit-Reset (epoch) y, si no hay nada, `default`.
+    """
+    headers = getattr(resp, "headers", None) or {}
+    retry_after = headers.get("Retry-After")
+    if retry_after:
+        seconds = _to_float(retry_after)
+        if seconds is None:
+            try:
+                seconds = email.utils.parsedate_to_datetime(retry_after).timestamp() - time.time()
+            except (TypeError, ValueError):
+                seconds = None
+        if seconds is not None:
+            return max(seconds, 0.0)
+    reset = _to_float(headers.get("X-RateLimit-Reset"))
+    if reset is not None:
+        return max(reset - time.time(), 0.0)
+    return default
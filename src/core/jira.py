@@ -1,18 +1,25 @@
 # src/core/jira.py
-import os
 import json
 import base64
 import re
 import time
 import logging
+import threading
 from random import random
-from typing import Dict, List, Any
+from typing import Callable, Dict, Iterator, List, Any, Optional
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
 
 import requests
 
-from .config import JIRA_URL, JIRA_USER, JIRA_API_TOKEN, RELATES_LINK_TYPE
-from .adf import adf_to_text, adf_with_code_block, plain_to_adf
+from .config import (
+    JIRA_URL, JIRA_USER, JIRA_API_TOKEN, RELATES_LINK_TYPE,
+    JIRA_MAX_RETRIES, JIRA_BACKOFF, JIRA_POOL_SIZE, JIRA_WRITE_CONCURRENCY,
+    JIRA_READ_CONCURRENCY,
+)
+from . import http as H
+from .adf import ADFAnalysis, adf_with_code_block, analyze_adf, plain_to_adf
 from .gherkin import make_signature, sanitize_title
 
 log = logging.getLogger(__name__)
@@ -25,6 +32,74 @@ def _auth_header() -> str:
     ).decode("utf-8")
 
 
+_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class JiraSession:
+    """
+    Long-lived Jira Cloud client: one keep-alive connection pool, auth header
+    computed once, and retries that honor Retry-After on 429/5xx.
+    """
+
+    def __init__(self, base_url: str, pool_size: int = JIRA_POOL_SIZE,
+                 max_retries: int = JIRA_MAX_RETRIES, backoff: float = JIRA_BACKOFF):
+        self.base_url = (base_url or "").rstrip("/")
+        self.max_retries = max(1, max_retries)
+        self.backoff = backoff
+        self.session = H.build_session(pool_size=pool_size, headers={
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip, deflate",
+            "Content-Type": "application/json",
+            "Authorization": _auth_header(),
+        })
+
+    def _fallback_wait(self, attempt: int) -> float:
+        return self.backoff * attempt + random() * 0.2
+
+    def request(self, path: str, params: dict = None, method: str = "GET", body: dict = None) -> dict:
+        url = f"{self.base_url}{path}"
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                resp = self.session.request(
+                    method,
+                    url,
+                    params=params,
+                    data=(json.dumps(body) if body else None),
+                    timeout=30,
+                )
+                if resp.status_code in _RETRY_STATUSES:
+                    if attempt < self.max_retries:
+                        sleep_for = H.retry_after_seconds(resp, default=self._fallback_wait(attempt))
+                        log.warning(f"Jira HTTP {resp.status_code} (attempt {attempt}/{self.max_retries}), retrying in {sleep_for:.1f}s")
+                        time.sleep(sleep_for)
+                        continue
+                    raise requests.exceptions.RequestException(
+                        f"HTTP {resp.status_code}: {resp.text[:200]}"
+                    )
+                resp.raise_for_status()
+                return resp.json() if resp.status_code != 204 and resp.text else {}
+            except requests.exceptions.RequestException as e:
+                log.warning(f"Jira request failed (attempt {attempt}/{self.max_retries}): {e}")
+                if attempt == self.max_retries:
+                    log.error(f"Jira API request failed permanently: {e}")
+                    raise
+                time.sleep(self._fallback_wait(attempt))
+
+
+_SESSION: Optional[JiraSession] = None
+_SESSION_LOCK = threading.Lock()
+
+
+def get_session() -> JiraSession:
+    """Shared JiraSession used by every helper in this module."""
+    global _SESSION
+    if _SESSION is None:
+        with _SESSION_LOCK:
+            if _SESSION is None:
+                _SESSION = JiraSession(JIRA_URL)
+    return _SESSION
+
+
 def jira_request(
     path: str,
     params: dict = None,
@@ -32,87 +107,63 @@ def jira_request(
     body: dict = None
 ) -> dict:
     """
-    Wrapper for Jira Cloud requests with a small backoff for 429/5xx errors.
+    Wrapper for Jira Cloud requests over the shared pooled session.
     Returns {} if there is no body. Raises exception on definitive error.
     """
-    url = f"{JIRA_URL.rstrip('/')}{path}"
-    headers = {
-        "Accept": "application/json",
-        "Content-Type": "application/json",
-        "Authorization": _auth_header(),
+    return get_session().request(path, params=params, method=method, body=body)
+
+
+ISSUE_FIELDS = "summary,description,labels,issuetype,parent,comment"
+
+
+def _issue_result(issue_key: str, data: dict, doc: Callable[[Any], ADFAnalysis] = analyze_adf) -> dict:
+    """`doc` turns an ADF document into its analysis (IssueSnapshot.doc memoizes it per document)."""
+    fields = data.get("fields", {}) or {}
+    summary = fields.get("summary", "") or ""
+
+    desc_raw = fields.get("description")
+    desc_doc = doc(desc_raw) if isinstance(desc_raw, dict) else None
+    desc_text = desc_doc.text if desc_doc else (desc_raw or "")
+
+    comments_raw = (fields.get("comment") or {}).get("comments", []) or []
+    comments_text: List[str] = []
+    for comment in comments_raw:
+        author = (comment.get("author") or {}).get("displayName", "Unknown")
+        body_adf = comment.get("body")
+        comment_content = doc(body_adf).text if isinstance(body_adf, dict) else (body_adf or "")
+        if comment_content:
+            comments_text.append(f"Comment from {author}:\n{comment_content}")
+
+    all_comments_str = "\n\n---\n\n".join(comments_text)
+    log.info(f"Read {issue_key}: '{summary[:50]}...'")
+
+    return {
+        "ok": True,
+        "key": issue_key,
+        "summary": summary,
+        "description": desc_text,
+        "comments": all_comments_str,
+        "full_context": f"DESCRIPTION:\n{desc_text}\n\nCOMMENTS:\n{all_comments_str}",
+        "description_adf": desc_raw,
+        "description_tables": desc_doc.tables if desc_doc else [],
+        "description_without_tables": desc_doc.text_without_tables if desc_doc else desc_text,
+        "labels": fields.get("labels", []) or [],
     }
 
-    max_retries = int(os.getenv("JIRA_MAX_RETRIES", "3"))
-    backoff = float(os.getenv("JIRA_BACKOFF", "0.6"))
-
-    for attempt in range(1, max_retries + 1):
-        try:
-            resp = requests.request(
-                method,
-                url,
-                headers=headers,
-                params=params,
-                data=(json.dumps(body) if body else None),
-                timeout=30,
-            )
-            # Retry on 429/5xx
-            if resp.status_code in (429, 500, 502, 503, 504):
-                raise requests.exceptions.RequestException(
-                    f"HTTP {resp.status_code}: {resp.text[:200]}"
-                )
-            resp.raise_for_status()
-            return resp.json() if resp.status_code != 204 and resp.text else {}
-        except requests.exceptions.RequestException as e:
-            log.warning(f"Jira request failed (attempt {attempt}/{max_retries}): {e}")
-            if attempt == max_retries:
-                log.error(f"Jira API request failed permanently: {e}")
-                raise
-            sleep_for = backoff * attempt + random() * 0.2
-            time.sleep(sleep_for)
-
 
 def get_issue(issue_key: str) -> dict:
     """
     Gets the details of an issue, including its description and a text block with comments.
     """
     try:
-        fields_to_get = "summary,description,labels,issuetype,parent,comment"
-        data = jira_request(f"/rest/api/3/issue/{issue_key}", params={"fields": fields_to_get})
-
-        fields = data.get("fields", {}) or {}
-        summary = fields.get("summary", "") or ""
-
-        desc_raw = fields.get("description")
-        desc_text = adf_to_text(desc_raw) if isinstance(desc_raw, dict) else (desc_raw or "")
-
-        comments_raw = (fields.get("comment") or {}).get("comments", []) or []
-        comments_text: List[str] = []
-        for comment in comments_raw:
-            author = (comment.get("author") or {}).get("displayName", "Unknown")
-            body_adf = comment.get("body")
-            comment_content = adf_to_text(body_adf) if isinstance(body_adf, dict) else (body_adf or "")
-            if comment_content:
-                comments_text.append(f"Comment from {author}:\n{comment_content}")
-
-        all_comments_str = "\n\n---\n\n".join(comments_text)
-        log.info(f"Read {issue_key}: '{summary[:50]}...'")
-
-        return {
-            "ok": True,
-            "key": issue_key,
-            "summary": summary,
-            "description": desc_text,
-            "comments": all_comments_str,
-            "full_context": f"DESCRIPTION:\n{desc_text}\n\nCOMMENTS:\n{all_comments_str}",
-            "description_adf": desc_raw,
-            "labels": fields.get("labels", []) or [],
-        }
+        data = jira_request(f"/rest/api/3/issue/{issue_key}", params={"fields": ISSUE_FIELDS})
+        return _issue_result(issue_key, data)
     except Exception as e:
         log.error(f"Could not read issue {issue_key}: {e}")
         return {"ok": False, "error": str(e)}
 
 
-def create_test_issue(
+def _test_issue_fields(
     project_key: str,
     summary: str,
     description_text: str = "",
@@ -120,20 +171,69 @@ def create_test_issue(
     labels: List[str] = None,
 ) -> dict:
     adf_desc = adf_with_code_block("Steps (Gherkin)", gherkin) if gherkin else plain_to_adf(description_text)
-    body = {
-        "fields": {
-            "project": {"key": project_key},
-            "summary": summary,
-            "issuetype": {"name": "Test"},
-            "labels": labels or ["mcp", "auto-generated"],
-            "description": adf_desc,
-        }
+    return {
+        "project": {"key": project_key},
+        "summary": summary,
+        "issuetype": {"name": "Test"},
+        "labels": labels or ["mcp", "auto-generated"],
+        "description": adf_desc,
     }
+
+
+def create_test_issue(
+    project_key: str,
+    summary: str,
+    description_text: str = "",
+    gherkin: str = "",
+    labels: List[str] = None,
+) -> dict:
+    body = {"fields": _test_issue_fields(project_key, summary, description_text, gherkin, labels)}
     data = jira_request("/rest/api/3/issue", method="POST", body=body)
     log.info(f"Created Test Case: {data['key']}")
     return {"ok": True, "key": data["key"], "self": data.get("self")}
 
 
+BULK_CREATE_LIMIT = 50
+
+
+def _bulk_error_message(error: dict) -> str:
+    element = error.get("elementErrors") or {}
+    messages = list(element.get("errorMessages") or []) + [f"{k}: {v}" for k, v in (element.get("errors") or {}).items()]
+    return "; ".join(messages) or f"HTTP {error.get('status')}"
+
+
+def create_test_issues_bulk(project_key: str, items: List[Dict[str, Any]]) -> List[dict]:
+    """
+    Creates Tests through /rest/api/3/issue/bulk (up to 50 per call).
+    Each item takes the create_test_issue kwargs (summary, description_text, gherkin, labels).
+    Returns one result per item, in input order: {"ok": True, "key", "self"} or {"ok": False, "error"}.
+    """
+    results: List[dict] = []
+    for start in range(0, len(items), BULK_CREATE_LIMIT):
+        batch = items[start:start + BULK_CREATE_LIMIT]
+        body = {"issueUpdates": [{"fields": _test_issue_fields(project_key, **item)} for item in batch]}
+        try:
+            data = jira_request("/rest/api/3/issue/bulk", method="POST", body=body)
+        except Exception as e:
+            log.error(f"Bulk create failed for items {start}-{start + len(batch) - 1}: {e}")
+            results.extend({"ok": False, "error": str(e)} for _ in batch)
+            continue
+        # Jira returns created issues in request order, skipping the failed elements.
+        failed = {err.get("failedElementNumber"): _bulk_error_message(err) for err in data.get("errors") or []}
+        created = iter(data.get("issues") or [])
+        for i in range(len(batch)):
+            if i in failed:
+                results.append({"ok": False, "error": failed[i]})
+                continue
+            issue = next(created, None)
+            if issue is None:
+                results.append({"ok": False, "error": "Missing issue in bulk response"})
+            else:
+                results.append({"ok": True, "key": issue["key"], "self": issue.get("self")})
+        log.info(f"Bulk created {len(batch) - len(failed)}/{len(batch)} Test Cases.")
+    return results
+
+
 def update_test_issue(issue_key: str, new_summary: str, new_gherkin: str) -> dict:
     log.info(f"Updating issue {issue_key} with new title: {new_summary}")
     new_adf_desc = adf_with_code_block("Steps (Gherkin)", new_gherkin)
@@ -149,33 +249,82 @@ def add_labels_to_issue(issue_key: str, labels_to_add: List[str]) -> dict:
     return {"ok": True, "labeled_key": issue_key}
 
 
+def _linked_keys_from_fields(fields: dict) -> List[str]:
+    linked_keys: List[str] = []
+    for link in (fields or {}).get("issuelinks", []) or []:
+        if "outwardIssue" in link:
+            linked_keys.append(link["outwardIssue"]["key"])
+        elif "inwardIssue" in link:
+            linked_keys.append(link["inwardIssue"]["key"])
+    return linked_keys
+
+
 def _get_linked_issue_keys(parent_key: str) -> List[str]:
     try:
         data = jira_request(f"/rest/api/3/issue/{parent_key}", params={"fields": "issuelinks"})
-        issue_links = (data.get("fields") or {}).get("issuelinks", []) or []
-        linked_keys: List[str] = []
-        for link in issue_links:
-            if "outwardIssue" in link:
-                linked_keys.append(link["outwardIssue"]["key"])
-            elif "inwardIssue" in link:
-                linked_keys.append(link["inwardIssue"]["key"])
-        return linked_keys
+        return _linked_keys_from_fields(data.get("fields"))
     except Exception:
         return []
 
 
+SEARCH_PAGE_SIZE = 100
+SEARCH_KEY_CHUNK = 50
+
+
+def search_jql(jql: str, fields: str, page_size: int = SEARCH_PAGE_SIZE) -> Iterator[Dict[str, Any]]:
+    """Yields every issue matching `jql`, following nextPageToken until the last page."""
+    params = {"jql": jql, "fields": fields, "maxResults": page_size}
+    while True:
+        data = jira_request("/rest/api/3/search/jql", params=params)
+        yield from data.get("issues", []) or []
+        token = data.get("nextPageToken")
+        if data.get("isLast", True) or not token:
+            return
+        params = {**params, "nextPageToken": token}
+
+
+def search_issues_by_keys(
+    keys: List[str],
+    fields: str,
+    extra_jql: str = "",
+    chunk_size: int = SEARCH_KEY_CHUNK,
+    max_workers: int = JIRA_READ_CONCURRENCY,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Streams issues for an arbitrary list of keys. Keys are split into `key in (...)`
+    chunks so the URL stays bounded; chunks run in parallel and each one is paginated.
+    Issues are yielded as their chunk completes.
+    """
+    keys = list(dict.fromkeys(k for k in keys if k))
+    if not keys:
+        return
+    chunks = [keys[i:i + chunk_size] for i in range(0, len(keys), chunk_size)]
+    suffix = f" AND {extra_jql}" if extra_jql else ""
+
+    def _run(chunk: List[str]) -> List[Dict[str, Any]]:
+        return list(search_jql(f'key in ({",".join(chunk)}){suffix}', fields))
+
+    if len(chunks) == 1:
+        yield from _run(chunks[0])
+        return
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as pool:
+        for future in as_completed([pool.submit(_run, chunk) for chunk in chunks]):
+            yield from future.result()
+
+
+def iter_linked_test_issues(parent_key: str, project_key: str) -> Iterator[Dict[str, Any]]:
+    return search_issues_by_keys(
+        _get_linked_issue_keys(parent_key),
+        fields="summary,created,description",
+        extra_jql=f'project = "{project_key}" AND issuetype = "Test"',
+    )
+
+
 def get_linked_test_issues(parent_key: str, project_key: str) -> List[Dict[str, Any]]:
-    linked_keys = _get_linked_issue_keys(parent_key)
-    if not linked_keys:
-        return []
-    jql = f'key in ({",".join(linked_keys)}) AND project = "{project_key}" AND issuetype = "Test"'
-    fields = "summary,created,description"
-    data = jira_request("/rest/api/3/search/jql", params={"jql": jql, "fields": fields, "maxResults": 100})
-    return data.get("issues", []) or []
+    return list(iter_linked_test_issues(parent_key, project_key))
 
 
-def next_tc_index(parent_key: str, project_key: str) -> int:
-    issues = get_linked_test_issues(parent_key, project_key)
+def _max_tc_index(issues) -> int:
     max_tc = 0
     for issue in issues:
         summary = (issue.get("fields") or {}).get("summary", "") or ""
@@ -185,30 +334,46 @@ def next_tc_index(parent_key: str, project_key: str) -> int:
     return max_tc + 1
 
 
-def get_existing_tests_with_details(issue_key: str, project_key: str) -> List[Dict[str, Any]]:
+def next_tc_index(parent_key: str, project_key: str, mirror=None) -> int:
+    """With a synced mirror (core.mirror) this is a local indexed query."""
+    if mirror is not None:
+        return mirror.next_tc_index(parent_key, project_key)
+    return _max_tc_index(iter_linked_test_issues(parent_key, project_key))
+
+
+def _test_details(issue_key: str, issue: dict) -> Dict[str, Any]:
+    issue_fields = issue.get("fields") or {}
+    summary = issue_fields.get("summary", "") or ""
+    description_adf = issue_fields.get("description")
+    if isinstance(description_adf, dict):
+        # El feature vive en el code block; el texto plano solo tiene el heading.
+        doc = analyze_adf(description_adf)
+        gherkin_content = "\n".join(doc.codeblocks()) or doc.text
+    else:
+        gherkin_content = description_adf or ""
+    norm = sanitize_title(issue_key, summary)
+    return {
+        "key": issue.get("key"),
+        "summary": summary,
+        "gherkin": gherkin_content,
+        "signature": make_signature(norm, gherkin_content),
+        "norm_title": norm,
+    }
+
+
+def get_existing_tests_with_details(issue_key: str, project_key: str, mirror=None) -> List[Dict[str, Any]]:
+    if mirror is not None:
+        return mirror.existing_tests_with_details(issue_key)
     log.info(f"Searching for existing tests with details for {issue_key}...")
     linked_keys = _get_linked_issue_keys(issue_key)
     if not linked_keys:
         log.info(f"No existing tests found for {issue_key}.")
         return []
     try:
-        jql = f'key in ({",".join(linked_keys)}) AND issuetype = "Test"'
-        fields = "summary,description"
-        data = jira_request("/rest/api/3/search/jql", params={"jql": jql, "fields": fields, "maxResults": 100})
-        tests_with_details: List[Dict[str, Any]] = []
-        for issue in data.get("issues", []) or []:
-            issue_fields = issue.get("fields") or {}
-            summary = issue_fields.get("summary", "") or ""
-            description_adf = issue_fields.get("description")
-            gherkin_content = adf_to_text(description_adf) if isinstance(description_adf, dict) else (description_adf or "")
-            norm = sanitize_title(issue_key, summary)
-            tests_with_details.append({
-                "key": issue.get("key"),
-                "summary": summary,
-                "gherkin": gherkin_content,
-                "signature": make_signature(norm, gherkin_content),
-                "norm_title": norm,
-            })
+        tests_with_details = [
+            _test_details(issue_key, issue)
+            for issue in search_issues_by_keys(linked_keys, fields="summary,description", extra_jql='issuetype = "Test"')
+        ]
         log.info(f"Found {len(tests_with_details)} existing tests for {issue_key}.")
         return tests_with_details
     except Exception as e:
@@ -216,12 +381,133 @@ def get_existing_tests_with_details(issue_key: str, project_key: str) -> List[Di
         return []
 
 
+class IssueSnapshot:
+    """
+    Request-scoped unit of work for one source issue. The issue (with comments and
+    links) and its linked Tests are read once; every later read is served from memory.
+    With a synced mirror (core.mirror.ensure_synced) the linked Tests come from it
+    and are never fetched from Jira.
+    """
+
+    def __init__(self, issue_key: str, project_key: str, mirror=None):
+        self.issue_key = issue_key
+        self.project_key = project_key
+        self.mirror = mirror
+        self._data: Optional[dict] = None
+        self._comments: Optional[List[dict]] = None
+        self._linked_tests: Optional[List[Dict[str, Any]]] = None
+        self._docs: Dict[int, tuple] = {}
+
+    def doc(self, adf: Any) -> ADFAnalysis:
+        """One ADFAnalysis per document: the description and comments are parsed once per run."""
+        hit = self._docs.get(id(adf))
+        if hit is None or hit[0] is not adf:
+            hit = self._docs[id(adf)] = (adf, analyze_adf(adf))  # keeps `adf` alive, so its id stays unique
+        return hit[1]
+
+    def adf_text(self, adf: Any) -> str:
+        return self.doc(adf).text
+
+    def _raw(self) -> dict:
+        if self._data is None:
+            self._data = jira_request(
+                f"/rest/api/3/issue/{self.issue_key}",
+                params={"fields": f"{ISSUE_FIELDS},issuelinks"},
+            )
+        return self._data
+
+    def _fields(self) -> dict:
+        return self._raw().get("fields") or {}
+
+    def issue(self) -> dict:
+        """Same shape as get_issue()."""
+        try:
+            return _issue_result(self.issue_key, self._raw(), self.doc)
+        except Exception as e:
+            log.error(f"Could not read issue {self.issue_key}: {e}")
+            return {"ok": False, "error": str(e)}
+
+    def comments(self) -> List[dict]:
+        """Raw comment objects; only hits /comment if the embedded page is incomplete."""
+        if self._comments is None:
+            page = self._fields().get("comment") or {}
+            comments = page.get("comments", []) or []
+            if page.get("total", len(comments)) > len(comments):
+                comments = jira_request(f"/rest/api/3/issue/{self.issue_key}/comment").get("comments", []) or []
+            self._comments = comments
+        return self._comments
+
+    def linked_keys(self) -> List[str]:
+        return _linked_keys_from_fields(self._fields())
+
+    def linked_tests(self) -> List[Dict[str, Any]]:
+        if self._linked_tests is None:
+            self._linked_tests = list(search_issues_by_keys(
+                self.linked_keys(),
+                fields="summary,created,description,project",
+                extra_jql='issuetype = "Test"',
+            ))
+        return self._linked_tests
+
+    def existing_tests_with_details(self) -> List[Dict[str, Any]]:
+        if self.mirror is not None:
+            return self.mirror.existing_tests_with_details(self.issue_key)
+        try:
+            return [_test_details(self.issue_key, issue) for issue in self.linked_tests()]
+        except Exception as e:
+            log.error(f"Error getting details of existing tests for {self.issue_key}: {e}")
+            return []
+
+    def next_tc_index(self) -> int:
+        if self.mirror is not None:
+            return self.mirror.next_tc_index(self.issue_key, self.project_key)
+        in_project = [
+            i for i in self.linked_tests()
+            if ((i.get("fields") or {}).get("project") or {}).get("key", self.project_key) == self.project_key
+        ]
+        return _max_tc_index(in_project)
+
+
+# Used only when the issueLinkType catalog cannot be read.
+_LEGACY_LINK_TYPE_ID = "10007"
+_LINK_TYPE_IDS: Optional[Dict[str, str]] = None
+_LINK_TYPE_LOCK = threading.Lock()
+
+
+def _link_type_ids() -> Dict[str, str]:
+    """{lowercase name/inward/outward: id}, read once from /issueLinkType."""
+    global _LINK_TYPE_IDS
+    if _LINK_TYPE_IDS is None:
+        with _LINK_TYPE_LOCK:
+            if _LINK_TYPE_IDS is None:
+                ids: Dict[str, str] = {}
+                try:
+                    data = jira_request("/rest/api/3/issueLinkType")
+                    for lt in data.get("issueLinkTypes", []) or []:
+                        for label in (lt.get("name"), lt.get("inward"), lt.get("outward")):
+                            if label:
+                                ids.setdefault(label.strip().lower(), str(lt["id"]))
+                except Exception as e:
+                    log.warning(f"Could not read issue link types: {e}")
+                _LINK_TYPE_IDS = ids
+    return _LINK_TYPE_IDS
+
+
+def resolve_link_type_id(link_type: str = None) -> str:
+    """Maps a link type name to its id, falling back to RELATES_LINK_TYPE and then the legacy id."""
+    ids = _link_type_ids()
+    for name in (link_type, RELATES_LINK_TYPE, "Relates"):
+        if name and name.strip().lower() in ids:
+            return ids[name.strip().lower()]
+    return _LEGACY_LINK_TYPE_ID
+
+
 def link_issues(from_issue_key: str, to_issue_key: str, link_type: str = None) -> dict:
     link_name = (link_type or RELATES_LINK_TYPE) or "Relates"
     log.info(f"Linking {from_issue_key} -> {to_issue_key} with link_type={link_name}...")
     try:
         body = {
-            "type": {"id": "10007"},
+            "type": {"id": resolve_link_type_id(link_name)},
             "inwardIssue": {"key": from_issue_key},
             "outwardIssue": {"key": to_issue_key},
         }
@@ -233,6 +519,42 @@ def link_issues(from_issue_key: str, to_issue_key: str, link_type: str = None) -
         return {"ok": False, "error": str(e)}
 
 
+def run_concurrently(calls: List[Callable[[], dict]], max_workers: int = JIRA_WRITE_CONCURRENCY) -> Dict[str, Any]:
+    """
+    Runs independent Jira writes (zero-arg callables, e.g. functools.partial) on a
+    bounded thread pool over the shared session. Results keep input order; an
+    exception becomes {"ok": False, "error": ...}.
+    """
+    def _safe(call: Callable[[], dict]) -> dict:
+        try:
+            return call()
+        except Exception as e:
+            log.error(f"Jira write failed: {e}")
+            return {"ok": False, "error": str(e)}
+
+    if not calls:
+        return {"ok": True, "results": [], "failed": 0}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(calls)))) as pool:
+        results = list(pool.map(_safe, calls))
+    failed = sum(1 for r in results if not (r or {}).get("ok"))
+    return {"ok": failed == 0, "results": results, "failed": failed}
+
+
+def link_issues_batch(pairs: List[tuple], link_type: str = None) -> Dict[str, Any]:
+    """Links (from_key, to_key) pairs concurrently with a single resolved link type."""
+    resolve_link_type_id(link_type)  # warm the cache before fanning out
+    return run_concurrently([partial(link_issues, a, b, link_type=link_type) for a, b in pairs])
+
+
+def update_test_issues_batch(items: List[Dict[str, str]]) -> Dict[str, Any]:
+    """Applies update_test_issue to every {"key", "summary", "steps"} item concurrently."""
+    return run_concurrently([partial(update_test_issue, i["key"], i["summary"], i["steps"]) for i in items])
+
+
+def add_labels_batch(issue_keys: List[str], labels_to_add: List[str]) -> Dict[str, Any]:
+    return run_concurrently([partial(add_labels_to_issue, k, labels_to_add) for k in issue_keys])
+
+
 def delete_issue(issue_key: str) -> dict:
     log.warning(f"Deleting duplicate issue: {issue_key}")
     try:
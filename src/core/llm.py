@@ -1,32 +1,30 @@
 # src/core/llm.py
 import os
 import json
+import asyncio
 import logging
-from typing import List, Dict, Tuple, Any
+from typing import AsyncIterator, Iterator, List, Dict, Tuple, Any
 
-from google import genai
-from google.genai import types
+from . import gemini as GM
+from . import matching as M
+from . import near_dupe as ND
+from . import context as CTX
+from . import llm_cache as LC
+from . import usage as U
+from . import structured as S
 
 log = logging.getLogger(__name__)
 
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 PROJECT_ID = os.getenv("GOOGLE_CLOUD_PROJECT_ID")
 LOCATION = os.getenv("GOOGLE_CLOUD_REGION", "us-central1")
-
-client = None
-provider = "unknown"
-
-try:
-    if GOOGLE_API_KEY:
-        client = genai.Client(api_key=GOOGLE_API_KEY)
-        provider = "google-ai-studio"
-    elif PROJECT_ID:
-        client = genai.Client(vertexai=True, project=PROJECT_ID, location=LOCATION)
-        provider = "vertex-ai"
-    else:
-        log.warning("No hay credenciales de IA configuradas en el .env")
-except Exception as e:
-    log.error(f"Faltan librerías o credenciales de IA: {e}")
+# Similitud mínima (Dice de trigramas) para considerar que un escenario renombrado es el mismo test
+FUZZY_MATCH_THRESHOLD = float(os.getenv("FUZZY_MATCH_THRESHOLD", "0.7"))
+# Un título parecido no alcanza ("...valid credentials" vs "...invalid credentials"):
+# los steps también tienen que coincidir al menos en esta proporción de palabras (Jaccard).
+FUZZY_STEPS_THRESHOLD = float(os.getenv("FUZZY_STEPS_THRESHOLD", "0.65"))
+# Llamadas simultáneas a Gemini en generate_scenarios_batch
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "4"))
 
 SYS_MSG_GENERATE_SCENARIOS = (
     "You are a Senior QA Analyst focused on Acceptance Testing.\n"
@@ -49,14 +47,6 @@ SYS_MSG_GENERATE_API_TESTS = (
     "3. OUTPUT: Single JSON object: {\"scenarios\": [{\"title\": \"...\", \"steps\": \"...\"}]}"
 )
 
-def _clean_json_text(text: str) -> str:
-    """Limpia bloques markdown ```json ... ```"""
-    if "```" in text:
-        lines = text.splitlines()
-        lines = [l for l in lines if not l.strip().startswith("```")]
-        return "\n".join(lines)
-    return text
-
 def _normalize_scenario_title(raw_title: str) -> str:
     """Quita labels tipo 'Bug:'/'Scenario:' y fuerza el prefijo 'Validate that'."""
     t = (raw_title or "Untitled").strip()
@@ -81,73 +71,291 @@ def _normalize_scenario_title(raw_title: str) -> str:
 
     return t
 
+def _scenario_prompt(issue_key: str, summary: str, full_context: str) -> str:
+    full_context = CTX.clip_context(full_context)
+    return (
+        f"TASK: {issue_key}\n"
+        f"SUMMARY: {summary}\n"
+        f"CONTEXT:\n{full_context}\n\n"
+        "INSTRUCTION: Create Gherkin Test Cases to VALIDATE the Expected Behavior. "
+        "Ensure all titles start with 'Validate that'. Return JSON."
+    )
+
+def _gemini_request(user_prompt: str, system_prompt: str, images: List[Dict] = None) -> Dict[str, Any]:
+    """kwargs de generate_content, iguales para el cliente sync y el async (client.aio)."""
+    from google.genai import types
+    # Preparamos el contenido (Texto + Imágenes si hay)
+    contents = [user_prompt]
+    for img in images or []:
+        contents.append(types.Part.from_bytes(data=img["data"], mime_type=img["mime_type"]))
+    return {
+        "model": os.getenv("GEMINI_MODEL", "gemini-2.5-flash"),
+        "contents": contents,
+        "config": types.GenerateContentConfig(
+            system_instruction=system_prompt,
+            response_mime_type="application/json",
+            response_schema=S.SCENARIOS_SCHEMA,
+            temperature=0.2
+        ),
+    }
+
+def _scenario_cache_key(user_prompt: str, system_prompt: str, images: List[Dict] = None) -> str:
+    return LC.request_key(os.getenv("GEMINI_MODEL", "gemini-2.5-flash"), system_prompt, user_prompt, images, {"temperature": 0.2})
+
+def _normalize_scenario(sc: Dict[str, Any]):
+    t = _normalize_scenario_title(sc.get("title", "Untitled"))
+    s = sc.get("steps", [])
+    s_str = "\n".join(s) if isinstance(s, list) else str(s)
+    return {"title": t, "steps": s_str} if t and s_str else None
+
+def _record_cache_hit(operation: str, issue_key: str) -> None:
+    U.record(operation, os.getenv("GEMINI_MODEL", "gemini-2.5-flash"), status="cache", issue_key=issue_key)
+
+def _normalize_all(items: List[Dict[str, Any]], max_tests: int) -> List[Dict[str, str]]:
+    final_scenarios = []
+    for sc in items[:max_tests]:
+        normalized = _normalize_scenario(sc)
+        if normalized:
+            final_scenarios.append(normalized)
+    return final_scenarios
+
+def _parse_scenarios(raw_text: str, max_tests: int) -> List[Dict[str, str]]:
+    return _normalize_all(S.parse_list(raw_text, "scenarios"), max_tests)
+
+def _cache_items(cache_key: str, items: List[Dict[str, Any]]) -> None:
+    # Se guarda el JSON ya reparado, así un hit nunca vuelve a pagar un re-pedido.
+    if LC.ENABLED and items:
+        LC.put(cache_key, json.dumps({"scenarios": items}, ensure_ascii=False))
+
+def _finish_scenarios(raw_text: str, cache_key: str, fresh: bool, max_tests: int, client=None, issue_key: str = None) -> List[Dict[str, str]]:
+    """Parsea la respuesta; si es nueva, re-pide solo los objetos rotos y la cachea."""
+    if not fresh:
+        scenarios = _parse_scenarios(raw_text, max_tests)
+    else:
+        items = S.parse_list(raw_text, "scenarios", client, issue_key)
+        _cache_items(cache_key, items)
+        scenarios = _normalize_all(items, max_tests)
+    log.info(f"✅ IA generó {len(scenarios)} tests de validación via {GM.provider_name()}{'' if fresh else ' (cache)'}.")
+    return scenarios
+
 def llm_generate_scenarios(
     issue_key: str,
     summary: str,
     full_context: str,
     max_tests: int = 50, 
     system_prompt: str = SYS_MSG_GENERATE_SCENARIOS,
-    images: List[Dict] = None
+    images: List[Dict] = None,
+    use_cache: bool = True
 ) -> Tuple[List[Dict[str, str]], str]:
-    
-    if not client:
-        return [], "Error: Cliente de IA no configurado."
-
-    model_name = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
-    
+    """use_cache=False fuerza una llamada nueva (la respuesta igual se guarda en la cache)."""
     try:
-        user_prompt = (
-            f"TASK: {issue_key}\n"
-            f"SUMMARY: {summary}\n"
-            f"CONTEXT:\n{full_context}\n\n"
-            "INSTRUCTION: Create Gherkin Test Cases to VALIDATE the Expected Behavior. "
-            "Ensure all titles start with 'Validate that'. Return JSON."
-        )
-        
-        # Preparamos el contenido (Texto + Imágenes si hay)
-        contents = [user_prompt]
-        if images:
-            for img in images:
-                contents.append(
-                    types.Part.from_bytes(data=img["data"], mime_type=img["mime_type"])
-                )
-        
-        # Llamamos a Gemini (¡El mismo código para Vertex o AI Studio!)
-        response = client.models.generate_content(
-            model=model_name,
-            contents=contents,
-            config=types.GenerateContentConfig(
-                system_instruction=system_prompt,
-                response_mime_type="application/json",
-                temperature=0.2
-            )
-        )
-
-        clean_text = _clean_json_text(response.text)
-        data = json.loads(clean_text)
-        scenarios = data.get("scenarios", [])
-        
-        final_scenarios = []
-        for sc in scenarios[:max_tests]:
-            t = _normalize_scenario_title(sc.get("title", "Untitled"))
+        user_prompt = _scenario_prompt(issue_key, summary, full_context)
+        cache_key = _scenario_cache_key(user_prompt, system_prompt, images)
+        raw_text = LC.get(cache_key) if (use_cache and LC.ENABLED) else None
+        fresh = raw_text is None
 
-            s = sc.get("steps", [])
-            s_str = "\n".join(s) if isinstance(s, list) else str(s)
-            
-            if t and s_str:
-                final_scenarios.append({"title": t, "steps": s_str})
+        if not fresh:
+            _record_cache_hit("generate_scenarios", issue_key)
+        else:
+            client = GM.get_client()
+            if not client:
+                return [], "Error: Cliente de IA no configurado."
+            # Llamamos a Gemini (¡El mismo código para Vertex o AI Studio!)
+            raw_text = U.generate(client, "generate_scenarios", issue_key, **_gemini_request(user_prompt, system_prompt, images)).text
 
-        log.info(f"✅ IA generó {len(final_scenarios)} tests de validación via {provider}.")
-        return final_scenarios, provider
+        return _finish_scenarios(raw_text, cache_key, fresh, max_tests, client if fresh else None, issue_key), GM.provider_name()
 
     except Exception as e:
         log.error(f"Error LLM: {e}")
         return [], str(e)
 
-def llm_compare_and_sync(issue_key: str, summary: str, existing_tests: list, new_scenarios: list) -> dict:
+async def allm_generate_scenarios(
+    issue_key: str,
+    summary: str,
+    full_context: str,
+    max_tests: int = 50,
+    system_prompt: str = SYS_MSG_GENERATE_SCENARIOS,
+    images: List[Dict] = None,
+    use_cache: bool = True
+) -> Tuple[List[Dict[str, str]], str]:
+    """Versión asyncio de llm_generate_scenarios (client.aio); misma cache y normalización."""
+    try:
+        user_prompt = _scenario_prompt(issue_key, summary, full_context)
+        cache_key = _scenario_cache_key(user_prompt, system_prompt, images)
+        raw_text = await asyncio.to_thread(LC.get, cache_key) if (use_cache and LC.ENABLED) else None
+        fresh = raw_text is None
+
+        if not fresh:
+            _record_cache_hit("generate_scenarios", issue_key)
+            return _finish_scenarios(raw_text, cache_key, fresh, max_tests), GM.provider_name()
+
+        client = GM.get_client()
+        if not client:
+            return [], "Error: Cliente de IA no configurado."
+        response = await U.agenerate(client, "generate_scenarios", issue_key, **_gemini_request(user_prompt, system_prompt, images))
+        items = await S.aparse_list(response.text, "scenarios", client, issue_key)
+        await asyncio.to_thread(_cache_items, cache_key, items)
+        scenarios = _normalize_all(items, max_tests)
+        log.info(f"✅ IA generó {len(scenarios)} tests de validación via {GM.provider_name()}.")
+        return scenarios, GM.provider_name()
+
+    except Exception as e:
+        log.error(f"Error LLM ({issue_key}): {e}")
+        return [], str(e)
+
+async def generate_scenarios_batch(
+    jobs: List[Dict[str, Any]],
+    concurrency: int = LLM_CONCURRENCY
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Genera escenarios para varios issues a la vez, con a lo sumo `concurrency`
+    llamadas en vuelo. Cada job son los kwargs de allm_generate_scenarios.
+    Va entregando {"index", "issue_key", "scenarios", "provider"} a medida que
+    terminan (no en el orden de `jobs`); un job fallido trae scenarios=[] y el error en provider.
+    """
+    sem = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(index: int, job: Dict[str, Any]) -> Dict[str, Any]:
+        async with sem:
+            scenarios, prov = await allm_generate_scenarios(**job)
+        return {"index": index, "issue_key": job.get("issue_key"), "scenarios": scenarios, "provider": prov}
+
+    for fut in asyncio.as_completed([run(i, job) for i, job in enumerate(jobs)]):
+        yield await fut
+
+class ScenarioStreamParser(S.JsonListParser):
+    """
+    Parser incremental del JSON {"scenarios": [{...}, ...]} que va llegando en chunks.
+    feed() devuelve los escenarios (crudos) cuyo objeto ya se cerró; ignora fences
+    ```json y cualquier texto antes de la clave "scenarios". Los objetos rotos
+    quedan en `broken` (y su posición en `broken_at`) para re-pedirlos al final.
+    """
+
+    def __init__(self):
+        super().__init__("scenarios")
+
+def _stream_setup(issue_key, summary, full_context, system_prompt, images, use_cache):
+    user_prompt = _scenario_prompt(issue_key, summary, full_context)
+    cache_key = _scenario_cache_key(user_prompt, system_prompt, images)
+    cached = LC.get(cache_key) if (use_cache and LC.ENABLED) else None
+    if cached is not None:
+        _record_cache_hit("stream_scenarios", issue_key)
+    return user_prompt, cache_key, cached
+
+def _stream_done(items: List[Dict[str, Any]], cache_key: str, count: int) -> None:
+    _cache_items(cache_key, items)
+    log.info(f"✅ IA generó {count} tests de validación via {GM.provider_name()} (stream).")
+
+def llm_stream_scenarios(
+    issue_key: str,
+    summary: str,
+    full_context: str,
+    max_tests: int = 50,
+    system_prompt: str = SYS_MSG_GENERATE_SCENARIOS,
+    images: List[Dict] = None,
+    use_cache: bool = True
+) -> Iterator[Dict[str, str]]:
+    """
+    Igual que llm_generate_scenarios pero entrega cada escenario (ya normalizado)
+    apenas Gemini termina de escribirlo. Los errores se propagan al consumidor.
+    """
+    user_prompt, cache_key, cached = _stream_setup(issue_key, summary, full_context, system_prompt, images, use_cache)
+    if cached is not None:
+        yield from _parse_scenarios(cached, max_tests)
+        return
+    client = GM.get_client()
+    if not client:
+        raise RuntimeError("Cliente de IA no configurado.")
+
+    parser, count = ScenarioStreamParser(), 0
+    for chunk in U.stream(client, "stream_scenarios", issue_key, **_gemini_request(user_prompt, system_prompt, images)):
+        for raw in parser.feed(chunk.text or ""):
+            sc = _normalize_scenario(raw)
+            if sc and count < max_tests:
+                count += 1
+                yield sc
+    # Lo que llegó roto (o cortado) se re-pide objeto por objeto, sin regenerar todo.
+    parser.finish()
+    fixed = []
+    for fragment in parser.broken:
+        raw = S.reask_fragment(client, "scenarios", fragment, issue_key)
+        fixed.append(raw)
+        sc = _normalize_scenario(raw) if raw else None
+        if sc and count < max_tests:
+            count += 1
+            yield sc
+    _stream_done(S.restore_order(parser.items, parser.broken_at, fixed), cache_key, count)
+
+async def allm_stream_scenarios(
+    issue_key: str,
+    summary: str,
+    full_context: str,
+    max_tests: int = 50,
+    system_prompt: str = SYS_MSG_GENERATE_SCENARIOS,
+    images: List[Dict] = None,
+    use_cache: bool = True
+) -> AsyncIterator[Dict[str, str]]:
+    """Versión asyncio de llm_stream_scenarios."""
+    user_prompt, cache_key, cached = await asyncio.to_thread(
+        _stream_setup, issue_key, summary, full_context, system_prompt, images, use_cache
+    )
+    if cached is not None:
+        for sc in _parse_scenarios(cached, max_tests):
+            yield sc
+        return
+    client = GM.get_client()
+    if not client:
+        raise RuntimeError("Cliente de IA no configurado.")
+
+    parser, count = ScenarioStreamParser(), 0
+    async for chunk in U.astream(client, "stream_scenarios", issue_key, **_gemini_request(user_prompt, system_prompt, images)):
+        for raw in parser.feed(chunk.text or ""):
+            sc = _normalize_scenario(raw)
+            if sc and count < max_tests:
+                count += 1
+                yield sc
+    parser.finish()
+    fixed = []
+    for fragment in parser.broken:
+        raw = await S.areask_fragment(client, "scenarios", fragment, issue_key)
+        fixed.append(raw)
+        sc = _normalize_scenario(raw) if raw else None
+        if sc and count < max_tests:
+            count += 1
+            yield sc
+    await asyncio.to_thread(_stream_done, S.restore_order(parser.items, parser.broken_at, fixed), cache_key, count)
+
+def _retitle(summary: str, new_title: str) -> str:
+    """Keeps the 'KEY | TCxx | ' prefix of an existing summary and swaps the title."""
+    if " | " in (summary or ""):
+        return summary.rsplit(" | ", 1)[0] + " | " + new_title
+    return new_title
+
+def _existing_steps(test: dict) -> str:
+    return (test.get("gherkin") or test.get("steps") or test.get("description") or "").strip()
+
+def _same_scenario_steps(old_steps: str, new_steps: str, threshold: float = FUZZY_STEPS_THRESHOLD) -> bool:
+    """Steps lo bastante parecidos para tratar un título reescrito como update. Sin steps en algún lado: no."""
+    old_words, new_words = ND.step_shingles(old_steps, k=1), ND.step_shingles(new_steps, k=1)
+    if not old_words or not new_words:
+        return False
+    return ND.jaccard(old_words, new_words) >= threshold
+
+def llm_compare_and_sync(
+    issue_key: str,
+    summary: str,
+    existing_tests: list,
+    new_scenarios: list,
+    fuzzy_threshold: float = FUZZY_MATCH_THRESHOLD,
+    optimal: bool = False,
+) -> dict:
     """
     Compara los tests que ya existen con los que acaba de generar la IA
     para decidir qué crear, qué actualizar y qué marcar como obsoleto.
+    Primero empareja por título exacto; lo que queda se empareja por similitud
+    (core.matching) para que un escenario renombrado sea un update y no create + obsolete.
+    El emparejamiento por similitud exige también steps parecidos (FUZZY_STEPS_THRESHOLD),
+    así un escenario opuesto con título casi igual no pisa al test existente.
     """
     plan = {
         "to_create": [],
@@ -166,6 +374,7 @@ def llm_compare_and_sync(issue_key: str, summary: str, existing_tests: list, new
         existing_map[t_title.strip().lower()] = t
         
     matched_keys = set()
+    unmatched = []
     
     for sc in new_scenarios:
         sc_title = sc.get("title", "").strip()
@@ -177,9 +386,9 @@ def llm_compare_and_sync(issue_key: str, summary: str, existing_tests: list, new
             
         match = existing_map.get(search_title.lower())
         
-        if match:
+        if match and match["key"] not in matched_keys:
             matched_keys.add(match["key"])
-            match_steps = (match.get("gherkin") or match.get("steps") or match.get("description") or "").strip()
+            match_steps = _existing_steps(match)
             
             if match_steps != sc_steps:
                 match_updated = match.copy()
@@ -188,10 +397,34 @@ def llm_compare_and_sync(issue_key: str, summary: str, existing_tests: list, new
             else:
                 plan["unchanged"].append(match)
         else:
+            unmatched.append(sc)
+
+    # Segunda pasada: títulos reescritos por la IA
+    remaining = [t for t in existing_tests if t["key"] not in matched_keys]
+    fuzzy_pairs = M.match_titles(
+        [t.get("norm_title") or t.get("title") or t.get("summary") or "" for t in remaining],
+        [sc.get("title", "") for sc in unmatched],
+        threshold=fuzzy_threshold,
+        optimal=optimal,
+        accept=lambda ni, ei: _same_scenario_steps(_existing_steps(remaining[ei]), unmatched[ni].get("steps", "")),
+    ) if fuzzy_threshold and fuzzy_threshold <= 1 else []
+    paired = {ni: (remaining[ei], score) for ni, ei, score in fuzzy_pairs}
+
+    for ni, sc in enumerate(unmatched):
+        if ni not in paired:
             plan["to_create"].append(sc)
+            continue
+        match, score = paired[ni]
+        matched_keys.add(match["key"])
+        match_updated = match.copy()
+        match_updated["steps"] = sc.get("steps", "").strip()
+        match_updated["title"] = sc.get("title", "").strip()
+        match_updated["summary"] = _retitle(match.get("summary", ""), match_updated["title"])
+        match_updated["match_score"] = round(score, 3)
+        plan["to_update"].append(match_updated)
             
     for t in existing_tests:
         if t["key"] not in matched_keys:
             plan["obsolete"].append(t)
             
-    return plan
\ No newline at end of file
+    return plan
@@ -0,0 +1,72 @@
+# src/core/llm_cache.py
+"""
+Cache en disco de respuestas del LLM.
+
+La clave es el sha256 de (modelo, system prompt, user prompt, digests de las
+imágenes, config), así que cualquier cambio en el ticket o en el prompt es un miss.
+Cada entrada es un JSON en <LLM_CACHE_DIR>/<ab>/<sha256>.json con el texto crudo
+de la respuesta y la fecha de creación.
+
+- LLM_CACHE_TTL (segundos): pasado ese tiempo la entrada se ignora y se borra.
+- LLM_CACHE_MAX_MB: al superarlo se borran las entradas menos usadas (mtime = LRU, core.disk_lru).
+- LLM_CACHE_DISABLED=1 apaga la cache; cada llamada puede saltearla con use_cache=False.
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional
+
+from . import disk_lru as DL
+
+log = logging.getLogger(__name__)
+
+CACHE_DIR = os.getenv("LLM_CACHE_DIR") or os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "cache", "llm")
+)
+TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+MAX_BYTES = int(float(os.getenv("LLM_CACHE_MAX_MB", "50")) * 1024 * 1024)
+ENABLED = os.getenv("LLM_CACHE_DISABLED", "").lower() not in ("1", "true", "yes")
+
+
+def request_key(model: str, system_prompt: str, user_prompt: str, images: List[Dict] = None, config: Dict[str, Any] = None) -> str:
+    digests = [hashlib.sha256(img["data"]).hexdigest() for img in images or []]
+    payload = json.dumps([model, system_prompt, user_prompt, digests, config or {}], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _path(key: str) -> str:
+    return os.path.join(CACHE_DIR, key[:2], f"{key}.json")
+
+
+def get(key: str, ttl: int = None) -> Optional[str]:
+    """Texto cacheado para `key`, o None si no está o venció."""
+    path = _path(key)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if time.time() - entry.get("created", 0) > (TTL if ttl is None else ttl):
+        try: os.remove(path)
+        except OSError: pass
+        return None
+    try: os.utime(path)  # LRU
+    except OSError: pass
+    return entry.get("text")
+
+
+def put(key: str, text: str) -> None:
+    """Guarda la respuesta. Nunca lanza: la cache es opcional."""
+    try:
+        data = json.dumps({"created": time.time(), "text": text}, ensure_ascii=False).encode("utf-8")
+        DL.atomic_write(_path(key), data)
+        DL.note_write(CACHE_DIR, len(data), MAX_BYTES)
+    except OSError as e:
+        log.warning(f"No se pudo cachear la respuesta del LLM: {e}")
+
+
+def evict(max_bytes: int = None) -> int:
+    """Borra entradas por orden LRU hasta quedar bajo `max_bytes`. Devuelve cuántas borró."""
+    return DL.evict(CACHE_DIR, MAX_BYTES if max_bytes is None else max_bytes)
@@ -0,0 +1,157 @@
+# src/core/matching.py
+"""
+Fuzzy title matching between existing tests and newly generated scenarios.
+
+Titles are normalized (TC/issue prefixes and the 'Validate that' lead-in removed)
+and indexed by character trigrams. A query only scores the existing titles that
+share at least one trigram, using the Dice coefficient of the trigram sets.
+Pairs above the threshold (and accepted by the optional `accept` check, e.g. on
+the steps) are then assigned 1:1, greedily by score or, with optimal=True, with
+the Hungarian algorithm per connected group of candidates.
+"""
+from __future__ import annotations
+import re
+from collections import Counter, defaultdict
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+_LEAD_RX = re.compile(r"^(validate|verify|ensure)(\s+that)?\s+")
+
+
+def normalize_title(title: str) -> str:
+    t = (title or "").strip()
+    if " | " in t:
+        t = t.split(" | ")[-1]
+    t = re.sub(r"[^a-z0-9\s]+", " ", t.lower())
+    t = re.sub(r"\s+", " ", t).strip()
+    return _LEAD_RX.sub("", t)
+
+
+def trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    def __init__(self, titles: List[str]):
+        self._grams: List[Set[str]] = [trigrams(normalize_title(t)) for t in titles]
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+        for i, grams in enumerate(self._grams):
+            for g in grams:
+                self._postings[g].append(i)
+
+    def query(self, title: str, threshold: float) -> List[Tuple[int, float]]:
+        """[(existing_index, dice_score)] with score >= threshold."""
+        grams = trigrams(normalize_title(title))
+        shared: Counter = Counter()
+        for g in grams:
+            shared.update(self._postings.get(g, ()))
+        hits = []
+        for i, n in shared.items():
+            score = 2 * n / (len(grams) + len(self._grams[i]))
+            if score >= threshold:
+                hits.append((i, score))
+        return hits
+
+
+def _hungarian(cost: List[List[float]]) -> List[Tuple[int, int]]:
+    """Min-cost assignment for an n x m matrix with n <= m. Returns (row, col) pairs."""
+    n, m = len(cost), len(cost[0])
+    INF = float("inf")
+    u, v = [0.0] * (n + 1), [0.0] * (m + 1)
+    p, way = [0] * (m + 1), [0] * (m + 1)
+    for i in range(1, n + 1):
+        p[0], j0 = i, 0
+        minv, used = [INF] * (m + 1), [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0, delta, j1 = p[j0], INF, 0
+            for j in range(1, m + 1):
+                if not used[j]:
+                    cur = cost[i0 - 1][j - 1] - u[i0] - v[j]
+                    if cur < minv[j]:
+                        minv[j], way[j] = cur, j0
+                    if minv[j] < delta:
+                        delta, j1 = minv[j], j
+            for j in range(m + 1):
+                if used[j]:
+                    u[p[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+    return [(p[j] - 1, j - 1) for j in range(1, m + 1) if p[j]]
+
+
+def _components(edges: Dict[Tuple[int, int], float]) -> List[Tuple[List[int], List[int]]]:
+    """Connected groups of (new, existing) nodes in the candidate graph."""
+    parent: Dict[Tuple[str, int], Tuple[str, int]] = {}
+
+    def find(x):
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b in edges:
+        parent[find(("n", a))] = find(("e", b))
+    groups: Dict[Tuple[str, int], Tuple[List[int], List[int]]] = {}
+    for node in list(parent):
+        news, olds = groups.setdefault(find(node), ([], []))
+        (news if node[0] == "n" else olds).append(node[1])
+    return list(groups.values())
+
+
+def match_titles(
+    existing_titles: List[str],
+    new_titles: List[str],
+    threshold: float = 0.7,
+    optimal: bool = False,
+    accept: Optional[Callable[[int, int], bool]] = None,
+) -> List[Tuple[int, int, float]]:
+    """
+    1:1 pairs (new_index, existing_index, score) whose similarity is >= threshold.
+    accept(new_index, existing_index) can veto a candidate before assignment.
+    """
+    if not existing_titles or not new_titles:
+        return []
+    index = TrigramIndex(existing_titles)
+    edges: Dict[Tuple[int, int], float] = {}
+    for ni, title in enumerate(new_titles):
+        for ei, score in index.query(title, threshold):
+            if accept is None or accept(ni, ei):
+                edges[(ni, ei)] = score
+
+    pairs: List[Tuple[int, int, float]] = []
+    if not optimal:
+        used_new, used_old = set(), set()
+        for (ni, ei), score in sorted(edges.items(), key=lambda kv: (-kv[1], kv[0])):
+            if ni in used_new or ei in used_old:
+                continue
+            used_new.add(ni); used_old.add(ei)
+            pairs.append((ni, ei, score))
+        return sorted(pairs)
+
+    for news, olds in _components(edges):
+        rows, cols = sorted(news), sorted(olds)
+        transpose = len(rows) > len(cols)
+        if transpose:
+            rows, cols = cols, rows
+        cost = []
+        for r in rows:
+            line = []
+            for c in cols:
+                key = (c, r) if transpose else (r, c)
+                line.append(1.0 - edges[key] if key in edges else 2.0)
+            cost.append(line)
+        for ri, ci in _hungarian(cost):
+            ni, ei = (cols[ci], rows[ri]) if transpose else (rows[ri], cols[ci])
+            if (ni, ei) in edges:
+                pairs.append((ni, ei, edges[(ni, ei)]))
+    return sorted(pairs)
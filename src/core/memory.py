@@ -4,6 +4,9 @@ import os
 from datetime import date
 from typing import Optional
 
+from . import gemini as GM
+from . import usage as U
+
 log = logging.getLogger(__name__)
 
 MEMORY_DIR = os.path.abspath(
@@ -120,30 +123,23 @@ RULES:
 7. Keep ALL existing data -- only add or update, never remove.
 8. Return ONLY pure JSON with the exact same structure as CURRENT MEMORY."""
 
-    google_key = os.getenv("GOOGLE_API_KEY", "")
-    project_id = os.getenv("GOOGLE_CLOUD_PROJECT_ID", "")
-
     # Gemini is the primary LLM for this project (cost-effective with flash models)
-    if google_key or project_id:
+    client = GM.get_client()
+    if client:
         try:
-            from google import genai
             from google.genai import types
 
-            if google_key:
-                client = genai.Client(api_key=google_key)
-            else:
-                location = os.getenv("GOOGLE_CLOUD_REGION", "us-central1")
-                client = genai.Client(vertexai=True, project=project_id, location=location)
-
             model = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
-            response = client.models.generate_content(
-                model=model,
-                contents=prompt_instruction,
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json",
-                    temperature=0.1,
-                ),
-            )
+            with U.tags(source=module):
+                response = U.generate(
+                    client, "memory_update",
+                    model=model,
+                    contents=prompt_instruction,
+                    config=types.GenerateContentConfig(
+                        response_mime_type="application/json",
+                        temperature=0.1,
+                    ),
+                )
             return json.loads(response.text)
         except Exception as e:
             log.error(f"Gemini memory update failed: {e}")
@@ -0,0 +1,355 @@
+# src/core/mirror.py
+"""
+Local SQLite mirror of Jira Test issues with a signature index.
+
+Each Test is stored with its parent(s), normalized title, feature text and the
+make_signature / steps_signature hashes, so duplicate checks, next_tc_index and
+sync planning become indexed local lookups. sync() is incremental: it only asks
+Jira for Tests with `updated >= last_sync` (minus an overlap window, since JQL
+dates are evaluated in the Jira user's timezone and upserts are idempotent), and
+prunes Tests deleted in Jira with a keys-only listing.
+
+Enabled with JIRA_MIRROR_ENABLED=1: jt, dedupe and IssueSnapshot then read from
+ensure_synced(project), which re-syncs at most every JIRA_MIRROR_MAX_AGE seconds.
+Writes made by this process (creates, updates, deletes) are applied to the mirror
+right away, so TC numbering stays correct between syncs.
+"""
+from __future__ import annotations
+import os
+import re
+import sqlite3
+import logging
+import time
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+
+from . import jira as J
+from . import adf as A
+from . import gherkin as G
+
+log = logging.getLogger(__name__)
+
+MIRROR_PATH = os.getenv("JIRA_MIRROR_PATH") or os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "cache", "jira_tests.sqlite3")
+)
+MIRROR_ENABLED = os.getenv("JIRA_MIRROR_ENABLED", "").lower() in ("1", "true", "yes")
+MIRROR_MAX_AGE = int(os.getenv("JIRA_MIRROR_MAX_AGE", "300"))
+SYNC_OVERLAP = timedelta(days=1)
+KEYS_PAGE_SIZE = 1000
+SCHEMA_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tests (
+    key         TEXT PRIMARY KEY,
+    project     TEXT NOT NULL,
+    summary     TEXT NOT NULL,
+    norm_title  TEXT NOT NULL,
+    feature     TEXT NOT NULL,
+    description TEXT NOT NULL,
+    signature   TEXT NOT NULL,
+    steps_sig   TEXT NOT NULL,
+    tc_index    INTEGER,
+    created     TEXT,
+    updated     TEXT
+);
+CREATE TABLE IF NOT EXISTS test_parents (
+    test_key    TEXT NOT NULL,
+    parent_key  TEXT NOT NULL,
+    PRIMARY KEY (test_key, parent_key)
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    project     TEXT PRIMARY KEY,
+    last_sync   TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tests_signature ON tests(signature);
+CREATE INDEX IF NOT EXISTS idx_tests_steps_sig ON tests(steps_sig);
+CREATE INDEX IF NOT EXISTS idx_tests_project ON tests(project);
+CREATE INDEX IF NOT EXISTS idx_parents_parent ON test_parents(parent_key);
+"""
+
+_KEY_PREFIX_RX = re.compile(r"^\s*([A-Z][A-Z0-9_]+-\d+)\s*\|")
+_TC_RX = re.compile(r"TC(\d+)", re.IGNORECASE)
+_SYNC_FIELDS = "summary,created,updated,description,project,issuelinks"
+# Solo los links de este tipo (el que usan jt y el sweep) cuentan como padre de un Test;
+# Relates, Blocks o un link Test<->Test no.
+PARENT_LINK_TYPE = "Tests"
+
+
+def _parse_jira_datetime(value: str) -> Optional[datetime]:
+    try:
+        return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S.%f%z")
+    except (TypeError, ValueError):
+        return None
+
+
+def _parent_links(fields: dict, link_type_id: str) -> List[str]:
+    keys = []
+    for link in (fields or {}).get("issuelinks", []) or []:
+        if str((link.get("type") or {}).get("id")) != link_type_id:
+            continue
+        other = link.get("outwardIssue") or link.get("inwardIssue") or {}
+        if other.get("key"):
+            keys.append(other["key"])
+    return keys
+
+
+def _row_from_issue(issue: dict, link_type_id: str) -> tuple:
+    """Returns (row, parents) for a Jira Test issue: the summary prefix plus the `link_type_id` links."""
+    fields = issue.get("fields") or {}
+    summary = fields.get("summary", "") or ""
+    linked = _parent_links(fields, link_type_id)
+    prefix = _KEY_PREFIX_RX.match(summary)
+    parents = list(dict.fromkeys(([prefix.group(1)] if prefix else []) + linked))
+
+    parts = [p.strip() for p in summary.split("|")]
+    raw_title = parts[-1] if parts else summary
+    norm_title = G.sanitize_title(parents[0] if parents else "", raw_title)
+    description = fields.get("description")
+    doc = A.analyze_adf(description)
+    feature = "\n".join(doc.codeblocks())
+    text = doc.text if isinstance(description, dict) else (description or "")
+    tc = _TC_RX.search(summary)
+
+    row = (
+        issue["key"],
+        ((fields.get("project") or {}).get("key") or issue["key"].split("-")[0]),
+        summary,
+        norm_title,
+        feature,
+        text,
+        G.make_signature(norm_title, feature),
+        G.steps_signature(feature),
+        int(tc.group(1)) if tc else None,
+        fields.get("created") or "",
+        fields.get("updated") or "",
+    )
+    return row, parents
+
+
+class TestMirror:
+    """Thread-safe handle over the SQLite mirror."""
+
+    __test__ = False  # not a pytest class
+
+    def __init__(self, path: str = None):
+        self.path = path or MIRROR_PATH
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._synced_at: Dict[str, float] = {}
+        with self._lock, self._conn:
+            if self._conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                # Es una cache: ante un cambio de esquema se descarta y se vuelve a sincronizar.
+                self._conn.executescript("DROP TABLE IF EXISTS tests; DROP TABLE IF EXISTS test_parents; "
+                                         "DROP TABLE IF EXISTS sync_state;")
+                self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    # ------------------------
+    # Writes
+    # ------------------------
+    def upsert_issues(self, issues, keep_parents: bool = False) -> int:
+        """keep_parents=True adds the issue's parents to the stored ones instead of replacing them."""
+        issues = list(issues)
+        if not issues:
+            return 0
+        link_type_id = J.resolve_link_type_id(PARENT_LINK_TYPE)  # leído una vez por proceso
+        count = 0
+        with self._lock, self._conn:
+            for issue in issues:
+                row, parents = _row_from_issue(issue, link_type_id)
+                self._conn.execute("INSERT OR REPLACE INTO tests VALUES (?,?,?,?,?,?,?,?,?,?,?)", row)
+                if not keep_parents:
+                    self._conn.execute("DELETE FROM test_parents WHERE test_key = ?", (row[0],))
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO test_parents VALUES (?, ?)", [(row[0], p) for p in parents]
+                )
+                count += 1
+        return count
+
+    def put_test(self, key: str, project_key: str, summary: str, gherkin: str, parents: Iterable[str] = ()) -> None:
+        """Write-through for a Test this process just created or updated (same shape Jira would return)."""
+        now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000+0000")
+        with self._lock:
+            row = self._conn.execute("SELECT created FROM tests WHERE key = ?", (key,)).fetchone()
+        issue = {"key": key, "fields": {
+            "summary": summary, "project": {"key": project_key},
+            "created": row["created"] if row else now, "updated": now,
+            "description": A.adf_with_code_block("Steps (Gherkin)", gherkin),
+            "issuelinks": [{"type": {"id": J.resolve_link_type_id(PARENT_LINK_TYPE)}, "outwardIssue": {"key": p}}
+                           for p in parents],
+        }}
+        self.upsert_issues([issue], keep_parents=True)
+
+    def add_parent(self, test_key: str, parent_key: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR IGNORE INTO test_parents VALUES (?, ?)", (test_key, parent_key))
+
+    def remove(self, keys: List[str]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM tests WHERE key = ?", [(k,) for k in keys])
+            self._conn.executemany("DELETE FROM test_parents WHERE test_key = ?", [(k,) for k in keys])
+
+    def last_sync(self, project_key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT last_sync FROM sync_state WHERE project = ?", (project_key,)).fetchone()
+        return row["last_sync"] if row else None
+
+    def sync(self, project_key: str, full: bool = False) -> Dict[str, int]:
+        """
+        Pulls Tests changed since the last sync and drops keys no longer present
+        in Jira. With full=True every Test of the project is re-read.
+        """
+        all_tests = f'project = "{project_key}" AND issuetype = "Test"'
+        jql = all_tests
+        since = None if full else self.last_sync(project_key)
+        if since:
+            start = datetime.fromisoformat(since) - SYNC_OVERLAP
+            jql += f' AND updated >= "{start.strftime("%Y/%m/%d %H:%M")}"'
+
+        seen: List[str] = []
+        newest = _parse_jira_datetime(since + ".000+0000") if since else None
+        batch: List[dict] = []
+        for issue in J.search_jql(jql + " ORDER BY updated ASC", _SYNC_FIELDS):
+            batch.append(issue)
+            seen.append(issue["key"])
+            updated = _parse_jira_datetime((issue.get("fields") or {}).get("updated"))
+            if updated and (newest is None or updated > newest):
+                newest = updated
+            if len(batch) >= 200:
+                self.upsert_issues(batch); batch = []
+        self.upsert_issues(batch)
+
+        # Las bajas no aparecen en `updated >= ...`: se comparan contra un listado de solo keys.
+        alive = seen if full else [i["key"] for i in J.search_jql(all_tests, "key", page_size=KEYS_PAGE_SIZE)]
+        with self._lock:
+            existing = [r["key"] for r in self._conn.execute("SELECT key FROM tests WHERE project = ?", (project_key,))]
+        stale = sorted(set(existing) - set(alive))
+        self.remove(stale)
+        removed = len(stale)
+
+        if newest is not None:
+            mark = newest.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+            with self._lock, self._conn:
+                self._conn.execute("INSERT OR REPLACE INTO sync_state VALUES (?, ?)", (project_key, mark))
+        self._synced_at[project_key] = time.monotonic()
+        log.info(f"Mirror sync {project_key}: {len(seen)} upserted, {removed} removed.")
+        return {"upserted": len(seen), "removed": removed}
+
+    # ------------------------
+    # Lookups
+    # ------------------------
+    def _rows(self, sql: str, params: tuple) -> List[Dict]:
+        with self._lock:
+            return [dict(r) for r in self._conn.execute(sql, params)]
+
+    def tests_for_parent(self, parent_key: str, project_key: str = None) -> List[Dict]:
+        sql = "SELECT t.* FROM tests t JOIN test_parents p ON p.test_key = t.key WHERE p.parent_key = ?"
+        params: tuple = (parent_key,)
+        if project_key:
+            sql += " AND t.project = ?"
+            params += (project_key,)
+        return self._rows(sql, params)
+
+    def find_by_signature(self, signature: str) -> List[Dict]:
+        return self._rows("SELECT * FROM tests WHERE signature = ?", (signature,))
+
+    def find_by_steps_signature(self, steps_sig: str) -> List[Dict]:
+        if not steps_sig:
+            return []
+        return self._rows("SELECT * FROM tests WHERE steps_sig = ?", (steps_sig,))
+
+    def next_tc_index(self, parent_key: str, project_key: str) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(t.tc_index) AS m FROM tests t JOIN test_parents p ON p.test_key = t.key "
+                "WHERE p.parent_key = ? AND t.project = ?",
+                (parent_key, project_key),
+            ).fetchone()
+        return (row["m"] or 0) + 1
+
+    def signature_buckets(self, parent_key: str, project_key: str = None) -> Dict[str, List[Dict]]:
+        """Same shape as dedupe._group_linked_tests_by_signature, from local data."""
+        buckets: Dict[str, List[Dict]] = {}
+        for t in self.tests_for_parent(parent_key, project_key):
+            buckets.setdefault(t["signature"], []).append({
+                "key": t["key"],
+                "created": t["created"] or "",
+                "norm_title": t["norm_title"],
+                "feature": t["feature"],
+                "summary": t["summary"],
+                "signature": t["signature"],
+            })
+        return buckets
+
+    def existing_tests_with_details(self, parent_key: str, project_key: str = None) -> List[Dict]:
+        """Same shape (and values) as jira.get_existing_tests_with_details, for sync planning."""
+        out = []
+        for t in self.tests_for_parent(parent_key, project_key):
+            gherkin = t["feature"] or t["description"]
+            norm = G.sanitize_title(parent_key, t["summary"])
+            out.append({
+                "key": t["key"],
+                "summary": t["summary"],
+                "gherkin": gherkin,
+                "signature": G.make_signature(norm, gherkin),
+                "norm_title": norm,
+            })
+        return out
+
+    def project_tests(self, project_key: str) -> List[Dict]:
+        """Every Test of the project with its parents, for the project-wide dedupe sweep."""
+        rows = self._rows("SELECT * FROM tests WHERE project = ?", (project_key,))
+        links = self._rows(
+            "SELECT p.test_key, p.parent_key FROM test_parents p JOIN tests t ON t.key = p.test_key WHERE t.project = ?",
+            (project_key,),
+        )
+        parents: Dict[str, List[str]] = {}
+        for link in links:
+            parents.setdefault(link["test_key"], []).append(link["parent_key"])
+        for row in rows:
+            row["parents"] = sorted(parents.get(row["key"], []))
+        return rows
+
+
+_MIRROR: Optional[TestMirror] = None
+_MIRROR_LOCK = threading.Lock()
+
+
+def get_mirror() -> Optional[TestMirror]:
+    """Shared mirror, or None when JIRA_MIRROR_ENABLED is off."""
+    global _MIRROR
+    if not MIRROR_ENABLED:
+        return None
+    with _MIRROR_LOCK:
+        if _MIRROR is None:
+            _MIRROR = TestMirror()
+        return _MIRROR
+
+
+def ensure_synced(project_key: str, max_age: int = None) -> Optional[TestMirror]:
+    """
+    The shared mirror, re-synced (incrementally) if this process hasn't synced the
+    project in the last `max_age` seconds. None if disabled or the sync fails, so
+    callers fall back to reading Jira.
+    """
+    mirror = get_mirror()
+    if mirror is None or not project_key:
+        return None
+    age = time.monotonic() - mirror._synced_at.get(project_key, float("-inf"))
+    if age > (MIRROR_MAX_AGE if max_age is None else max_age):
+        with _MIRROR_LOCK:
+            age = time.monotonic() - mirror._synced_at.get(project_key, float("-inf"))
+            if age > (MIRROR_MAX_AGE if max_age is None else max_age):
+                try:
+                    mirror.sync(project_key)
+                except Exception as e:
+                    log.error(f"Mirror sync {project_key} failed, reading Jira instead: {e}")
+                    return None
+    return mirror
@@ -0,0 +1,136 @@
+# src/core/near_dupe.py
+"""
+Near-duplicate detection for Gherkin scenarios (MinHash + LSH).
+
+make_signature / steps_signature only catch exact matches after normalization,
+so a scenario the LLM rephrased slightly looks "new". Here each scenario becomes
+a set of word shingles over its normalized steps (gherkin.normalize_steps); a
+MinHash sketch of that set is split into LSH bands, so a query only compares
+against the candidates that share a band instead of every stored test.
+Candidates are confirmed with the exact Jaccard similarity of the shingle sets.
+"""
+from __future__ import annotations
+import re
+import random
+import hashlib
+from typing import Dict, List, Optional, Set, Tuple
+
+from . import gherkin as G
+
+_PRIME = (1 << 61) - 1
+
+
+def _hash64(s: str) -> int:
+    return int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def step_shingles(steps: str, title: str = "", k: int = 3) -> Set[str]:
+    """Word k-shingles over the normalized steps; falls back to the title when there are no steps."""
+    text = G.normalize_steps(steps) or re.sub(r"\s+", " ", (title or "").lower()).strip()
+    words = text.replace("|", " ").split()
+    if not words:
+        return set()
+    if len(words) <= k:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a and not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self._params = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+
+    def signature(self, shingles: Set[str]) -> Optional[Tuple[int, ...]]:
+        hashes = [_hash64(s) for s in shingles]
+        if not hashes:
+            return None
+        return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in self._params)
+
+
+class NearDuplicateIndex:
+    """
+    LSH index of scenarios. A pair with Jaccard s becomes a candidate with
+    probability 1 - (1 - s**rows)**bands (see candidate_probability). With the
+    defaults (16 bands x 4 rows): ~0.9998 at 0.8, ~0.99 at 0.7, ~0.64 at 0.5,
+    so thresholds of 0.7 and up are safe and a lower one loses pairs.
+    `threshold` filters the candidates on their exact Jaccard.
+    """
+
+    def __init__(self, threshold: float = 0.8, bands: int = 16, rows: int = 4, k: int = 3):
+        self.threshold = threshold
+        self.bands, self.rows, self.k = bands, rows, k
+        self._hasher = MinHasher(num_perm=bands * rows)
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], List[str]] = {}
+        self._shingles: Dict[str, Set[str]] = {}
+        self._items: Dict[str, dict] = {}
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def candidate_probability(self, similarity: float) -> float:
+        """Probability that two sets with this Jaccard share at least one band."""
+        return 1 - (1 - similarity ** self.rows) ** self.bands
+
+    def _bands(self, sig: Tuple[int, ...]):
+        for b in range(self.bands):
+            yield (b, sig[b * self.rows:(b + 1) * self.rows])
+
+    def add(self, key: str, steps: str, title: str = "", item: dict = None) -> None:
+        shingles = step_shingles(steps, title, self.k)
+        sig = self._hasher.signature(shingles)
+        if sig is None:
+            return
+        self._shingles[key] = shingles
+        self._items[key] = item if item is not None else {"key": key}
+        for band in self._bands(sig):
+            self._buckets.setdefault(band, []).append(key)
+
+    def query(self, steps: str, title: str = "") -> List[Tuple[dict, float]]:
+        """Stored items whose similarity is >= threshold, best first."""
+        shingles = step_shingles(steps, title, self.k)
+        sig = self._hasher.signature(shingles)
+        if sig is None:
+            return []
+        candidates: Set[str] = set()
+        for band in self._bands(sig):
+            candidates.update(self._buckets.get(band, ()))
+        hits = []
+        for key in candidates:
+            score = jaccard(shingles, self._shingles[key])
+            if score >= self.threshold:
+                hits.append((self._items[key], score))
+        return sorted(hits, key=lambda h: h[1], reverse=True)
+
+
+def index_existing_tests(tests: List[dict], threshold: float = 0.8) -> NearDuplicateIndex:
+    """Builds an index from existing tests (dicts with key and gherkin/steps/feature)."""
+    index = NearDuplicateIndex(threshold=threshold)
+    for t in tests:
+        steps = t.get("gherkin") or t.get("steps") or t.get("feature") or ""
+        index.add(t["key"], steps, t.get("norm_title") or t.get("summary") or "", item=t)
+    return index
+
+
+def split_near_duplicates(scenarios: List[dict], index: NearDuplicateIndex) -> Tuple[List[dict], List[dict]]:
+    """
+    Splits new scenarios into (fresh, near_duplicates). Each near duplicate is
+    {"scenario", "match", "score"}. Fresh scenarios are also indexed, so two
+    rephrasings in the same batch collapse into one.
+    """
+    fresh, dupes = [], []
+    for i, sc in enumerate(scenarios):
+        hits = index.query(sc.get("steps", ""), sc.get("title", ""))
+        if hits:
+            match, score = hits[0]
+            dupes.append({"scenario": sc, "match": match, "score": round(score, 3)})
+            continue
+        fresh.append(sc)
+        index.add(f"__new_{i}", sc.get("steps", ""), sc.get("title", ""), item={"key": None, "title": sc.get("title")})
+    return fresh, dupes
@@ -0,0 +1,348 @@
+# src/core/providers.py
+"""
+Backends alternativos a Google GenAI para las llamadas al LLM.
+
+Todos exponen la misma superficie que genai.Client que usa el resto del código
+(client.models.generate_content / generate_content_stream y client.aio.models.*)
+y devuelven respuestas con .text y .usage_metadata, así que core.usage,
+core.llm, core.memory y los scripts funcionan sin cambios. gemini.get_client()
+elige el backend con LLM_PROVIDER:
+
+- google  (default) cliente real de AI Studio / Vertex.
+- stub    respuestas sintéticas deterministas (sin red), con latencia configurable.
+- replay  sirve respuestas grabadas en LLM_REPLAY_DIR; en un miss usa el stub
+          (o falla con LLM_REPLAY_STRICT=1).
+- record  llama al cliente real y graba cada respuesta para usarla con replay.
+- local   modelo local vía API compatible con OpenAI (llama.cpp server, Ollama,
+          LM Studio...) en LLM_LOCAL_URL; solo texto.
+
+La clave de grabación es el sha256 de (modelo, system instruction, textos y bytes
+de cada parte), la misma para record y replay.
+"""
+from __future__ import annotations
+import os
+import re
+import json
+import time
+import random
+import asyncio
+import hashlib
+import logging
+from abc import ABC, abstractmethod
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional
+
+import requests
+
+from . import disk_lru as DL
+
+log = logging.getLogger(__name__)
+
+REPLAY_DIR = os.getenv("LLM_REPLAY_DIR") or os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "cache", "llm_replay")
+)
+REPLAY_STRICT = os.getenv("LLM_REPLAY_STRICT", "").lower() in ("1", "true", "yes")
+STUB_LATENCY_MS = float(os.getenv("LLM_STUB_LATENCY_MS", "0"))
+STUB_JITTER_MS = float(os.getenv("LLM_STUB_JITTER_MS", "0"))
+STUB_ITEMS = int(os.getenv("LLM_STUB_ITEMS", "5"))
+STUB_CHUNK_CHARS = 64
+LOCAL_URL = os.getenv("LLM_LOCAL_URL", "http://localhost:11434/v1")
+LOCAL_MODEL = os.getenv("LLM_LOCAL_MODEL", "qwen2.5:3b-instruct")
+LOCAL_TIMEOUT = int(os.getenv("LLM_LOCAL_TIMEOUT", "300"))
+
+_LIST_KEY_RX = re.compile(r'\{\s*"(\w+)"\s*:\s*\[')
+# Vocabulario del stub: cada item usa otras palabras, así los escenarios de una
+# respuesta no son near-duplicates entre sí (core.near_dupe) y el pipeline los crea.
+_STUB_OBJECTS = ("login form", "shopping cart", "user profile", "search results", "invoice list",
+                 "password reset", "admin dashboard", "notification panel", "file upload", "checkout page")
+_STUB_ACTIONS = ("submits", "opens", "edits", "filters", "exports", "cancels", "refreshes", "shares")
+
+
+# ------------------------
+# Helpers comunes
+# ------------------------
+def _parts(contents: Any) -> List[Any]:
+    return list(contents) if isinstance(contents, (list, tuple)) else [contents]
+
+
+def _texts(contents: Any) -> List[str]:
+    return [p if isinstance(p, str) else (getattr(p, "text", None) or "") for p in _parts(contents)]
+
+
+def _system(config: Any) -> str:
+    system = getattr(config, "system_instruction", None)
+    return system if isinstance(system, str) else ""
+
+
+def request_key(model: str = None, contents: Any = None, config: Any = None, **_) -> str:
+    h = hashlib.sha256()
+    h.update(json.dumps([model or "", _system(config)], ensure_ascii=False).encode("utf-8"))
+    for p in _parts(contents):
+        if isinstance(p, str):
+            h.update(p.encode("utf-8"))
+        else:
+            h.update((getattr(p, "text", None) or "").encode("utf-8"))
+            blob = getattr(p, "inline_data", None)
+            h.update(getattr(blob, "data", None) or b"")
+    return h.hexdigest()
+
+
+def _usage(prompt_tokens: int, output_tokens: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        prompt_token_count=prompt_tokens, candidates_token_count=output_tokens, thoughts_token_count=0,
+        cached_content_token_count=0, total_token_count=prompt_tokens + output_tokens,
+    )
+
+
+def _response(text: str, prompt_chars: int = 0) -> SimpleNamespace:
+    return SimpleNamespace(text=text, usage_metadata=_usage(prompt_chars // 4, len(text) // 4))
+
+
+def _chunks(text: str, size: int = STUB_CHUNK_CHARS) -> List[SimpleNamespace]:
+    pieces = [text[i:i + size] for i in range(0, len(text), size)] or [""]
+    out = [SimpleNamespace(text=p, usage_metadata=None) for p in pieces]
+    out[-1].usage_metadata = _usage(0, len(text) // 4)
+    return out
+
+
+class _Models:
+    """Adapta generate()/stream() de un backend a la superficie client.models."""
+
+    def __init__(self, backend):
+        self._b = backend
+
+    def generate_content(self, **request):
+        return self._b.generate(**request)
+
+    def generate_content_stream(self, **request):
+        return self._b.stream(**request)
+
+
+class _AsyncModels:
+    def __init__(self, backend):
+        self._b = backend
+
+    async def generate_content(self, **request):
+        return await self._b.agenerate(**request)
+
+    async def generate_content_stream(self, **request):
+        return self._b.astream(**request)
+
+
+class Backend(ABC):
+    """Base: las subclases implementan generate(); el resto se deriva de ahí."""
+
+    name = "base"
+
+    def __init__(self):
+        self.models = _Models(self)
+        self.aio = SimpleNamespace(models=_AsyncModels(self))
+
+    @abstractmethod
+    def generate(self, **request) -> Any:
+        """Una respuesta con .text y .usage_metadata, como client.models.generate_content."""
+
+    def stream(self, **request) -> Iterator[Any]:
+        yield from _chunks(self.generate(**request).text)
+
+    async def agenerate(self, **request) -> Any:
+        return await asyncio.to_thread(self.generate, **request)
+
+    async def astream(self, **request):
+        for chunk in _chunks((await self.agenerate(**request)).text):
+            yield chunk
+
+
+# ------------------------
+# Stub determinista
+# ------------------------
+class StubBackend(Backend):
+    """
+    Respuestas sintéticas y reproducibles: la misma request produce siempre el
+    mismo texto. Busca en la system instruction la forma {"clave": [...]} pedida
+    (scenarios, tests_from_docs, final_tests...) y devuelve STUB_ITEMS items
+    con title/steps; si no la encuentra devuelve "{}" (p. ej. memory_update,
+    que entonces cae en su actualización determinista).
+    """
+
+    name = "stub"
+
+    def __init__(self, latency_ms: float = None, jitter_ms: float = None, items: int = None):
+        super().__init__()
+        self.latency_ms = STUB_LATENCY_MS if latency_ms is None else latency_ms
+        self.jitter_ms = STUB_JITTER_MS if jitter_ms is None else jitter_ms
+        self.items = STUB_ITEMS if items is None else items
+
+    def _delay(self, key: str) -> float:
+        rng = random.Random(key)
+        return max(0.0, self.latency_ms + rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+
+    def render(self, model: str = None, contents: Any = None, config: Any = None, **_) -> str:
+        key = request_key(model, contents, config)
+        m = _LIST_KEY_RX.search(_system(config))
+        if not m:
+            return "{}"
+        items = []
+        for i in range(1, self.items + 1):
+            tag = f"{key[:6]}-{i}"
+            obj = _STUB_OBJECTS[(i - 1) % len(_STUB_OBJECTS)]
+            action = _STUB_ACTIONS[(i - 1) % len(_STUB_ACTIONS)]
+            item = {
+                "title": f"Validate that stub scenario {tag} {action} the {obj}",
+                "steps": f"Given the {obj} is available ({tag})\nWhen the user {action} the {obj}\nThen the {obj} reflects the change",
+            }
+            if m.group(1) == "final_tests":
+                item["status"] = "Ready_for_Automation"
+            items.append(item)
+        return json.dumps({m.group(1): items}, ensure_ascii=False)
+
+    def generate(self, **request) -> Any:
+        time.sleep(self._delay(request_key(**request)))
+        return _response(self.render(**request), sum(len(t) for t in _texts(request.get("contents"))))
+
+    async def agenerate(self, **request) -> Any:
+        await asyncio.sleep(self._delay(request_key(**request)))
+        return _response(self.render(**request), sum(len(t) for t in _texts(request.get("contents"))))
+
+    def stream(self, **request) -> Iterator[Any]:
+        chunks = _chunks(self.render(**request))
+        per_chunk = self._delay(request_key(**request)) / len(chunks)
+        for chunk in chunks:
+            time.sleep(per_chunk)
+            yield chunk
+
+    async def astream(self, **request):
+        chunks = _chunks(self.render(**request))
+        per_chunk = self._delay(request_key(**request)) / len(chunks)
+        for chunk in chunks:
+            await asyncio.sleep(per_chunk)
+            yield chunk
+
+
+# ------------------------
+# Record / replay
+# ------------------------
+def _replay_path(key: str, root: str = None) -> str:
+    return os.path.join(root or REPLAY_DIR, key[:2], f"{key}.json")
+
+
+class ReplayBackend(StubBackend):
+    """Sirve respuestas grabadas (con la latencia del stub). Miss -> stub, o error si strict."""
+
+    name = "replay"
+
+    def __init__(self, root: str = None, strict: bool = None, **stub_kwargs):
+        super().__init__(**stub_kwargs)
+        self.root = root or REPLAY_DIR
+        self.strict = REPLAY_STRICT if strict is None else strict
+
+    def render(self, **request) -> str:
+        key = request_key(**request)
+        try:
+            with open(_replay_path(key, self.root), "r", encoding="utf-8") as f:
+                return json.load(f)["text"]
+        except (OSError, ValueError, KeyError):
+            if self.strict:
+                raise LookupError(f"Sin grabación para la request {key[:12]} en {self.root}")
+            log.debug(f"Replay miss {key[:12]}; usando stub.")
+            return super().render(**request)
+
+
+class RecordingBackend(Backend):
+    """Delega en el cliente real y graba cada respuesta completa para ReplayBackend."""
+
+    name = "record"
+
+    def __init__(self, client: Any, root: str = None):
+        super().__init__()
+        self._client = client
+        self.root = root or REPLAY_DIR
+
+    def _save(self, request: Dict[str, Any], text: str) -> None:
+        try:
+            DL.atomic_write(_replay_path(request_key(**request), self.root),
+                          json.dumps({"text": text}, ensure_ascii=False).encode("utf-8"))
+        except OSError as e:
+            log.warning(f"No se pudo grabar la respuesta: {e}")
+
+    def generate(self, **request) -> Any:
+        response = self._client.models.generate_content(**request)
+        self._save(request, response.text or "")
+        return response
+
+    def stream(self, **request) -> Iterator[Any]:
+        parts = []
+        for chunk in self._client.models.generate_content_stream(**request):
+            parts.append(chunk.text or "")
+            yield chunk
+        self._save(request, "".join(parts))
+
+    async def agenerate(self, **request) -> Any:
+        response = await self._client.aio.models.generate_content(**request)
+        self._save(request, response.text or "")
+        return response
+
+    async def astream(self, **request):
+        parts = []
+        async for chunk in await self._client.aio.models.generate_content_stream(**request):
+            parts.append(chunk.text or "")
+            yield chunk
+        self._save(request, "".join(parts))
+
+
+# ------------------------
+# Modelo local (API compatible con OpenAI)
+# ------------------------
+class LocalBackend(Backend):
+    """
+    Modelo local en CPU servido con una API /chat/completions compatible con
+    OpenAI. Las partes binarias (imágenes/PDF) se omiten.
+    """
+
+    name = "local"
+
+    def __init__(self, base_url: str = None, model: str = None, timeout: int = None):
+        super().__init__()
+        self.base_url = (base_url or LOCAL_URL).rstrip("/")
+        self.model = model or LOCAL_MODEL
+        self.timeout = timeout or LOCAL_TIMEOUT
+        self._session = requests.Session()
+
+    def generate(self, model: str = None, contents: Any = None, config: Any = None, **_) -> Any:
+        if any(not isinstance(p, str) and getattr(p, "inline_data", None) for p in _parts(contents)):
+            log.warning("El backend local ignora imágenes/PDF adjuntos.")
+        messages = []
+        if _system(config):
+            messages.append({"role": "system", "content": _system(config)})
+        messages.append({"role": "user", "content": "\n\n".join(t for t in _texts(contents) if t)})
+        body: Dict[str, Any] = {"model": self.model, "messages": messages}
+        if getattr(config, "temperature", None) is not None:
+            body["temperature"] = config.temperature
+        if getattr(config, "response_mime_type", None) == "application/json":
+            body["response_format"] = {"type": "json_object"}
+
+        r = self._session.post(f"{self.base_url}/chat/completions", json=body, timeout=self.timeout)
+        r.raise_for_status()
+        data = r.json()
+        usage = data.get("usage") or {}
+        return SimpleNamespace(
+            text=data["choices"][0]["message"]["content"] or "",
+            usage_metadata=_usage(usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)),
+        )
+
+
+def build(provider: str, google_client: Optional[Any] = None) -> Optional[Backend]:
+    """Backend para LLM_PROVIDER (None para 'google', que usa el cliente real tal cual)."""
+    if provider == "stub":
+        return StubBackend()
+    if provider == "replay":
+        return ReplayBackend()
+    if provider == "local":
+        return LocalBackend()
+    if provider == "record":
+        if google_client is None:
+            raise RuntimeError("LLM_PROVIDER=record necesita credenciales de Google.")
+        return RecordingBackend(google_client)
+    if provider not in ("", "google"):
+        raise ValueError(f"LLM_PROVIDER desconocido: {provider}")
+    return None
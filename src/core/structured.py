@@ -0,0 +1,254 @@
+# src/core/structured.py
+"""
+Salida estructurada del LLM: schemas de respuesta y parseo tolerante.
+
+Cada llamada que espera una lista JSON ({"scenarios": [...]}, {"tests_from_docs": [...]},
+{"final_tests": [...]}) declara su response_schema, así Gemini genera JSON válido
+por construcción. Si igual llega algo roto (otro backend, respuesta truncada,
+un carácter de más), salvage() rescata todos los objetos sanos del array y
+devuelve aparte los fragmentos rotos; solo esos se re-piden al modelo con
+reask_fragment(), en vez de regenerar la respuesta entera.
+"""
+from __future__ import annotations
+import os
+import re
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import usage as U
+
+log = logging.getLogger(__name__)
+
+# ------------------------
+# Schemas (subconjunto OpenAPI que acepta response_schema)
+# ------------------------
+TEST_ITEM = {
+    "type": "OBJECT",
+    "properties": {"title": {"type": "STRING"}, "steps": {"type": "STRING"}},
+    "required": ["title", "steps"],
+}
+FINAL_TEST_ITEM = {
+    "type": "OBJECT",
+    "properties": {
+        "title": {"type": "STRING"},
+        "steps": {"type": "STRING"},
+        "status": {"type": "STRING", "enum": ["Ready_for_Automation", "Missing_in_UI", "Undocumented_Feature"]},
+    },
+    "required": ["title", "steps", "status"],
+}
+
+
+def list_schema(key: str, item: Dict[str, Any]) -> Dict[str, Any]:
+    return {"type": "OBJECT", "properties": {key: {"type": "ARRAY", "items": item}}, "required": [key]}
+
+
+ITEM_SCHEMAS = {"scenarios": TEST_ITEM, "tests_from_docs": TEST_ITEM, "final_tests": FINAL_TEST_ITEM}
+SCENARIOS_SCHEMA = list_schema("scenarios", TEST_ITEM)
+DOCS_SCHEMA = list_schema("tests_from_docs", TEST_ITEM)
+FINAL_TESTS_SCHEMA = list_schema("final_tests", FINAL_TEST_ITEM)
+
+_TRAILING_COMMA_RX = re.compile(r",\s*([}\]])")
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"'})
+
+
+# ------------------------
+# Parseo tolerante
+# ------------------------
+def strip_fences(text: str) -> str:
+    """Quita las líneas ``` / ```json que algunos modelos agregan alrededor del JSON."""
+    if "```" in (text or ""):
+        return "\n".join(l for l in text.splitlines() if not l.strip().startswith("```"))
+    return text or ""
+
+
+def loads_lenient(fragment: str) -> Optional[Any]:
+    """json.loads que tolera saltos de línea crudos en strings, comas colgantes y comillas tipográficas."""
+    candidates = [fragment, _TRAILING_COMMA_RX.sub(r"\1", fragment)]
+    candidates.append(candidates[-1].translate(_SMART_QUOTES))
+    for c in candidates:
+        try:
+            return json.loads(c, strict=False)
+        except ValueError:
+            continue
+    return None
+
+
+class JsonListParser:
+    """
+    Parser incremental de {"<key>": [{...}, ...]}. feed() devuelve los objetos del
+    array que ya se cerraron y se pudieron leer; los que no, quedan en `broken`
+    (texto crudo) para re-pedirlos, con su posición en el array en `broken_at`.
+    finish() agrega el último objeto si quedó sin cerrar (respuesta truncada).
+    `items` acumula todo lo rescatado.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self.text = ""
+        self.items: List[Dict[str, Any]] = []
+        self.broken: List[str] = []
+        self.broken_at: List[int] = []
+        self._count = 0        # objetos cerrados hasta ahora (índice del próximo)
+        self._pos = 0          # próximo carácter a escanear
+        self._in_array = False
+        self._depth = 0        # profundidad de llaves dentro del array
+        self._start = None     # inicio del objeto actual
+        self._in_str = False
+        self._escape = False
+        self.done = False
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        self.text += chunk or ""
+        out: List[Dict[str, Any]] = []
+        if not self._in_array:
+            key = self.text.find(f'"{self.key}"')
+            bracket = self.text.find("[", key) if key >= 0 else -1
+            if bracket < 0:
+                return out
+            self._in_array, self._pos = True, bracket + 1
+
+        text, i = self.text, self._pos
+        while i < len(text) and not self.done:
+            ch = text[i]
+            if self._in_str:
+                if self._escape: self._escape = False
+                elif ch == "\\": self._escape = True
+                elif ch == '"': self._in_str = False
+            elif ch == '"':
+                self._in_str = True
+            elif ch == "{":
+                if self._depth == 0: self._start = i
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0 and self._start is not None:
+                    fragment = text[self._start:i + 1]
+                    obj = loads_lenient(fragment)
+                    if isinstance(obj, dict):
+                        out.append(obj)
+                    else:
+                        log.warning(f"Objeto mal formado en '{self.key}': {fragment[:80]!r}")
+                        self.broken.append(fragment)
+                        self.broken_at.append(self._count)
+                    self._count += 1
+                    self._start = None
+            elif ch == "]" and self._depth == 0:
+                self.done = True
+            i += 1
+        self._pos = i
+        self.items.extend(out)
+        return out
+
+    def finish(self) -> None:
+        if self._start is not None and not self.done:
+            self.broken.append(self.text[self._start:])
+            self.broken_at.append(self._count)
+            self._start = None
+
+
+def _salvage(text: str, key: str) -> Tuple[List[Dict[str, Any]], List[str], List[int]]:
+    whole = loads_lenient(strip_fences(text).strip())
+    if isinstance(whole, dict) and isinstance(whole.get(key), list):
+        return [x for x in whole[key] if isinstance(x, dict)], [], []
+    if isinstance(whole, list):
+        return [x for x in whole if isinstance(x, dict)], [], []
+    parser = JsonListParser(key)
+    parser.feed(text)
+    parser.finish()
+    if not parser._in_array and not parser.broken:
+        raise ValueError(f"La respuesta no contiene un array '{key}' legible.")
+    return parser.items, parser.broken, parser.broken_at
+
+
+def salvage(text: str, key: str) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """(objetos rescatados, fragmentos rotos) del array `key` de una respuesta."""
+    items, broken, _ = _salvage(text, key)
+    return items, broken
+
+
+def restore_order(items: List[Dict[str, Any]], broken_at: List[int], fixed: List[Optional[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Vuelve a poner cada objeto reparado (`fixed[i]`, None si no se pudo) en su
+    posición original `broken_at[i]`; los sanos (`items`, en orden) llenan el resto.
+    """
+    repaired = dict(zip(broken_at, fixed))
+    good = iter(items)
+    out: List[Dict[str, Any]] = []
+    for pos in range(len(items) + len(broken_at)):
+        if pos in repaired:
+            if repaired[pos]:
+                out.append(repaired[pos])
+        else:
+            out.append(next(good))
+    return out
+
+
+# ------------------------
+# Re-pedido dirigido
+# ------------------------
+def _reask_request(key: str, fragment: str, model: str = None) -> Dict[str, Any]:
+    from google.genai import types
+    prompt = (
+        f"This JSON object from a '{key}' list is malformed or truncated. Return it as ONE valid JSON object "
+        "with the same fields and the same content; complete a cut-off value only if it is obvious. "
+        "Return only the object.\n\n" + fragment
+    )
+    return {
+        "model": model or os.getenv("GEMINI_MODEL", "gemini-2.5-flash"),
+        "contents": [prompt],
+        "config": types.GenerateContentConfig(
+            response_mime_type="application/json",
+            response_schema=ITEM_SCHEMAS.get(key, {"type": "OBJECT"}),
+            temperature=0,
+        ),
+    }
+
+
+def _as_item(text: str) -> Optional[Dict[str, Any]]:
+    obj = loads_lenient(strip_fences(text or "").strip())
+    return obj if isinstance(obj, dict) and obj else None
+
+
+def reask_fragment(client, key: str, fragment: str, issue_key: str = None, model: str = None) -> Optional[Dict[str, Any]]:
+    """Pide al modelo que repare solo `fragment`. None si tampoco sale un objeto válido."""
+    try:
+        response = U.generate(client, "repair_fragment", issue_key, **_reask_request(key, fragment, model))
+        return _as_item(response.text)
+    except Exception as e:
+        log.warning(f"No se pudo reparar el fragmento de '{key}': {e}")
+        return None
+
+
+async def areask_fragment(client, key: str, fragment: str, issue_key: str = None, model: str = None) -> Optional[Dict[str, Any]]:
+    try:
+        response = await U.agenerate(client, "repair_fragment", issue_key, **_reask_request(key, fragment, model))
+        return _as_item(response.text)
+    except Exception as e:
+        log.warning(f"No se pudo reparar el fragmento de '{key}': {e}")
+        return None
+
+
+def parse_list(text: str, key: str, client=None, issue_key: str = None, model: str = None) -> List[Dict[str, Any]]:
+    """
+    Items del array `key`. Los fragmentos rotos se re-piden uno por uno si hay
+    `client`; sin cliente se descartan (con warning). Lanza ValueError solo si la
+    respuesta no tiene nada rescatable.
+    """
+    items, broken, broken_at = _salvage(text, key)
+    fixed = [reask_fragment(client, key, fragment, issue_key, model) if client else None for fragment in broken]
+    return _with_repaired(key, items, broken_at, fixed)
+
+
+async def aparse_list(text: str, key: str, client=None, issue_key: str = None, model: str = None) -> List[Dict[str, Any]]:
+    """Versión asyncio de parse_list (los re-pedidos van por client.aio)."""
+    items, broken, broken_at = _salvage(text, key)
+    fixed = [await areask_fragment(client, key, fragment, issue_key, model) if client else None for fragment in broken]
+    return _with_repaired(key, items, broken_at, fixed)
+
+
+def _with_repaired(key: str, items, broken_at, fixed) -> List[Dict[str, Any]]:
+    for obj in fixed:
+        if not obj:
+            log.warning(f"Se descartó un objeto de '{key}' que no se pudo reparar.")
+    return restore_order(items, broken_at, fixed)
@@ -0,0 +1,175 @@
+# src/core/stub_transport.py
+"""
+Transportes en memoria de Jira y ClickUp, para correr el pipeline completo
+(leer ticket -> generar -> crear Tests) sin red, p. ej. en run_llm_bench.py.
+
+- StubJira tiene la misma superficie que jira.JiraSession (request(path, params,
+  method, body)); se instala con install_jira() y todo core.jira (IssueSnapshot,
+  search_jql, bulk create, links, issueLinkType) pasa por él.
+- StubClickUp tiene la firma de clickup.clickup_request(method, path, params, body);
+  install_clickup() lo pone en core.clickup y en core.clickup_async.
+
+Cada request duerme una latencia configurable (determinista por path, igual que
+el stub de core.providers) y guarda lo creado, así un run ve sus propios Tests.
+Los tickets que se piden y no existen se inventan con una descripción sintética
+(párrafos + una tabla) y un comentario.
+"""
+from __future__ import annotations
+import re
+import time
+import random
+import asyncio
+import itertools
+import threading
+from typing import Dict
+
+from .adf import adf_to_text, plain_to_adf
+
+_ISSUE_RX = re.compile(r"^/rest/api/3/issue/([A-Z][A-Z0-9]*-\d+)(/comment)?$")
+_KEYS_RX = re.compile(r"key in \(([^)]*)\)")
+LINK_TYPES = [{"id": "10001", "name": "Tests"}, {"id": "10002", "name": "Blocks"}, {"id": "10003", "name": "Relates"}]
+
+
+def _sleep_for(latency_ms: float, jitter_ms: float, key: str) -> float:
+    rng = random.Random(key)
+    return max(0.0, latency_ms + rng.uniform(-jitter_ms, jitter_ms)) / 1000
+
+
+def _story_description(key: str, chars: int) -> dict:
+    filler = f"The user opens the {key} screen, fills the form and submits it. " * (chars // 60 + 1)
+    doc = plain_to_adf(filler[:chars])
+    doc["content"].append({"type": "table", "content": [
+        {"type": "tableRow", "content": [
+            {"type": "tableCell", "content": [{"type": "paragraph", "content": [{"type": "text", "text": cell}]}]}
+            for cell in row
+        ]} for row in (["Field", "Rule"], ["email", "required"], ["password", "8+ chars"])
+    ]})
+    return doc
+
+
+class StubJira:
+    """Jira Cloud en memoria con la interfaz de JiraSession."""
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, context_chars: int = 2000):
+        self.latency_ms, self.jitter_ms, self.context_chars = latency_ms, jitter_ms, context_chars
+        self.issues: Dict[str, dict] = {}
+        self.calls = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _story(self, key: str) -> dict:
+        return self.issues.setdefault(key, {"key": key, "fields": {
+            "summary": f"Story {key}", "issuetype": {"name": "Story"}, "labels": [],
+            "description": _story_description(key, self.context_chars), "issuelinks": [],
+            "comment": {"comments": [{
+                "author": {"displayName": "QA"}, "created": "2024-01-01T00:00:00.000+0000",
+                "body": plain_to_adf("Please cover the error messages for invalid emails."),
+            }]},
+        }})
+
+    def _create(self, fields: dict) -> dict:
+        key = f"{fields['project']['key']}-{100000 + next(self._ids)}"
+        self.issues[key] = {"key": key, "fields": {**fields, "issuelinks": [], "created": "", "updated": ""}}
+        return {"id": key, "key": key, "self": f"stub://{key}"}
+
+    def _link(self, body: dict) -> dict:
+        test, parent = body["inwardIssue"]["key"], body["outwardIssue"]["key"]
+        self._story(parent)["fields"]["issuelinks"].append({"type": body.get("type"), "outwardIssue": {"key": test}})
+        if test in self.issues:
+            self.issues[test]["fields"]["issuelinks"].append({"type": body.get("type"), "inwardIssue": {"key": parent}})
+        return {}
+
+    def _search(self, params: dict) -> dict:
+        m = _KEYS_RX.search(params.get("jql") or "")
+        keys = [k.strip() for k in m.group(1).split(",")] if m else []
+        return {"issues": [self.issues[k] for k in keys if k in self.issues], "isLast": True}
+
+    def request(self, path: str, params: dict = None, method: str = "GET", body: dict = None) -> dict:
+        time.sleep(_sleep_for(self.latency_ms, self.jitter_ms, f"{method} {path}"))
+        with self._lock:
+            self.calls += 1
+            m = _ISSUE_RX.match(path)
+            if path == "/rest/api/3/issue/bulk" and method == "POST":
+                return {"issues": [self._create(u["fields"]) for u in body["issueUpdates"]], "errors": []}
+            if path == "/rest/api/3/issue" and method == "POST":
+                return self._create(body["fields"])
+            if path == "/rest/api/3/issueLink" and method == "POST":
+                return self._link(body)
+            if path == "/rest/api/3/issueLinkType":
+                return {"issueLinkTypes": LINK_TYPES}
+            if path == "/rest/api/3/search/jql":
+                return self._search(params or {})
+            if m and m.group(2):
+                return {"comments": self._story(m.group(1))["fields"]["comment"]["comments"]}
+            if m and method == "PUT":
+                self.issues.setdefault(m.group(1), {"key": m.group(1), "fields": {}})["fields"].update((body or {}).get("fields", {}))
+                return {}
+            if m and method == "DELETE":
+                self.issues.pop(m.group(1), None)
+                return {}
+            if m:
+                return self._story(m.group(1))
+            raise ValueError(f"StubJira: {method} {path} no soportado")
+
+
+class StubClickUp:
+    """ClickUp en memoria con la firma de clickup_request (sync) y de clickup_async.clickup_request."""
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, context_chars: int = 2000):
+        self.latency_ms, self.jitter_ms, self.context_chars = latency_ms, jitter_ms, context_chars
+        self.tasks: Dict[str, dict] = {}
+        self.calls = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _task(self, task_id: str) -> dict:
+        return self.tasks.setdefault(task_id, {
+            "id": task_id, "name": f"Task {task_id}", "attachments": [],
+            "description": adf_to_text(_story_description(task_id, self.context_chars)),
+        })
+
+    def _handle(self, method: str, path: str, body: dict = None) -> dict:
+        with self._lock:
+            self.calls += 1
+            parts = path.strip("/").split("/")
+            if path == "/team":
+                return {"teams": [{"id": "stub-team"}]}
+            if parts[-1] == "custom_task_type":
+                return {"custom_task_types": [{"id": 1001, "name": "Test Case"}]}
+            if parts[0] == "list" and method == "POST":
+                task_id = f"stub{next(self._ids):06d}"
+                self.tasks[task_id] = {"id": task_id, "name": body["name"], "description": body.get("description", "")}
+                return {"id": task_id}
+            if parts[0] == "task" and len(parts) == 3 and parts[2] == "comment":
+                return {"comments": [{"user": {"username": "qa"}, "comment_text": "Please cover invalid emails too.", "date": "1"}]}
+            if parts[0] == "task" and "link" in parts:
+                return {}
+            if parts[0] == "task" and len(parts) == 2:
+                return self._task(parts[1])
+            raise ValueError(f"StubClickUp: {method} {path} no soportado")
+
+    def request(self, method: str, path: str, params: dict = None, body: dict = None) -> dict:
+        time.sleep(_sleep_for(self.latency_ms, self.jitter_ms, f"{method} {path}"))
+        return self._handle(method, path, body)
+
+    async def arequest(self, method: str, path: str, params: dict = None, body: dict = None) -> dict:
+        await asyncio.sleep(_sleep_for(self.latency_ms, self.jitter_ms, f"{method} {path}"))
+        return self._handle(method, path, body)
+
+
+def install_jira(stub: StubJira) -> StubJira:
+    """Todo core.jira pasa a usar `stub` (reemplaza la sesión compartida)."""
+    from . import jira as J
+    J._SESSION = stub
+    J._LINK_TYPE_IDS = None
+    return stub
+
+
+def install_clickup(stub: StubClickUp) -> StubClickUp:
+    """core.clickup y core.clickup_async pasan a usar `stub` en vez de la API."""
+    from . import clickup as C
+    from . import clickup_async as CA
+    C.clickup_request = stub.request
+    CA.clickup_request = stub.arequest
+    C._CACHED_TEAM_ID = C._CACHED_TEST_TYPE_ID = None
+    return stub
@@ -0,0 +1,255 @@
+# src/core/usage.py
+"""
+Usage and cost instrumentation for Gemini calls.
+
+Every generate_content call goes through generate() / agenerate() / stream() /
+astream(), which time the call, retry transient errors (429/5xx), read
+usage_metadata and write one row per call to a local SQLite store. Rows carry
+the operation name, the model, the prompt size, token counts, the estimated
+cost, and the issue key / request id set with `tags(...)` by the caller
+(contextvars, so it also follows asyncio tasks). Calls not tied to an issue
+(memory updates, local documents) leave issue_key empty and tag `source`
+instead (module name, file name).
+
+Query it with summarize() or `python run_llm_usage.py --by issue_key`.
+"""
+from __future__ import annotations
+import os
+import json
+import time
+import random
+import asyncio
+import sqlite3
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+log = logging.getLogger(__name__)
+
+USAGE_DB = os.getenv("LLM_USAGE_DB") or os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "cache", "llm_usage.sqlite3")
+)
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+BACKOFF = float(os.getenv("LLM_BACKOFF", "1.0"))
+RETRY_CODES = (429, 500, 502, 503, 504)
+
+# USD per 1M tokens (input, output). Override/extend with LLM_PRICES='{"model": [in, out]}'.
+PRICES: Dict[str, tuple] = {
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "gemini-2.5-pro": (1.25, 10.00),
+}
+PRICES.update({k: tuple(v) for k, v in json.loads(os.getenv("LLM_PRICES") or "{}").items()})
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_calls (
+    id             INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts             REAL NOT NULL,
+    rid            TEXT,
+    issue_key      TEXT,
+    source         TEXT,
+    operation      TEXT NOT NULL,
+    model          TEXT,
+    status         TEXT NOT NULL,
+    attempts       INTEGER NOT NULL,
+    latency_ms     INTEGER NOT NULL,
+    prompt_chars   INTEGER NOT NULL,
+    prompt_tokens  INTEGER NOT NULL,
+    output_tokens  INTEGER NOT NULL,
+    thought_tokens INTEGER NOT NULL,
+    cached_tokens  INTEGER NOT NULL,
+    total_tokens   INTEGER NOT NULL,
+    cost_usd       REAL NOT NULL,
+    error          TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_llm_calls_ts ON llm_calls(ts);
+CREATE INDEX IF NOT EXISTS idx_llm_calls_issue ON llm_calls(issue_key);
+"""
+_COLUMNS = ("ts", "rid", "issue_key", "source", "operation", "model", "status", "attempts", "latency_ms",
+            "prompt_chars", "prompt_tokens", "output_tokens", "thought_tokens", "cached_tokens", "total_tokens", "cost_usd", "error")
+GROUPS = ("issue_key", "source", "operation", "model", "rid", "status")
+
+_TAGS: contextvars.ContextVar = contextvars.ContextVar("llm_usage_tags", default={})
+
+
+@contextmanager
+def tags(**values):
+    """Tags every call recorded inside the block, e.g. `with tags(rid=rid, issue_key=key):` or `with tags(source=name):`."""
+    token = _TAGS.set({**_TAGS.get(), **{k: v for k, v in values.items() if v is not None}})
+    try:
+        yield
+    finally:
+        _TAGS.reset(token)
+
+
+class UsageStore:
+    """Thread-safe handle over the SQLite usage log."""
+
+    def __init__(self, path: str = None):
+        self.path = path or USAGE_DB
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.executescript(_SCHEMA)
+            columns = {r["name"] for r in self._conn.execute("PRAGMA table_info(llm_calls)")}
+            if "source" not in columns:  # logs written before the source column
+                self._conn.execute("ALTER TABLE llm_calls ADD COLUMN source TEXT")
+
+    def insert(self, row: Dict[str, Any]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT INTO llm_calls ({','.join(_COLUMNS)}) VALUES ({','.join('?' * len(_COLUMNS))})",
+                tuple(row.get(c) for c in _COLUMNS),
+            )
+
+    def summarize(self, by: str = "issue_key", since: float = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Totals grouped by `by` (one of GROUPS), most expensive first."""
+        if by not in GROUPS:
+            raise ValueError(f"by must be one of {GROUPS}")
+        sql = (
+            f"SELECT {by} AS key, COUNT(*) AS calls, SUM(attempts - 1) AS retries, "
+            "SUM(prompt_tokens) AS prompt_tokens, SUM(output_tokens) AS output_tokens, "
+            "SUM(total_tokens) AS total_tokens, ROUND(SUM(cost_usd), 6) AS cost_usd, "
+            "CAST(AVG(latency_ms) AS INTEGER) AS avg_latency_ms, MAX(latency_ms) AS max_latency_ms, "
+            "SUM(status = 'error') AS errors, SUM(status = 'cache') AS cache_hits "
+            "FROM llm_calls WHERE ts >= ? GROUP BY key ORDER BY cost_usd DESC, total_tokens DESC LIMIT ?"
+        )
+        with self._lock:
+            return [dict(r) for r in self._conn.execute(sql, (since or 0, limit))]
+
+
+_STORE: Optional[UsageStore] = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_store() -> UsageStore:
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = UsageStore()
+        return _STORE
+
+
+def estimate_cost(model: str, prompt_tokens: int, output_tokens: int) -> float:
+    price_in, price_out = PRICES.get(model or "", (0.0, 0.0))
+    return (prompt_tokens * price_in + output_tokens * price_out) / 1_000_000
+
+
+def prompt_chars(contents: Any, config: Any = None) -> int:
+    """Text characters sent (system instruction + text parts); binary parts are not counted."""
+    items = contents if isinstance(contents, (list, tuple)) else [contents]
+    total = sum(len(c) for c in items if isinstance(c, str))
+    total += sum(len(getattr(c, "text", None) or "") for c in items if not isinstance(c, str))
+    system = getattr(config, "system_instruction", None)
+    return total + (len(system) if isinstance(system, str) else 0)
+
+
+def _tokens(usage: Any) -> Dict[str, int]:
+    get = lambda name: int(getattr(usage, name, None) or 0)
+    return {
+        "prompt_tokens": get("prompt_token_count"),
+        # thinking tokens are billed as output
+        "output_tokens": get("candidates_token_count") + get("thoughts_token_count"),
+        "thought_tokens": get("thoughts_token_count"),
+        "cached_tokens": get("cached_content_token_count"),
+        "total_tokens": get("total_token_count"),
+    }
+
+
+def record(operation: str, model: str = None, status: str = "ok", latency: float = 0.0, attempts: int = 1,
+           chars: int = 0, usage: Any = None, error: str = None, issue_key: str = None) -> Dict[str, Any]:
+    """Writes one row. Never raises: instrumentation must not break a generation."""
+    tokens = _tokens(usage)
+    tagged = {**_TAGS.get(), **({"issue_key": issue_key} if issue_key else {})}
+    row = {
+        "ts": time.time(), "rid": tagged.get("rid"), "issue_key": tagged.get("issue_key"),
+        "source": tagged.get("source"), "operation": operation, "model": model, "status": status,
+        "attempts": attempts, "latency_ms": int(latency * 1000), "prompt_chars": chars, **tokens,
+        "cost_usd": estimate_cost(model, tokens["prompt_tokens"], tokens["output_tokens"]), "error": error,
+    }
+    try:
+        get_store().insert(row)
+    except Exception as e:
+        log.warning(f"No se pudo registrar el uso del LLM: {e}")
+    return row
+
+
+def retryable(e: Exception) -> bool:
+    return getattr(e, "code", None) in RETRY_CODES
+
+
+def _delay(attempt: int) -> float:
+    return BACKOFF * (2 ** (attempt - 1)) + random.uniform(0, BACKOFF / 2)
+
+
+def generate(client, operation: str, issue_key: str = None, **request) -> Any:
+    """client.models.generate_content(**request), instrumented and retried on 429/5xx."""
+    model, chars = request.get("model"), prompt_chars(request.get("contents"), request.get("config"))
+    start, attempt = time.monotonic(), 0
+    while True:
+        attempt += 1
+        try:
+            response = client.models.generate_content(**request)
+        except Exception as e:
+            if retryable(e) and attempt <= MAX_RETRIES:
+                time.sleep(_delay(attempt))
+                continue
+            record(operation, model, "error", time.monotonic() - start, attempt, chars, error=str(e)[:500], issue_key=issue_key)
+            raise
+        record(operation, model, "ok", time.monotonic() - start, attempt, chars, getattr(response, "usage_metadata", None), issue_key=issue_key)
+        return response
+
+
+async def agenerate(client, operation: str, issue_key: str = None, **request) -> Any:
+    """Async version of generate() over client.aio."""
+    model, chars = request.get("model"), prompt_chars(request.get("contents"), request.get("config"))
+    start, attempt = time.monotonic(), 0
+    while True:
+        attempt += 1
+        try:
+            response = await client.aio.models.generate_content(**request)
+        except Exception as e:
+            if retryable(e) and attempt <= MAX_RETRIES:
+                await asyncio.sleep(_delay(attempt))
+                continue
+            record(operation, model, "error", time.monotonic() - start, attempt, chars, error=str(e)[:500], issue_key=issue_key)
+            raise
+        record(operation, model, "ok", time.monotonic() - start, attempt, chars, getattr(response, "usage_metadata", None), issue_key=issue_key)
+        return response
+
+
+def stream(client, operation: str, issue_key: str = None, **request) -> Iterator[Any]:
+    """Instrumented generate_content_stream. Usage comes in the last chunk; no retry once chunks flowed."""
+    model, chars = request.get("model"), prompt_chars(request.get("contents"), request.get("config"))
+    start, usage = time.monotonic(), None
+    try:
+        for chunk in client.models.generate_content_stream(**request):
+            usage = getattr(chunk, "usage_metadata", None) or usage
+            yield chunk
+    except Exception as e:
+        record(operation, model, "error", time.monotonic() - start, 1, chars, usage, str(e)[:500], issue_key=issue_key)
+        raise
+    record(operation, model, "ok", time.monotonic() - start, 1, chars, usage, issue_key=issue_key)
+
+
+async def astream(client, operation: str, issue_key: str = None, **request):
+    """Async version of stream()."""
+    model, chars = request.get("model"), prompt_chars(request.get("contents"), request.get("config"))
+    start, usage = time.monotonic(), None
+    try:
+        async for chunk in await client.aio.models.generate_content_stream(**request):
+            usage = getattr(chunk, "usage_metadata", None) or usage
+            yield chunk
+    except Exception as e:
+        record(operation, model, "error", time.monotonic() - start, 1, chars, usage, str(e)[:500], issue_key=issue_key)
+        raise
+    record(operation, model, "ok", time.monotonic() - start, 1, chars, usage, issue_key=issue_key)
+
+
+def summarize(by: str = "issue_key", since: float = None, limit: int = 50) -> List[Dict[str, Any]]:
+    return get_store().summarize(by, since, limit)
@@ -11,10 +11,9 @@ from discord.ui import Select, View
 from pymongo import MongoClient
 from dotenv import load_dotenv
 # Importaciones de QA Autopilot
-from core import clickup as C
+from core import clickup_async as CA
 from core import llm as L
 from core import gherkin as G
-from core.clickup import find_test_case_type_id
 from core.discord_utils import chunk_message
 from keep_alive import keep_alive
 load_dotenv()
@@ -63,7 +62,12 @@ logs_collection = db["logs_ejecucion"]
 # --- INICIALIZACIÓN DEL BOT ---
 intents = discord.Intents.default()
 intents.message_content = True
-bot = commands.Bot(command_prefix='!', intents=intents)
+class KupyoBot(commands.Bot):
+    async def close(self):
+        # bot.run() llama a close() al apagarse: cerramos la sesión aiohttp de core.clickup_async
+        await CA.close()
+        await super().close()
+bot = KupyoBot(command_prefix='!', intents=intents)
 # ==========================================
 # LÓGICA DE APOYO (RULETA)
 # ==========================================
@@ -344,14 +348,30 @@ class DestinationSelect(Select):
         try:
             is_backend = "[be]" in self.task_data["summary"].lower()
             sys_prompt = L.SYS_MSG_GENERATE_API_TESTS if is_backend else L.SYS_MSG_GENERATE_SCENARIOS
-            scenarios, _ = await asyncio.to_thread(L.llm_generate_scenarios, issue_key=self.task_id, summary=self.task_data["summary"], full_context=self.task_data["full_context"], system_prompt=sys_prompt, images=self.task_data.get("images"), max_tests=50)
-            if not scenarios: return await self.ctx.send("⚠️ No se generó nada.")
-            msg = await self.ctx.send(f"✍️ Escribiendo **{len(scenarios)}** tests...")
+            msg = await self.ctx.send("✍️ Escribiendo tests a medida que la IA los genera...")
+            # Cada escenario se crea en ClickUp apenas Gemini termina de escribirlo
+            scenarios, stream_error = [], None
+            async def items():
+                nonlocal stream_error
+                try:
+                    async for sc in L.allm_stream_scenarios(issue_key=self.task_id, summary=self.task_data["summary"], full_context=self.task_data["full_context"], system_prompt=sys_prompt, images=self.task_data.get("images"), max_tests=50):
+                        scenarios.append(sc)
+                        yield {"summary": f"TC{len(scenarios):02d} | {self.task_id} | {sc['title']}", "gherkin": G.build_feature_single(self.task_data["summary"], self.task_id, sc)}
+                except Exception as e: stream_error = e
+            results = await CA.create_test_tasks_stream(self.task_id, items(), list_id)
+            if not scenarios: return await msg.edit(content=f"⚠️ No se generó nada.{f' ({stream_error})' if stream_error else ''}")
             links = []
-            for i, sc in enumerate(scenarios, 1):
-                res = await asyncio.to_thread(C.create_test_task, self.task_id, f"TC{i:02d} | {self.task_id} | {sc['title']}", G.build_feature_single(self.task_data["summary"], self.task_id, sc), list_id)
-                links.append(f"• [`TC{i:02d}`]({res.get('url')}) {sc['title']}")
+            for i, (sc, res) in enumerate(zip(scenarios, results), 1):
+                if res.get("ok"):
+                    links.append(f"• [`TC{i:02d}`]({res.get('url')}) {sc['title']}")
+                else:
+                    links.append(f"• ❌ `TC{i:02d}` {sc['title']} — {res.get('error')}")
+            failed = sum(1 for res in results if not res.get("ok"))
             header = f"🎉 **Tests creados para: {self.task_data['summary']}**\n"
+            if failed:
+                header += f"⚠️ {failed} de {len(results)} no se pudieron crear.\n"
+            if stream_error:
+                header += f"⚠️ La IA se cortó después de {len(scenarios)} escenarios: {stream_error}\n"
             chunks = chunk_message(header, links)
             if chunks:
                 await msg.edit(content=chunks[0])
@@ -361,9 +381,14 @@ class DestinationSelect(Select):
 @bot.command(name="clickup")
 async def cmd_clickup(ctx, task_id: str):
     try:
-        task_data = await asyncio.to_thread(C.get_task, task_id)
-        lists = await asyncio.to_thread(C.get_testing_lists)
+        task_data, lists = await asyncio.gather(CA.get_task(task_id), CA.get_testing_lists())
         await ctx.send(f"📂 Tarea: **{task_data['summary']}**", view=View().add_item(DestinationSelect(lists, task_id, task_data, ctx)))
     except Exception as e: await ctx.send(f"🔥 Error: {e}")
+@bot.command(name="refresh_lists")
+async def cmd_refresh_lists(ctx):
+    try:
+        lists = await CA.get_testing_lists(force_refresh=True)
+        await ctx.send(f"🔄 Índice de listas actualizado: **{len(lists)}** listas de testing.")
+    except Exception as e: await ctx.send(f"🔥 Error: {e}")
 if __name__ == "__main__":
     if TOKEN: keep_alive(); bot.run(TOKEN)
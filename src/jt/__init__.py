@@ -5,40 +5,27 @@ import logging
 import os
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from typing import Any, Dict, List
 
 # Core layer
-from core import adf as A
 from core import dedupe as D
 from core import gherkin as G
 from core import jira as J
 from core import clickup as C  # <--- NUEVO IMPORT
+from core import context as CTX
 from core import llm as L
-from core.config import DEFAULT_PROJECT_KEY, RELATES_LINK_TYPE, CLICKUP_DEFAULT_LIST_ID
+from core import mirror as MR
+from core import near_dupe as ND
+from core import usage as U
+from core.config import DEFAULT_PROJECT_KEY, RELATES_LINK_TYPE, CLICKUP_DEFAULT_LIST_ID, CLICKUP_CREATE_CONCURRENCY
 
 log = logging.getLogger(__name__)
 
 # --- Configuration Constants ---
-MAX_CONTEXT_CHARS = int(os.getenv("LLM_MAX_CONTEXT_CHARS", "16000"))
-MAX_COMMENTS = int(os.getenv("LLM_MAX_COMMENTS", "10"))
-MAX_COMMENT_CHARS = int(os.getenv("LLM_MAX_COMMENT_CHARS", "600"))
-
-# --- Helper for formatting comments (SOLO PARA JIRA) ---
-def format_and_filter_comments(comments_data: list) -> str:
-    if not comments_data:
-        return "No additional comments."
-    formatted_comments: List[str] = []
-    noise_filter = ("listo", "hecho", "done", "ok", "gracias", "de acuerdo")
-    for comment in comments_data[:MAX_COMMENTS]:
-        body_raw = comment.get("body", {})
-        body_text = A.adf_to_text(body_raw).strip() if isinstance(body_raw, dict) else str(body_raw).strip()
-        if not body_text or len(body_text.split()) < 3 or body_text.lower() in noise_filter:
-            continue
-        if len(body_text) > MAX_COMMENT_CHARS:
-            body_text = body_text[:MAX_COMMENT_CHARS] + " [...]"
-        author = comment.get("author", {}).get("displayName", "User")
-        formatted_comments.append(f"- Comment from {author}: {body_text}")
-    return "\n".join(formatted_comments) if formatted_comments else "No relevant comments found."
+MAX_CONTEXT_CHARS = CTX.MAX_CONTEXT_CHARS
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.8"))
 
 # --- Helper interno para crear issues en Jira ---
 def _create_and_process_jira_test_case(**kwargs) -> Dict[str, Any]:
@@ -46,18 +33,32 @@ def _create_and_process_jira_test_case(**kwargs) -> Dict[str, Any]:
         project_key=kwargs['project_key'], summary=kwargs['summary'],
         description_text=kwargs['description'], gherkin=kwargs['gherkin_text'], labels=kwargs['labels']
     )
-    new_key = created_issue["key"]
-    try:
-        J.link_issues(new_key, kwargs['source_issue_key'], link_type=kwargs['link_type'])
-    except Exception:
-        J.link_issues(new_key, kwargs['source_issue_key'], link_type=RELATES_LINK_TYPE)
+    return _process_created_jira_test_case(created_issue["key"], **kwargs)
+
+def _process_created_jira_test_case(new_key: str, **kwargs) -> Dict[str, Any]:
+    """
+    Link + attach + Xray para un Test ya creado (individualmente o en bulk).
+    ok=False (con `errors`) si alguno de los pasos falló; el Test igual queda creado.
+    """
+    errors = []
+    link = J.link_issues(new_key, kwargs['source_issue_key'], link_type=kwargs['link_type'])
+    if not link.get("ok") and kwargs['link_type'] != RELATES_LINK_TYPE:
+        link = J.link_issues(new_key, kwargs['source_issue_key'], link_type=RELATES_LINK_TYPE)
+    if not link.get("ok"):
+        errors.append(f"link to {kwargs['source_issue_key']}: {link.get('error')}")
     if kwargs['attach_feature']:
         try: J.attach_feature(new_key, kwargs['gherkin_text'], filename=kwargs['filename'])
-        except Exception as e: logging.error(f"Failed to attach feature to {new_key}: {e}")
+        except Exception as e:
+            logging.error(f"Failed to attach feature to {new_key}: {e}")
+            errors.append(f"attach feature: {e}")
     if kwargs['fill_xray']:
         try: J.xray_import_feature(kwargs['gherkin_text'], project_key=kwargs['project_key'], test_key=new_key)
-        except Exception as e: logging.error(f"Failed to import to Xray for {new_key}: {e}")
-    return {"test_key": new_key, "summary": kwargs['summary'], "preview": kwargs['gherkin_text'][:300]}
+        except Exception as e:
+            logging.error(f"Failed to import to Xray for {new_key}: {e}")
+            errors.append(f"xray import: {e}")
+    out = {"ok": not errors, "test_key": new_key, "summary": kwargs['summary'], "preview": kwargs['gherkin_text'][:300]}
+    if errors: out["errors"] = errors
+    return out
 
 
 # --- Tool Registration ---
@@ -81,52 +82,104 @@ def register_tools(mcp: Any):
         issue_key: str,
         target_project_key: str = DEFAULT_PROJECT_KEY,
         max_tests: int = 20,
-        delete_obsolete: bool = False
+        delete_obsolete: bool = False,
+        use_cache: bool = True
     ) -> Dict[str, Any]:
         """Genera tests Gherkin para un ticket de JIRA."""
         rid = uuid.uuid4().hex[:8]
         log.info(f"[{rid}] Iniciando JIRA flow para {issue_key}…")
 
-        src = J.get_issue(issue_key)
+        # Snapshot del run: issue, comentarios y tests linkeados se leen una sola vez
+        # (los tests, del mirror local si JIRA_MIRROR_ENABLED)
+        mirror = MR.ensure_synced(target_project_key)
+        snap = J.IssueSnapshot(issue_key, target_project_key, mirror=mirror)
+        src = snap.issue()
         if not src.get("ok"): return {"ok": False, "error": "Could not read source issue."}
 
         # 1. Preparar Contexto (Complejo por ADF)
-        summary_src, desc = src["summary"], src["description"]
-        comments_data = J.jira_request(f"/rest/api/3/issue/{issue_key}/comment").get("comments", [])
-        relevant_comments = format_and_filter_comments(comments_data)
-        full_context = f"STORY:\n{desc}\n\nCOMMENTS:\n{relevant_comments}"
+        # Las tablas van como sección TABLES: la descripción sin sus celdas, así no se cuentan dos veces
+        summary_src, desc = src["summary"], src["description_without_tables"]
+        # Cada documento ADF (descripción y comentarios) se recorre una sola vez por run
+        comments = CTX.jira_comments(snap.comments(), snap.adf_text)
+        tables = src["description_tables"]
+        full_context = CTX.pack_ticket(summary_src, desc, comments, tables, max_chars=MAX_CONTEXT_CHARS)
+        log.info(f"[{rid}] Contexto: {len(full_context)} chars (~{CTX.estimate_tokens(full_context)} tokens).")
         
         # 2. Generar con IA
         system_prompt = L.SYS_MSG_GENERATE_SCENARIOS # Simplificado para el ejemplo
         if "[be]" in summary_src.lower(): system_prompt = L.SYS_MSG_GENERATE_API_TESTS
         
-        ideal_scenarios, _ = L.llm_generate_scenarios(issue_key, summary_src, full_context, max_tests, system_prompt)
+        with U.tags(rid=rid):
+            ideal_scenarios, _ = L.llm_generate_scenarios(issue_key, summary_src, full_context, max_tests, system_prompt, use_cache=use_cache)
         if not ideal_scenarios: return {"ok": False, "error": "LLM failed"}
 
         # 3. Sincronización (Update/Create/Obsolete)
-        existing_tests = J.get_existing_tests_with_details(issue_key, target_project_key)
+        existing_tests = snap.existing_tests_with_details()
         sync_plan = L.llm_compare_and_sync(issue_key, summary_src, existing_tests, ideal_scenarios)
 
         report = {"created": [], "updated": [], "deleted": []}
 
-        # Ejecutar Updates
-        for item in sync_plan.get("to_update", []):
-            J.update_test_issue(item['key'], item['summary'], item['steps'])
-            report["updated"].append(item['key'])
-
-        # Ejecutar Creates
-        cur_index = J.next_tc_index(issue_key, target_project_key)
+        # Near-duplicates: escenarios que la IA reescribió con otras palabras no se vuelven a crear
+        near_index = ND.index_existing_tests(existing_tests, threshold=NEAR_DUP_THRESHOLD)
+        fresh, near = ND.split_near_duplicates(sync_plan.get("to_create", []), near_index)
+        near_keys = {n["match"].get("key") for n in near}
+        sync_plan["to_create"] = fresh
+        sync_plan["obsolete"] = [t for t in sync_plan.get("obsolete", []) if t["key"] not in near_keys]
+        if near:
+            report["near_duplicates"] = [
+                {"title": n["scenario"]["title"], "existing_key": n["match"].get("key"), "score": n["score"]} for n in near
+            ]
+
+        # Ejecutar Updates (en paralelo)
+        to_update = sync_plan.get("to_update", [])
+        updates = J.update_test_issues_batch(to_update)
+        for item, res in zip(to_update, updates["results"]):
+            if res.get("ok"):
+                report["updated"].append(item['key'])
+                if mirror: mirror.put_test(item['key'], target_project_key, item['summary'], item['steps'])
+            else: report.setdefault("failed", []).append({"title": item['summary'], "error": res.get("error")})
+
+        # Ejecutar Creates (bulk: hasta 50 por request)
+        cur_index = snap.next_tc_index()
+        pending = []
         for item in sync_plan.get("to_create", []):
             tc_tag = f"TC{cur_index:02d}"
-            feature_text = G.build_feature_single(summary=summary_src, issue_key=issue_key, sc=item)
-            res = _create_and_process_jira_test_case(
-                project_key=target_project_key, summary=f"{issue_key} | {tc_tag} | {item['title']}",
-                gherkin_text=feature_text, source_issue_key=issue_key, 
-                description="Auto-generated", labels=["mcp", "auto-generated"], 
-                link_type="Tests", attach_feature=True, fill_xray=False, filename=f"{issue_key}-{tc_tag}.feature"
-            )
-            report["created"].append(res["test_key"])
+            pending.append({
+                "title": item["title"], "tc_tag": tc_tag,
+                "summary": f"{issue_key} | {tc_tag} | {item['title']}",
+                "gherkin_text": G.build_feature_single(summary=summary_src, issue_key=issue_key, sc=item),
+            })
             cur_index += 1
+
+        created = J.create_test_issues_bulk(target_project_key, [
+            {"summary": p["summary"], "description_text": "Auto-generated",
+             "gherkin": p["gherkin_text"], "labels": ["mcp", "auto-generated"]}
+            for p in pending
+        ])
+        post_process = []
+        for p, res in zip(pending, created):
+            if not res.get("ok"):
+                log.error(f"[{rid}] No se pudo crear '{p['title']}': {res.get('error')}")
+                report.setdefault("failed", []).append({"title": p["title"], "error": res.get("error")})
+                continue
+            post_process.append(partial(
+                _process_created_jira_test_case, res["key"], project_key=target_project_key, summary=p["summary"],
+                gherkin_text=p["gherkin_text"], source_issue_key=issue_key,
+                link_type="Tests", attach_feature=True, fill_xray=False, filename=f"{issue_key}-{p['tc_tag']}.feature"
+            ))
+        # Links/attach de todos los creados en paralelo (el link type se resuelve una sola vez)
+        J.resolve_link_type_id("Tests")
+        processed = J.run_concurrently(post_process)
+        for key, res in zip([r["key"] for r in created if r.get("ok")], processed["results"]):
+            if not res.get("ok"):
+                errors = res.get("errors") or [res.get("error")]
+                log.error(f"[{rid}] Post-proceso incompleto para {key}: {errors}")
+                report.setdefault("post_process_failed", []).append({"key": key, "errors": errors})
+        report["created"].extend(res["key"] for res in created if res.get("ok"))
+        if mirror:
+            for p, res in zip(pending, created):
+                if res.get("ok"):
+                    mirror.put_test(res["key"], target_project_key, p["summary"], p["gherkin_text"], parents=[issue_key])
             
         return {"ok": True, "report": report}
 
@@ -137,7 +190,8 @@ def register_tools(mcp: Any):
     def clickup_generate_tests(
         task_id: str,
         list_id: str = CLICKUP_DEFAULT_LIST_ID,
-        max_tests: int = 10
+        max_tests: int = 10,
+        use_cache: bool = True
     ) -> Dict[str, Any]:
         """Genera tests Gherkin para una tarea de CLICKUP."""
         rid = uuid.uuid4().hex[:8]
@@ -151,19 +205,32 @@ def register_tools(mcp: Any):
         is_backend = "[be]" in task_data["summary"].lower()
         sys_prompt = L.SYS_MSG_GENERATE_API_TESTS if is_backend else L.SYS_MSG_GENERATE_SCENARIOS
         
-        ideal_scenarios, _ = L.llm_generate_scenarios(
+        stream = L.llm_stream_scenarios(
             issue_key=task_id, 
             summary=task_data["summary"], 
             full_context=task_data["full_context"], 
             max_tests=max_tests, 
-            system_prompt=sys_prompt
+            system_prompt=sys_prompt,
+            use_cache=use_cache
         )
 
-        # 3. Crear en ClickUp (Sin lógica compleja de sync por ahora, directo al grano)
-        created = []
-        for sc in ideal_scenarios:
-            gherkin = G.build_feature_single(task_data["summary"], task_id, sc)
-            res = C.create_test_task(task_id, f"[TEST] {sc['title']}", gherkin, list_id)
-            created.append(res["key"])
-
-        return {"ok": True, "created_tasks": created}
\ No newline at end of file
+        # 3. Crear en ClickUp a medida que llegan los escenarios (Sin lógica compleja de sync por ahora)
+        futures, error = [], None
+        with ThreadPoolExecutor(max_workers=CLICKUP_CREATE_CONCURRENCY) as pool, U.tags(rid=rid):
+            try:
+                for sc in stream:
+                    gherkin = G.build_feature_single(task_data["summary"], task_id, sc)
+                    futures.append(pool.submit(C.create_test_task, task_id, f"[TEST] {sc['title']}", gherkin, list_id))
+            except Exception as e:
+                log.error(f"[{rid}] Stream del LLM cortado: {e}")
+                error = str(e)
+        created, failed = [], []
+        for fut in futures:
+            try: created.append(fut.result()["key"])
+            except Exception as e: failed.append(str(e))
+
+        if not futures and error: return {"ok": False, "error": error}
+        out = {"ok": True, "created_tasks": created}
+        if failed: out["failed"] = failed
+        if error: out["error"] = error
+        return out
\ No newline at end of file
@@ -41,4 +41,56 @@ def test_adf_extract_codeblocks():
     
     blocks = adf_extract_codeblocks(adf)
     assert len(blocks) == 1
-    assert blocks[0] == "Given a user\nWhen..."
\ No newline at end of file
+    assert blocks[0] == "Given a user\nWhen..."
+def test_analyze_adf_single_pass_results():
+    """Tests that one analysis exposes text, tables, links, media and code blocks."""
+    from core.adf import analyze_adf
+    adf = {"type": "doc", "content": [
+        {"type": "heading", "content": [{"type": "text", "text": "Title"}]},
+        {"type": "paragraph", "content": [
+            {"type": "text", "text": "see ", "marks": []},
+            {"type": "text", "text": "docs", "marks": [{"type": "link", "attrs": {"href": "https://x"}}]},
+        ]},
+        {"type": "bulletList", "content": [
+            {"type": "listItem", "content": [{"type": "paragraph", "content": [{"type": "text", "text": "one"}]}]},
+        ]},
+        {"type": "table", "content": [
+            {"type": "tableRow", "content": [
+                {"type": "tableHeader", "content": [{"type": "paragraph", "content": [{"type": "text", "text": " A "}]}]},
+                {"type": "tableCell", "content": [{"type": "paragraph", "content": [{"type": "text", "text": "B"}]}]},
+            ]},
+        ]},
+        {"type": "mediaSingle", "content": [{"type": "media"}]},
+        {"type": "codeBlock", "attrs": {"language": "gherkin"}, "content": [{"type": "text", "text": "Given x"}]},
+    ]}
+    a = analyze_adf(adf)
+    assert a.text == "Title\nsee docs\n- one\nA\nB"
+    assert a.text_without_tables == "Title\nsee docs\n- one"
+    assert a.tables == [[["A", "B"]]]
+    assert a.links == ["https://x"]
+    assert a.has_media is True
+    assert a.codeblocks() == ["Given x"]
+    assert a.codeblocks(lang="") == ["Given x"]
+
+def test_packed_context_counts_table_text_once():
+    """Tests that with tables passed as their own section the cells are not also in the description."""
+    from core.adf import analyze_adf
+    from core import context as CTX
+    adf = {"type": "doc", "content": [
+        {"type": "paragraph", "content": [{"type": "text", "text": "Limits per plan"}]},
+        {"type": "table", "content": [{"type": "tableRow", "content": [
+            {"type": "tableCell", "content": [{"type": "paragraph", "content": [{"type": "text", "text": "Gold plan"}]}]},
+            {"type": "tableCell", "content": [{"type": "paragraph", "content": [{"type": "text", "text": "100 users"}]}]},
+        ]}]},
+    ]}
+    a = analyze_adf(adf)
+    out = CTX.pack_ticket("Plans", a.text_without_tables, tables=a.tables)
+    assert out.count("Gold plan") == 1
+    assert "Gold plan | 100 users" in out
+
+def test_adf_to_text_deep_nesting_does_not_recurse():
+    """Tests that very deep documents are walked without hitting the recursion limit."""
+    node = {"type": "paragraph", "content": [{"type": "text", "text": "leaf"}]}
+    for _ in range(5000):
+        node = {"type": "panel", "content": [node]}
+    assert adf_to_text({"type": "doc", "content": [node]}) == "leaf"
@@ -0,0 +1,60 @@
+# tests/test_attachment_cache.py
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from core import attachment_cache as AC
+
+
+def test_put_get_roundtrip(tmp_path, monkeypatch):
+    """Tests that cached bytes are served back and identical content is stored once."""
+    monkeypatch.setattr(AC, "CACHE_DIR", str(tmp_path))
+    AC.put(AC.attachment_key("clickup", "a1", 3, "100"), b"png")
+    AC.put(AC.attachment_key("clickup", "a2", 3, "200"), b"png")
+
+    assert AC.get(AC.attachment_key("clickup", "a1", 3, "100")) == b"png"
+    assert AC.get(AC.attachment_key("clickup", "a1", 3, "999")) is None
+    blobs = [f for _, _, files in os.walk(tmp_path / "blobs") for f in files]
+    assert len(blobs) == 1
+
+def test_evict_drops_least_recently_used(tmp_path, monkeypatch):
+    """Tests that eviction removes the oldest blob first."""
+    monkeypatch.setattr(AC, "CACHE_DIR", str(tmp_path))
+    AC.put("old", b"x" * 10)
+    AC.put("new", b"y" * 10)
+    old_blob = AC._blob_path(open(AC._key_path("old")).read())
+    os.utime(old_blob, (time.time() - 100, time.time() - 100))
+
+    assert AC.evict(max_bytes=15) == 1
+    assert AC.get("old") is None
+    assert AC.get("new") == b"y" * 10
+
+def test_put_only_scans_when_estimate_exceeds_cap(tmp_path, monkeypatch):
+    """Tests that puts under the cap do not walk the cache and the cap is still enforced."""
+    monkeypatch.setattr(AC, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(AC, "MAX_BYTES", 30)
+    AC.put("k0", b"a" * 10)  # primera escritura: inicializa la estimación
+    scans = []
+    real_scan = AC.DL._scan
+    monkeypatch.setattr(AC.DL, "_scan", lambda root: scans.append(root) or real_scan(root))
+
+    AC.put("k1", b"b" * 10)
+    AC.put("k2", b"c" * 10)
+    assert scans == []
+
+    AC.put("k3", b"d" * 10)
+    assert len(scans) == 1
+    blobs = [f for _, _, files in os.walk(tmp_path / "blobs") for f in files]
+    assert len(blobs) == 2  # desaloja hasta LOW_WATER del tope
+
+def test_failed_write_leaves_no_temp_file(tmp_path, monkeypatch):
+    """Tests that a put whose os.replace fails removes its temp file instead of leaking it into the cache."""
+    monkeypatch.setattr(AC, "CACHE_DIR", str(tmp_path))
+    def fail(src, dst):
+        raise OSError("disk full")
+    monkeypatch.setattr(AC.DL.os, "replace", fail)
+
+    AC.put("k", b"data")  # put se traga el OSError
+    assert [f for _, _, files in os.walk(tmp_path) for f in files] == []
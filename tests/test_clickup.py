@@ -1,11 +1,13 @@
 # tests/test_clickup.py
 import pytest
-from unittest.mock import patch
+from unittest.mock import patch, MagicMock
 from core import clickup
 
-@patch('core.clickup.requests.request')
-def test_get_team_id(mock_request):
+@patch('core.clickup._session')
+def test_get_team_id(mock_session):
     """Prueba que el bot pueda leer el ID del equipo de ClickUp correctamente"""
+    mock_request = mock_session.return_value.request
+    mock_request.return_value.headers = {}
     mock_request.return_value.status_code = 200
     mock_request.return_value.json.return_value = {
         "teams": [{"id": "123456", "name": "Mi Equipo QA"}]
@@ -15,9 +17,11 @@ def test_get_team_id(mock_request):
     team_id = clickup.get_team_id()
     assert team_id == "123456"
 
-@patch('core.clickup.requests.request')
-def test_create_test_task_payload(mock_request):
+@patch('core.clickup._session')
+def test_create_test_task_payload(mock_session):
     """Prueba que se envíe el custom_task_type_id correcto al crear la tarea"""
+    mock_request = mock_session.return_value.request
+    mock_request.return_value.headers = {}
     mock_request.return_value.status_code = 200
     mock_request.return_value.json.return_value = {"id": "abc987"}
     mock_request.return_value.text = "ok"
@@ -34,4 +38,87 @@ def test_create_test_task_payload(mock_request):
     
     assert enviado is not None, "El JSON no debería estar vacío"
     assert enviado["name"] == "Mi Test"
-    assert enviado["custom_task_type_id"] == 1002
\ No newline at end of file
+    assert enviado["custom_task_type_id"] == 1002
+
+@patch('core.clickup.time.sleep')
+@patch('core.clickup._session')
+def test_request_honors_retry_after_on_429(mock_session, mock_sleep):
+    """Prueba que un 429 espere lo que indica Retry-After y luego reintente"""
+    limited = MagicMock(status_code=429, headers={"Retry-After": "7"}, text="")
+    ok = MagicMock(status_code=200, headers={}, text="ok")
+    ok.json.return_value = {"id": "1"}
+    mock_session.return_value.request.side_effect = [limited, ok]
+
+    assert clickup.clickup_request("GET", "/task/1") == {"id": "1"}
+    mock_sleep.assert_called_once_with(7.0)
+
+
+@patch('core.clickup.AC.put')
+@patch('core.clickup.AC.get', return_value=None)
+@patch('core.clickup._session')
+@patch('core.clickup.clickup_request')
+def test_get_task_fetches_task_once(mock_clickup_request, mock_session, mock_cache_get, mock_cache_put):
+    """Prueba que get_task lea la tarea una sola vez y baje las imágenes en paralelo"""
+    responses = {
+        "/task/abc": {"id": "abc", "name": "Login", "description": "", "attachments": [
+            {"type": "image/png", "url": "https://img/1", "name": "1.png"},
+            {"type": "application/pdf", "url": "https://doc/1", "name": "spec.pdf"},
+        ]},
+        "/task/abc/comment": {"comments": []},
+    }
+    mock_clickup_request.side_effect = lambda method, path, **kw: responses[path]
+    mock_session.return_value.get.return_value = MagicMock(status_code=200, content=b"png")
+
+    task = clickup.get_task("abc")
+
+    paths = [c.args[1] for c in mock_clickup_request.call_args_list]
+    assert paths.count("/task/abc") == 1
+    assert task["images"] == [{"mime_type": "image/png", "data": b"png", "name": "1.png"}]
+
+
+@patch('core.clickup._load_testing_lists')
+def test_get_testing_lists_is_cached_until_invalidated(mock_load):
+    """Prueba que el índice de listas se sirva desde cache hasta invalidarlo"""
+    mock_load.return_value = [{"label": "Herald - Smoke", "value": "l1", "description": "Carpeta: Testing"}]
+    clickup.invalidate_testing_lists()
+
+    first = clickup.get_testing_lists()
+    second = clickup.get_testing_lists()
+    assert first == second
+    assert mock_load.call_count == 1
+
+    clickup.invalidate_testing_lists()
+    clickup.get_testing_lists()
+    assert mock_load.call_count == 2
+    clickup.invalidate_testing_lists()
+
+
+def test_background_refresh_does_not_overwrite_an_invalidation():
+    """Prueba que un refresco en vuelo descarte su resultado si el índice se invalidó mientras corría"""
+    index = clickup._HierarchyIndex(ttl=0)
+    index.store([{"label": "viejo", "value": "l0"}])
+
+    assert index.claim_refresh()
+    index.invalidate()
+    assert index.store_refresh([{"label": "stale", "value": "l1"}]) is False
+    assert index.options is None
+
+    index.release_refresh()
+    assert index.claim_refresh()
+    assert index.store_refresh([{"label": "nuevo", "value": "l2"}]) is True
+    assert index.options == [{"label": "nuevo", "value": "l2"}]
+
+
+def test_get_testing_lists_survives_invalidate_mid_call(monkeypatch):
+    """Prueba que un invalidate() entre el chequeo y el return no rompa get_testing_lists"""
+    cached = [{"label": "Herald - Smoke", "value": "l1", "description": "Carpeta: Testing"}]
+    index = clickup._HierarchyIndex(ttl=0)
+    index.store(cached)
+    monkeypatch.setattr(clickup, "_HIERARCHY", index)
+
+    def claim_then_invalidated():
+        index.invalidate()  # !refresh_lists desde otro hilo
+        return False
+    monkeypatch.setattr(index, "claim_refresh", claim_then_invalidated)
+
+    assert clickup.get_testing_lists() == cached
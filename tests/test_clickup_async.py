@@ -0,0 +1,77 @@
+# tests/test_clickup_async.py
+import sys
+import os
+import asyncio
+from unittest.mock import patch, AsyncMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from core import clickup_async
+
+
+def test_get_task_same_shape_as_sync():
+    """Prueba que get_task async devuelva el mismo dict que la versión sincrónica"""
+    responses = {
+        "/task/abc": {"id": "abc", "name": "Login", "description": "Desc", "attachments": []},
+        "/task/abc/comment": {"comments": [{"user": {"username": "ana"}, "comment_text": "falla en Safari al loguear"}]},
+    }
+    fake = AsyncMock(side_effect=lambda method, path, **kw: responses[path])
+    with patch.object(clickup_async, "clickup_request", fake):
+        task = asyncio.run(clickup_async.get_task("abc"))
+
+    assert task["ok"] is True
+    assert task["summary"] == "Login"
+    assert task["images"] == []
+    assert "ana: falla en Safari al loguear" in task["full_context"]
+
+def test_get_testing_lists_fans_out_spaces():
+    """Prueba que get_testing_lists combine las listas de todos los spaces"""
+    responses = {
+        "/space/s1/folder": {"folders": [{"id": "f1", "name": "Testing Repository"}]},
+        "/space/s2/folder": {"folders": [{"id": "f2", "name": "Otra"}]},
+        "/folder/f1/list": {"lists": [{"id": "l1", "name": "Smoke"}]},
+    }
+    fake = AsyncMock(side_effect=lambda method, path, **kw: responses[path])
+    with patch.object(clickup_async, "clickup_request", fake), \
+         patch.object(clickup_async, "CLICKUP_SPACES", {"Herald": "s1", "Kupyo": "s2"}):
+        clickup_async.invalidate_testing_lists()
+        options = asyncio.run(clickup_async.get_testing_lists())
+        clickup_async.invalidate_testing_lists()
+
+    assert options == [{"label": "Herald - Smoke", "value": "l1", "description": "Carpeta: Testing Repository"}]
+
+def test_create_test_tasks_keeps_order_and_reports_failures():
+    """Prueba que el lote conserve el orden y reporte cada fallo sin abortar"""
+    async def fake_create(parent, summary, gherkin, list_id):
+        await asyncio.sleep(0.01 if summary == "TC01" else 0)
+        if summary == "TC02":
+            raise RuntimeError("boom")
+        return {"ok": True, "key": summary, "url": f"https://app.clickup.com/t/{summary}"}
+
+    items = [{"summary": f"TC0{i}", "gherkin": "Given..."} for i in range(1, 4)]
+    with patch.object(clickup_async, "create_test_task", fake_create), \
+         patch.object(clickup_async, "find_test_case_type_id", AsyncMock(return_value=1002)):
+        results = asyncio.run(clickup_async.create_test_tasks("parent", items, "list", concurrency=2))
+
+    assert [r.get("key") for r in results] == ["TC01", None, "TC03"]
+    assert results[1] == {"ok": False, "error": "boom"}
+
+def test_create_test_tasks_stream_starts_before_input_ends():
+    """Prueba que cada test se cree apenas llega su escenario, sin esperar al resto"""
+    created = []
+
+    async def fake_create(parent, summary, gherkin, list_id):
+        created.append(summary)
+        return {"ok": True, "key": summary}
+
+    async def items():
+        yield {"summary": "TC01", "gherkin": "g"}
+        await asyncio.sleep(0.01)
+        assert created == ["TC01"]
+        yield {"summary": "TC02", "gherkin": "g"}
+
+    with patch.object(clickup_async, "create_test_task", fake_create), \
+         patch.object(clickup_async, "find_test_case_type_id", AsyncMock(return_value=None)):
+        results = asyncio.run(clickup_async.create_test_tasks_stream("p", items(), "l1"))
+
+    assert [r["key"] for r in results] == ["TC01", "TC02"]
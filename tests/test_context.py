@@ -0,0 +1,52 @@
+# tests/test_context.py
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from core import context as CTX
+
+
+def test_split_acceptance_criteria():
+    """Tests that the AC block is pulled out of the description until the next heading."""
+    desc = "Intro\nAcceptance Criteria:\n- login works\n- logout works\nNotes:\nextra"
+    rest, ac = CTX.split_acceptance_criteria(desc)
+    assert ac == "- login works\n- logout works"
+    assert "login works" not in rest
+    assert rest.startswith("Intro") and "extra" in rest
+
+def test_pack_drops_noise_and_duplicates():
+    """Tests that noise and repeated comments never reach the packed context."""
+    comments = [
+        {"author": "ana", "text": "ok", "created": "2024-01-01"},
+        {"author": "bob", "text": "The button fails on Safari", "created": "2024-01-02"},
+        {"author": "eva", "text": "the button fails on safari!", "created": "2024-01-03"},
+    ]
+    out = CTX.pack_ticket("Login", "User logs in with email", comments)
+    assert "ana" not in out
+    assert out.count("fails on") == 1
+    assert "eva: the button fails on safari!" in out
+
+def test_pack_respects_budget_by_priority():
+    """Tests that with a tight budget comments go before the acceptance criteria."""
+    desc = "Acceptance Criteria:\n" + "\n".join(f"- rule {i}" for i in range(5)) + "\nDetails:\n" + "long text line\n" * 50
+    comments = [{"author": "u", "text": f"comment number {i} " * 10, "created": str(i)} for i in range(20)]
+    out = CTX.pack_ticket("Login", desc, comments, max_chars=300)
+    assert len(out) <= 300
+    assert "- rule 4" in out
+    assert "comment number" not in out
+    assert out.index("SUMMARY") < out.index("ACCEPTANCE CRITERIA") < out.index("DESCRIPTION")
+
+def test_recent_comments_win():
+    """Tests that only the newest MAX_COMMENTS comments are kept."""
+    comments = [{"author": "u", "text": f"relevant note {i} here", "created": f"2024-01-{i + 1:02d}"} for i in range(CTX.MAX_COMMENTS + 3)]
+    out = CTX.pack_ticket("T", "D", comments, max_chars=100000)
+    assert "relevant note 0 here" not in out
+    assert f"relevant note {CTX.MAX_COMMENTS + 2} here" in out
+
+def test_clip_context_guard():
+    """Tests the last-resort clip for prebuilt contexts."""
+    text = "line one\nline two\nline three"
+    assert CTX.clip_context(text, 1000) == text
+    clipped = CTX.clip_context(text, 20)
+    assert len(clipped) <= 20 and clipped.endswith("[...]")
@@ -0,0 +1,96 @@
+# tests/test_dedupe.py
+import sys
+import os
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from core import dedupe
+from core.adf import adf_with_code_block
+from core.gherkin import build_feature_single
+
+
+def _test(key, summary, created, steps="Given a user\nWhen they log in\nThen the home page is shown"):
+    parent, _, title = [p.strip() for p in summary.split("|")]
+    feature = build_feature_single(f"Story {parent}", parent, {"title": title, "steps": steps})
+    return {"key": key, "fields": {
+        "summary": summary, "created": created,
+        "description": adf_with_code_block("Steps (Gherkin)", feature),
+    }}
+
+PARENTS = [
+    {"key": "S-1", "fields": {"issuelinks": [{"outwardIssue": {"key": "T-1"}}, {"outwardIssue": {"key": "T-2"}}]}},
+    {"key": "S-2", "fields": {"issuelinks": [{"outwardIssue": {"key": "T-3"}}]}},
+]
+TESTS = [
+    _test("T-1", "S-1 | TC01 | Validate login", "2024-01-01"),
+    _test("T-2", "S-1 | TC02 | Validate login", "2024-01-02"),
+    _test("T-3", "S-2 | TC01 | Validate login", "2024-01-03"),
+]
+
+@patch('core.dedupe.J.delete_issue')
+@patch('core.dedupe.J.search_issues_by_keys', return_value=iter(TESTS))
+@patch('core.dedupe.J.search_jql', return_value=iter(PARENTS))
+def test_sweep_dry_run_groups_across_parents(mock_jql, mock_search, mock_delete):
+    """Tests that the dry run reports cross-parent duplicates without deleting."""
+    report = dedupe.sweep_project("T")
+
+    assert report["parents_scanned"] == 2
+    assert report["duplicate_groups"][0]["keep"] == "T-3"
+    assert sorted(report["duplicate_groups"][0]["drop"]) == ["T-1", "T-2"]
+    assert report["deleted"] == []
+    mock_delete.assert_not_called()
+
+@patch('core.dedupe.J.delete_issue', side_effect=lambda k: {"ok": True, "deleted_key": k})
+@patch('core.dedupe.J.search_issues_by_keys', return_value=iter(TESTS))
+@patch('core.dedupe.J.search_jql', return_value=iter(PARENTS))
+def test_sweep_per_parent_apply(mock_jql, mock_search, mock_delete):
+    """Tests that per-parent mode only drops duplicates under the same parent."""
+    report = dedupe.sweep_project("T", dry_run=False, cross_parent=False)
+
+    assert report["deleted"] == ["T-1"]
+
+@patch('core.dedupe.J.delete_issue', side_effect=lambda k: {"ok": True, "deleted_key": k})
+@patch('core.dedupe.J.link_issues', return_value={"ok": True})
+@patch('core.dedupe.J.search_issues_by_keys', return_value=iter(TESTS))
+@patch('core.dedupe.J.search_jql', return_value=iter(PARENTS))
+def test_sweep_apply_relinks_kept_test_before_deleting(mock_jql, mock_search, mock_link, mock_delete):
+    """Tests that the kept Test inherits the dropped Tests' parents before they are deleted."""
+    report = dedupe.sweep_project("T", dry_run=False)
+
+    mock_link.assert_called_once_with("T-3", "S-1", link_type="Tests")
+    assert report["relinked"] == [{"test": "T-3", "parent": "S-1"}]
+    assert sorted(report["deleted"]) == ["T-1", "T-2"]
+
+@patch('core.dedupe.J.delete_issue')
+@patch('core.dedupe.J.link_issues', return_value={"ok": False, "error": "403"})
+@patch('core.dedupe.J.search_issues_by_keys', return_value=iter(TESTS))
+@patch('core.dedupe.J.search_jql', return_value=iter(PARENTS))
+def test_sweep_apply_keeps_duplicates_when_relink_fails(mock_jql, mock_search, mock_link, mock_delete):
+    report = dedupe.sweep_project("T", dry_run=False)
+
+    assert report["deleted"] == []
+    assert report["skipped"][0]["keep"] == "T-3"
+    mock_delete.assert_not_called()
+
+@patch('core.dedupe.J.search_issues_by_keys')
+@patch('core.dedupe.J.search_jql', return_value=iter(PARENTS))
+def test_sweep_different_steps_are_not_duplicates(mock_jql, mock_search):
+    mock_search.return_value = iter([
+        _test("T-1", "S-1 | TC01 | Validate login", "2024-01-01"),
+        _test("T-3", "S-2 | TC01 | Validate login", "2024-01-03", steps="Given a user\nWhen they log out\nThen the login page is shown"),
+    ])
+    assert dedupe.sweep_project("T")["duplicate_groups"] == []
+
+@patch('core.dedupe.J.search_issues_by_keys')
+@patch('core.dedupe.J.search_jql', return_value=iter(PARENTS))
+def test_sweep_tests_without_steps_compare_whole_text(mock_jql, mock_search):
+    """Tests that Tests with no Gherkin steps are only duplicates when their text matches."""
+    def plain(key, summary, created, text):
+        return {"key": key, "fields": {"summary": summary, "created": created,
+                                       "description": adf_with_code_block("Steps (Gherkin)", text)}}
+    mock_search.return_value = iter([
+        plain("T-1", "S-1 | TC01 | Validate login", "2024-01-01", "open the app"),
+        plain("T-3", "S-2 | TC01 | Validate login", "2024-01-03", "close the app"),
+    ])
+    assert dedupe.sweep_project("T")["duplicate_groups"] == []
@@ -0,0 +1,119 @@
+# tests/test_doc_windows.py
+import sys
+import os
+import io
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from core import doc_windows as DW
+
+
+@pytest.fixture(autouse=True)
+def _no_backoff(monkeypatch):
+    monkeypatch.setattr(DW, "WINDOW_BACKOFF", 0)
+
+
+def test_page_windows_cover_every_page_with_overlap():
+    assert DW.page_windows(25, 10, 1) == [(0, 10), (9, 19), (18, 25)]
+    assert DW.page_windows(10, 10, 1) == [(0, 10)]
+    assert DW.page_windows(3, 1, 5) == [(0, 1), (1, 2), (2, 3)]  # overlap capped below size
+    assert DW.page_windows(0, 10, 1) == []
+
+
+def test_merge_tests_drops_overlap_duplicates():
+    """Tests that a test repeated by two windows (same steps) is kept once, in page order."""
+    a = {"title": "Validate that login works", "steps": "Given a user\nWhen they log in\nThen home"}
+    a_again = {"title": "Validate that login works!", "steps": "Given a user\nWhen they log in\nThen home"}
+    same_steps = {"title": "Validate that the user signs in", "steps": "given a user\n when they log in\nThen home"}
+    b = {"title": "Validate that logout works", "steps": "Given a session\nWhen logout\nThen login page"}
+    assert DW.merge_tests([[a], [a_again, same_steps, b]]) == [a, b]
+
+
+def test_merge_tests_keeps_same_title_with_different_steps():
+    """Tests that two different tests sharing a title (e.g. two forms) both survive the merge."""
+    signup = {"title": "Validate that the form rejects invalid input", "steps": "Given the signup form\nWhen I submit an empty email\nThen an error is shown"}
+    payment = {"title": "Validate that the form rejects invalid input", "steps": "Given the payment form\nWhen I submit an expired card\nThen an error is shown"}
+    no_steps = {"title": "Validate that the form rejects invalid input", "steps": ""}
+    assert DW.merge_tests([[signup], [payment, no_steps], [dict(no_steps)]]) == [signup, payment, no_steps]
+
+
+def test_run_windows_retries_each_window_independently():
+    """Tests that a flaky window is retried alone and a dead one does not sink the others."""
+    windows = [DW.Window(0, 10), DW.Window(9, 19), DW.Window(18, 25)]
+    calls, lock = {}, threading.Lock()
+
+    def extract(window):
+        with lock:
+            calls[window.start] = calls.get(window.start, 0) + 1
+            n = calls[window.start]
+        if window.start == 9 and n == 1:
+            raise TimeoutError("slow window")
+        if window.start == 18:
+            raise ValueError("always broken")
+        rule = {0: "login", 9: "logout"}[window.start]
+        return [{"title": f"Validate that page {window.start}", "steps": f"Given the {rule} rule"}]
+
+    run = DW.run_windows(windows, extract, concurrency=3, retries=2)
+
+    assert calls == {0: 1, 9: 2, 18: 3}
+    assert [t["title"] for t in run.tests] == ["Validate that page 0", "Validate that page 9"]
+    assert [(w.label, err) for w, err in run.failed] == [("pages 19-25", "always broken")]
+
+
+def test_run_windows_does_not_retry_errors_already_retried_by_generate():
+    """Tests that a 429/5xx that exhausted U.generate's retries is not retried again per window."""
+    class Unavailable(Exception):
+        code = 503
+
+    calls = []
+
+    def extract(window):
+        calls.append(window.start)
+        raise Unavailable("overloaded")
+
+    run = DW.run_windows([DW.Window(0, 10)], extract, retries=2)
+
+    assert calls == [0]
+    assert [err for _, err in run.failed] == ["overloaded"]
+
+
+def test_run_windows_pulls_windows_as_workers_free_up():
+    """Tests that windows are built lazily, at most `concurrency` ahead of the finished ones."""
+    built, done, lock = [], [], threading.Lock()
+
+    def windows():
+        for start in range(0, 50, 10):
+            with lock:
+                assert len(built) - len(done) < 2  # nunca más de 2 en vuelo
+                built.append(start)
+            yield DW.Window(start, start + 10)
+
+    def extract(window):
+        with lock:
+            done.append(window.start)
+        return [{"title": f"Validate that page {window.start}", "steps": f"Given rule {chr(97 + window.start // 10)}"}]
+
+    run = DW.run_windows(windows(), extract, concurrency=2)
+
+    assert built == [0, 10, 20, 30, 40]
+    assert [t["title"] for t in run.tests] == [f"Validate that page {s}" for s in range(0, 50, 10)]
+
+
+def test_split_pdf_windows_are_standalone_pdfs(tmp_path):
+    pypdf = pytest.importorskip("pypdf")
+    writer = pypdf.PdfWriter()
+    for _ in range(5):
+        writer.add_blank_page(width=72, height=72)
+    path = tmp_path / "doc.pdf"
+    with open(path, "wb") as f:
+        writer.write(f)
+
+    n_pages, windows = DW.split_pdf(str(path), 2, 0)
+    windows = list(windows)
+
+    assert n_pages == 5
+    assert [(w.start, w.end) for w in windows] == [(0, 2), (2, 4), (4, 5)]
+    assert [len(pypdf.PdfReader(io.BytesIO(w.data)).pages) for w in windows] == [2, 2, 1]
@@ -0,0 +1,46 @@
+# tests/test_gemini.py
+import sys
+import os
+import threading
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from core import gemini as GM
+
+
+def test_client_is_built_once_across_threads():
+    """Tests that concurrent first calls share a single client instance."""
+    GM.reset_client()
+    built = []
+
+    def fake_build():
+        built.append(1)
+        return object(), "google-ai-studio"
+
+    with patch.object(GM, "_build", fake_build):
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(GM.get_client())) for _ in range(8)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        assert len(built) == 1
+        assert len({id(r) for r in results}) == 1
+        assert GM.provider_name() == "google-ai-studio"
+    GM.reset_client()
+
+def test_no_credentials_returns_none(monkeypatch):
+    """Tests that missing credentials yield None without importing the SDK."""
+    GM.reset_client()
+    monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+    monkeypatch.delenv("GOOGLE_CLOUD_PROJECT_ID", raising=False)
+    assert GM.get_client() is None
+    assert GM.provider_name() == "unknown"
+    GM.reset_client()
+
+def test_importing_llm_does_not_import_sdk():
+    """Tests that core.llm defers the google-genai import."""
+    import subprocess
+    code = "import sys; sys.path.insert(0, 'src'); import core.llm; print('google.genai' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                         cwd=os.path.join(os.path.dirname(__file__), '..'))
+    assert out.stdout.strip() == "False"
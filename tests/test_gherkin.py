@@ -8,7 +8,7 @@ import pytest
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
 
 # --- Importamos AMBAS funciones que vamos a probar ---
-from core.gherkin import sanitize_title, build_feature_single
+from core.gherkin import sanitize_title, build_feature_single, steps_signature
 
 # --- Tests para sanitize_title (LOS QUE YA TENIAS) ---
 @pytest.mark.parametrize("issue_key, raw_title, expected_output", [
@@ -65,3 +65,11 @@ Feature: User Story Summary
     # We strip both to avoid issues with leading/trailing whitespace
     generated_text = build_feature_single(summary, issue_key, scenario)
     assert generated_text.strip() == expected_feature_text.strip()
+
+
+def test_steps_signature_without_steps_is_empty():
+    """Regresión: sin líneas Given/When/Then la firma es "" (como antes de normalize_steps)."""
+    assert steps_signature("") == ""
+    assert steps_signature("   \n  ") == ""
+    assert steps_signature("no gherkin here") == ""
+    assert steps_signature("Given 3 users") == steps_signature("given 7 users") != ""
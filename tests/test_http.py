@@ -0,0 +1,33 @@
+# tests/test_http.py
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from core.http import TokenBucket, retry_after_seconds
+
+
+class _Resp:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+def test_token_bucket_allows_burst_up_to_capacity():
+    """Tests that a full bucket hands out `capacity` tokens without waiting."""
+    bucket = TokenBucket(rate=1, capacity=3)
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.reserve() > 0
+
+def test_token_bucket_blocks_until_reset_when_exhausted():
+    """Tests that X-RateLimit-Remaining=0 blocks until X-RateLimit-Reset."""
+    bucket = TokenBucket(rate=100, capacity=100)
+    bucket.update_from_headers({"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(time.time() + 5)})
+    assert 4 < bucket.reserve() <= 5
+
+def test_retry_after_seconds():
+    """Tests Retry-After parsing with fallbacks."""
+    assert retry_after_seconds(_Resp({"Retry-After": "3"}), default=1) == 3.0
+    assert retry_after_seconds(_Resp({}), default=1.5) == 1.5
+    reset = retry_after_seconds(_Resp({"X-RateLimit-Reset": str(time.time() + 10)}), default=1)
+    assert 9 < reset <= 10
@@ -0,0 +1,150 @@
+# tests/test_jira.py
+import sys
+import os
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from core.jira import JiraSession, create_test_issues_bulk
+
+
+def _resp(status, headers=None, payload=None):
+    r = MagicMock(status_code=status, headers=headers or {}, text="{}" if payload is not None else "")
+    r.json.return_value = payload
+    return r
+
+@patch('core.jira.time.sleep')
+def test_session_honors_retry_after(mock_sleep):
+    """Tests that a 429 waits for Retry-After and the retry reuses the same session."""
+    client = JiraSession("https://jira.example.com", max_retries=3, backoff=0.6)
+    client.session = MagicMock()
+    client.session.request.side_effect = [_resp(429, {"Retry-After": "4"}), _resp(200, payload={"key": "T-1"})]
+
+    assert client.request("/rest/api/3/issue/T-1") == {"key": "T-1"}
+    mock_sleep.assert_called_once_with(4.0)
+    assert client.session.request.call_count == 2
+
+def test_session_precomputes_headers():
+    """Tests that auth and gzip headers live on the session, not on each call."""
+    client = JiraSession("https://jira.example.com/")
+    assert client.session.headers["Authorization"].startswith("Basic ")
+    assert "gzip" in client.session.headers["Accept-Encoding"]
+    assert client.base_url == "https://jira.example.com"
+
+@patch('core.jira.jira_request')
+def test_bulk_create_maps_errors_to_items(mock_request):
+    """Tests that bulk results map back to input order, including failed elements."""
+    mock_request.return_value = {
+        "issues": [{"key": "T-1", "self": "s1"}, {"key": "T-3", "self": "s3"}],
+        "errors": [{"status": 400, "failedElementNumber": 1, "elementErrors": {"errors": {"summary": "too long"}}}],
+    }
+    items = [{"summary": f"S{i}", "gherkin": "Given..."} for i in range(3)]
+
+    results = create_test_issues_bulk("PROJ", items)
+
+    assert [r.get("key") for r in results] == ["T-1", None, "T-3"]
+    assert results[1] == {"ok": False, "error": "summary: too long"}
+    body = mock_request.call_args.kwargs["body"]
+    assert len(body["issueUpdates"]) == 3
+    assert body["issueUpdates"][0]["fields"]["issuetype"] == {"name": "Test"}
+
+@patch('core.jira.jira_request')
+def test_link_type_resolved_once(mock_request):
+    """Tests that link types are resolved by name once and reused for every link."""
+    import core.jira as J
+    J._LINK_TYPE_IDS = None
+    mock_request.side_effect = lambda path, **kw: (
+        {"issueLinkTypes": [{"id": "10001", "name": "Test", "inward": "is tested by", "outward": "tests"},
+                            {"id": "10003", "name": "Relates"}]}
+        if path == "/rest/api/3/issueLinkType" else {}
+    )
+
+    out = J.link_issues_batch([("T-1", "S-1"), ("T-2", "S-1")], link_type="Tests")
+
+    assert out == {"ok": True, "results": [{"ok": True}, {"ok": True}], "failed": 0}
+    link_bodies = [c.kwargs["body"] for c in mock_request.call_args_list if c.args[0] == "/rest/api/3/issueLink"]
+    assert [b["type"] for b in link_bodies] == [{"id": "10001"}, {"id": "10001"}]
+    assert [c.args[0] for c in mock_request.call_args_list].count("/rest/api/3/issueLinkType") == 1
+    assert J.resolve_link_type_id("Unknown") == "10003"
+    J._LINK_TYPE_IDS = None
+
+@patch('core.jira.jira_request')
+def test_search_issues_by_keys_chunks_and_paginates(mock_request):
+    """Tests that key lists are chunked and each chunk follows nextPageToken."""
+    import core.jira as J
+
+    def fake(path, params=None, **kw):
+        keys = params["jql"].split("(")[1].split(")")[0].split(",")
+        if "nextPageToken" in params:
+            return {"issues": [{"key": k} for k in keys[1:]], "isLast": True}
+        return {"issues": [{"key": keys[0]}], "nextPageToken": "p2", "isLast": False}
+
+    mock_request.side_effect = fake
+    keys = [f"T-{i}" for i in range(5)]
+
+    found = list(J.search_issues_by_keys(keys, fields="summary", extra_jql='issuetype = "Test"', chunk_size=2))
+
+    assert sorted(i["key"] for i in found) == sorted(keys)
+    assert mock_request.call_count == 6  # 3 chunks x 2 pages
+    assert all(c.kwargs["params"]["jql"].endswith('AND issuetype = "Test"') for c in mock_request.call_args_list)
+
+@patch('core.jira.ThreadPoolExecutor')
+@patch('core.jira.jira_request', return_value={"issues": [], "isLast": True})
+def test_search_issues_by_keys_fans_out_with_read_concurrency(mock_request, mock_pool):
+    """Tests that key searches are bounded by JIRA_READ_CONCURRENCY, not the write limit."""
+    import core.jira as J
+    from concurrent.futures import ThreadPoolExecutor
+    mock_pool.side_effect = lambda max_workers: ThreadPoolExecutor(max_workers=max_workers)
+
+    list(J.search_issues_by_keys([f"T-{i}" for i in range(40)], fields="summary", chunk_size=2))
+
+    assert mock_pool.call_args.kwargs["max_workers"] == J.JIRA_READ_CONCURRENCY
+
+@patch('core.jira.jira_request')
+def test_issue_snapshot_reads_once(mock_request):
+    """Tests that a snapshot serves issue, comments and linked tests from one read each."""
+    import core.jira as J
+
+    def fake(path, params=None, **kw):
+        if path == "/rest/api/3/issue/S-1":
+            return {"fields": {
+                "summary": "Story", "description": "desc",
+                "comment": {"comments": [{"author": {"displayName": "Ana"}, "body": "hello there team"}], "total": 1},
+                "issuelinks": [{"outwardIssue": {"key": "T-1"}}, {"inwardIssue": {"key": "X-9"}}],
+            }}
+        return {"issues": [
+            {"key": "T-1", "fields": {"summary": "S-1 | TC03 | Validate login", "project": {"key": "T"}}},
+            {"key": "X-9", "fields": {"summary": "S-1 | TC07 | Validate other", "project": {"key": "X"}}},
+        ], "isLast": True}
+
+    mock_request.side_effect = fake
+    snap = J.IssueSnapshot("S-1", "T")
+
+    assert snap.issue()["summary"] == "Story"
+    assert len(snap.comments()) == 1
+    assert [t["key"] for t in snap.existing_tests_with_details()] == ["T-1", "X-9"]
+    assert snap.next_tc_index() == 4
+    assert mock_request.call_count == 2
+
+@patch('core.jira.analyze_adf', wraps=__import__('core.adf', fromlist=['analyze_adf']).analyze_adf)
+@patch('core.jira.jira_request')
+def test_issue_snapshot_parses_each_adf_document_once(mock_request, mock_analyze):
+    """Tests that description and comments are analyzed once even when read twice in a run."""
+    import core.jira as J
+    from core import context as CTX
+    from core.adf import plain_to_adf
+    table = {"type": "table", "content": [{"type": "tableRow", "content": [
+        {"type": "tableCell", "content": [{"type": "paragraph", "content": [{"type": "text", "text": "a"}]}]}]}]}
+    description = {"type": "doc", "content": plain_to_adf("desc")["content"] + [table]}
+    mock_request.return_value = {"fields": {
+        "summary": "Story", "description": description,
+        "comment": {"comments": [{"author": {"displayName": "Ana"}, "body": plain_to_adf("looks right")}], "total": 1},
+    }}
+    snap = J.IssueSnapshot("S-1", "T")
+
+    src = snap.issue()
+    comments = CTX.jira_comments(snap.comments(), snap.adf_text)
+
+    assert src["description_tables"] == [[["a"]]]
+    assert comments[0]["text"] == "looks right"
+    assert mock_analyze.call_count == 2
@@ -0,0 +1,30 @@
+# tests/test_jt.py
+import sys
+import os
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import jt
+
+KWARGS = dict(
+    project_key="T", summary="S-1 | TC01 | Validate login", gherkin_text="Feature: x",
+    source_issue_key="S-1", link_type="Tests", attach_feature=False, fill_xray=False, filename="f.feature",
+)
+
+
+@patch('jt.J.link_issues', side_effect=[{"ok": False, "error": "no Tests type"}, {"ok": True}])
+def test_link_falls_back_to_relates(mock_link):
+    """Tests that a failed 'Tests' link is retried as the generic relation."""
+    res = jt._process_created_jira_test_case("T-9", **KWARGS)
+
+    assert res["ok"] is True
+    assert mock_link.call_args_list[1].kwargs["link_type"] == jt.RELATES_LINK_TYPE
+
+
+@patch('jt.J.link_issues', return_value={"ok": False, "error": "403"})
+def test_link_failure_is_reported(mock_link):
+    res = jt._process_created_jira_test_case("T-9", **KWARGS)
+
+    assert res["ok"] is False
+    assert res["errors"] == ["link to S-1: 403"]
@@ -125,4 +125,149 @@ def test_sync_complex_mixture():
     (None, "Validate that Untitled"),
 ])
 def test_normalize_scenario_title(raw_title, expected_output):
-    assert _normalize_scenario_title(raw_title) == expected_output
\ No newline at end of file
+    assert _normalize_scenario_title(raw_title) == expected_output
+
+# --- Fuzzy matching (renamed scenarios) ---
+LOGIN_OK = "Given the user is on the login page\nWhen they enter valid credentials\nThen they are redirected to the dashboard"
+LOGIN_KO = "Given the user is on the login page\nWhen they enter invalid credentials\nThen an error message is displayed"
+
+def test_sync_pairs_renamed_scenario_as_update():
+    """Tests that a reworded title becomes an in-place update instead of create + obsolete."""
+    existing_tests = [
+        _mock_test("TEST-2", "Validate that the user can log in with valid credentials", LOGIN_OK)
+    ]
+    existing_tests[0]["summary"] = "TEST-1 | TC01 | Validate that the user can log in with valid credentials"
+    new_scenarios = [
+        _mock_scenario("Validate that the user can log in using valid credentials",
+                       LOGIN_OK.replace("they enter", "the user enters"))
+    ]
+    plan = llm_compare_and_sync(ISSUE_KEY, SUMMARY, existing_tests, new_scenarios)
+
+    assert plan["to_create"] == []
+    assert plan["obsolete"] == []
+    assert plan["to_update"][0]["key"] == "TEST-2"
+    assert plan["to_update"][0]["summary"] == "TEST-1 | TC01 | Validate that the user can log in using valid credentials"
+
+def test_sync_does_not_merge_opposite_scenarios():
+    """Tests that a near-identical title with different steps is a create, not an overwrite."""
+    existing_tests = [_mock_test("TEST-2", "Validate login with valid credentials", LOGIN_OK)]
+    new_scenarios = [_mock_scenario("Validate login with invalid credentials", LOGIN_KO)]
+
+    plan = llm_compare_and_sync(ISSUE_KEY, SUMMARY, existing_tests, new_scenarios)
+
+    assert plan["to_update"] == []
+    assert [sc["title"] for sc in plan["to_create"]] == ["Validate login with invalid credentials"]
+    assert [t["key"] for t in plan["obsolete"]] == ["TEST-2"]
+
+def test_match_titles_optimal_assignment():
+    """Tests that optimal assignment maximizes total similarity where greedy would not."""
+    from core.matching import match_titles
+    existing = ["Validate that the cart total updates", "Validate that the cart total updates on removal"]
+    new = ["Validate that the cart total updates on item removal", "Validate that the cart totals update"]
+
+    greedy = match_titles(existing, new, threshold=0.5)
+    optimal = match_titles(existing, new, threshold=0.5, optimal=True)
+
+    assert len(optimal) == 2
+    assert sum(s for _, _, s in optimal) >= sum(s for _, _, s in greedy)
+    assert {(n, e) for n, e, _ in optimal} == {(0, 1), (1, 0)}
+
+def test_generate_scenarios_batch_caps_concurrency(monkeypatch):
+    """Tests that the async batch normalizes titles and never exceeds the concurrency cap."""
+    import asyncio
+    import json
+    from types import SimpleNamespace
+    from core import llm as L
+
+    state = {"active": 0, "peak": 0}
+
+    async def fake_generate(**kwargs):
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        await asyncio.sleep(0.01)
+        state["active"] -= 1
+        return SimpleNamespace(text=json.dumps({"scenarios": [{"title": "Verify login", "steps": ["Given a", "When b"]}]}))
+
+    fake_client = SimpleNamespace(aio=SimpleNamespace(models=SimpleNamespace(generate_content=fake_generate)))
+    monkeypatch.setattr(L.GM, "get_client", lambda: fake_client)
+    monkeypatch.setattr(L.U, "_STORE", L.U.UsageStore(":memory:"))
+    monkeypatch.setattr(L.LC, "ENABLED", False)
+    jobs = [{"issue_key": f"T-{i}", "summary": "S", "full_context": f"ctx {i}", "use_cache": False} for i in range(6)]
+
+    async def collect():
+        return [r async for r in L.generate_scenarios_batch(jobs, concurrency=2)]
+
+    results = asyncio.run(collect())
+    assert sorted(r["index"] for r in results) == list(range(6))
+    assert state["peak"] == 2
+    assert results[0]["scenarios"] == [{"title": "Validate that login", "steps": "Given a\nWhen b"}]
+
+def test_stream_parser_yields_each_closed_scenario():
+    """Tests that the incremental parser emits scenarios as soon as their object closes."""
+    from core.llm import ScenarioStreamParser
+    payload = '```json\n{"scenarios": [{"title": "A {x}", "steps": "Given \\"}\\""}, {"title": "B", "steps": ["Given b"]}]}\n```'
+    parser = ScenarioStreamParser()
+    emitted = []
+    for i, ch in enumerate(payload):
+        got = parser.feed(ch)
+        emitted.extend((i, sc["title"]) for sc in got)
+    assert [t for _, t in emitted] == ["A {x}", "B"]
+    # the first scenario is available before the second one is even written
+    assert emitted[0][0] < payload.index('"B"')
+    assert parser.done
+
+def test_llm_stream_scenarios_normalizes_and_caps(monkeypatch):
+    """Tests that streamed scenarios are normalized and limited to max_tests."""
+    from types import SimpleNamespace
+    from core import llm as L
+    text = '{"scenarios": [{"title": "Verify a", "steps": "Given a"}, {"title": "b", "steps": "Given b"}, {"title": "c", "steps": "Given c"}]}'
+    chunks = [SimpleNamespace(text=text[i:i + 7]) for i in range(0, len(text), 7)]
+    fake_client = SimpleNamespace(models=SimpleNamespace(generate_content_stream=lambda **kw: iter(chunks)))
+    monkeypatch.setattr(L.GM, "get_client", lambda: fake_client)
+    monkeypatch.setattr(L.U, "_STORE", L.U.UsageStore(":memory:"))
+    monkeypatch.setattr(L.LC, "ENABLED", False)
+
+    out = list(L.llm_stream_scenarios("T-1", "S", "ctx", max_tests=2))
+    assert [sc["title"] for sc in out] == ["Validate that a", "Validate that b"]
+
+def test_llm_stream_scenarios_repairs_truncated_tail(monkeypatch):
+    """Tests that a cut-off stream re-asks only the unfinished object."""
+    from types import SimpleNamespace
+    from core import llm as L
+    text = '{"scenarios": [{"title": "a", "steps": "Given a"}, {"title": "b", "steps": "Giv'
+    asked = []
+    def generate_content(**kw):
+        asked.append(kw["contents"][0])
+        return SimpleNamespace(text='{"title": "b", "steps": "Given b"}', usage_metadata=None)
+    fake_client = SimpleNamespace(models=SimpleNamespace(
+        generate_content_stream=lambda **kw: iter([SimpleNamespace(text=text)]),
+        generate_content=generate_content,
+    ))
+    monkeypatch.setattr(L.GM, "get_client", lambda: fake_client)
+    monkeypatch.setattr(L.U, "_STORE", L.U.UsageStore(":memory:"))
+    monkeypatch.setattr(L.LC, "ENABLED", False)
+
+    out = list(L.llm_stream_scenarios("T-1", "S", "ctx"))
+    assert [sc["title"] for sc in out] == ["Validate that a", "Validate that b"]
+    assert len(asked) == 1 and '"Giv' in asked[0]
+
+def test_llm_stream_scenarios_caches_repaired_item_in_place(monkeypatch):
+    """Tests that the cached list keeps a repaired scenario at its original index."""
+    from types import SimpleNamespace
+    from core import llm as L
+    text = ('{"scenarios": [{"title": "a", "steps": "Given a"}, {"title": "b" "steps": "Given b"}, '
+            '{"title": "c", "steps": "Given c"}]}')
+    fake_client = SimpleNamespace(models=SimpleNamespace(
+        generate_content_stream=lambda **kw: iter([SimpleNamespace(text=text)]),
+        generate_content=lambda **kw: SimpleNamespace(text='{"title": "b", "steps": "Given b"}', usage_metadata=None),
+    ))
+    cached = []
+    monkeypatch.setattr(L.GM, "get_client", lambda: fake_client)
+    monkeypatch.setattr(L.U, "_STORE", L.U.UsageStore(":memory:"))
+    monkeypatch.setattr(L.LC, "ENABLED", False)
+    monkeypatch.setattr(L, "_cache_items", lambda key, items: cached.extend(items))
+
+    out = list(L.llm_stream_scenarios("T-1", "S", "ctx"))
+
+    assert [sc["title"] for sc in out] == ["Validate that a", "Validate that c", "Validate that b"]
+    assert [i["title"] for i in cached] == ["a", "b", "c"]
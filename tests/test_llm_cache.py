@@ -0,0 +1,56 @@
+# tests/test_llm_cache.py
+import sys
+import os
+import time
+import json
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from core import llm_cache as LC
+from core import llm as L
+
+
+def test_key_depends_on_prompt_and_images():
+    """Tests that any change in prompt or image bytes yields a different key."""
+    base = LC.request_key("m", "sys", "user", [{"data": b"a", "mime_type": "image/png"}])
+    assert base == LC.request_key("m", "sys", "user", [{"data": b"a", "mime_type": "image/png"}])
+    assert base != LC.request_key("m", "sys", "user2", [{"data": b"a", "mime_type": "image/png"}])
+    assert base != LC.request_key("m", "sys", "user", [{"data": b"b", "mime_type": "image/png"}])
+
+def test_ttl_expires_entries(tmp_path, monkeypatch):
+    """Tests that entries older than the TTL are a miss and get removed."""
+    monkeypatch.setattr(LC, "CACHE_DIR", str(tmp_path))
+    LC.put("ab12", "hello")
+    assert LC.get("ab12") == "hello"
+    assert LC.get("ab12", ttl=-1) is None
+    assert not os.path.exists(LC._path("ab12"))
+
+def test_evict_lru(tmp_path, monkeypatch):
+    """Tests that size-bounded eviction removes the least recently used entry."""
+    monkeypatch.setattr(LC, "CACHE_DIR", str(tmp_path))
+    LC.put("aa01", "x" * 100)
+    LC.put("bb02", "y" * 100)
+    os.utime(LC._path("aa01"), (time.time() - 100, time.time() - 100))
+    assert LC.evict(max_bytes=200) == 1
+    assert LC.get("aa01") is None and LC.get("bb02") == "y" * 100
+
+def test_generate_scenarios_served_from_cache(tmp_path, monkeypatch):
+    """Tests that an identical request skips Gemini and use_cache=False bypasses the cache."""
+    monkeypatch.setattr(LC, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(LC, "ENABLED", True)
+    fake = MagicMock()
+    fake.models.generate_content.return_value = SimpleNamespace(
+        text=json.dumps({"scenarios": [{"title": "Validate that login works", "steps": "Given x"}]})
+    )
+    monkeypatch.setattr(L.GM, "get_client", lambda: fake)
+    monkeypatch.setattr(L.U, "_STORE", L.U.UsageStore(":memory:"))
+
+    first, _ = L.llm_generate_scenarios("T-1", "Login", "ctx")
+    second, _ = L.llm_generate_scenarios("T-1", "Login", "ctx")
+    assert first == second
+    assert fake.models.generate_content.call_count == 1
+
+    L.llm_generate_scenarios("T-1", "Login", "ctx", use_cache=False)
+    assert fake.models.generate_content.call_count == 2
@@ -0,0 +1,135 @@
+# tests/test_mirror.py
+import sys
+import os
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from core.adf import adf_with_code_block
+from core.mirror import TestMirror
+from core import dedupe
+
+
+TESTS_LINK, RELATES_LINK = {"id": "10001"}, {"id": "10003"}
+
+@pytest.fixture(autouse=True)
+def link_types():
+    """The "Tests" link type resolves to 10001 without asking Jira."""
+    with patch('core.mirror.J.resolve_link_type_id', return_value="10001"):
+        yield
+
+def _issue(key, summary, feature, updated, parent="S-1", links=None):
+    return {"key": key, "fields": {
+        "summary": summary, "created": updated, "updated": updated,
+        "project": {"key": "T"}, "description": adf_with_code_block("Steps (Gherkin)", feature),
+        "issuelinks": [{"type": TESTS_LINK, "inwardIssue": {"key": parent}}] if links is None else links,
+    }}
+
+ISSUES = [
+    _issue("T-1", "S-1 | TC01 | Validate login", "Given a user", "2024-01-01T10:00:00.000+0000"),
+    _issue("T-2", "S-1 | TC02 | Validate login", "Given a user", "2024-01-02T10:00:00.000+0000"),
+    _issue("T-3", "S-1 | TC05 | Validate logout", "Given a session", "2024-01-03T10:00:00.000+0000"),
+]
+
+def _jira(issues, alive=None):
+    """search_jql fake: the keys-only listing returns `alive` (default: every issue)."""
+    alive = [i["key"] for i in issues] if alive is None else alive
+    return lambda jql, fields, **kw: iter([{"key": k} for k in alive] if fields == "key" else list(issues))
+
+@patch('core.mirror.J.search_jql')
+def test_sync_and_indexed_lookups(mock_search):
+    """Tests that a synced mirror answers next_tc_index and duplicate checks locally."""
+    mock_search.side_effect = _jira(ISSUES)
+    mirror = TestMirror(":memory:")
+
+    assert mirror.sync("T") == {"upserted": 3, "removed": 0}
+    assert mirror.last_sync("T") == "2024-01-03T10:00:00"
+    assert mirror.next_tc_index("S-1", "T") == 6
+
+    keep, drop = dedupe.find_duplicates("S-1", "T", mirror=mirror)
+    assert [d["key"] for d in drop] == ["T-1"]
+
+@patch('core.mirror.J.search_jql')
+def test_incremental_sync_filters_by_updated(mock_search):
+    """Tests that a second sync only asks Jira for recently updated Tests."""
+    mock_search.side_effect = _jira(ISSUES)
+    mirror = TestMirror(":memory:")
+    mirror.sync("T")
+
+    mock_search.side_effect = _jira([], alive=["T-1", "T-2", "T-3"])
+    mirror.sync("T")
+    jql = mock_search.call_args_list[-2].args[0]
+    assert 'updated >= "2024/01/02 10:00"' in jql
+
+@patch('core.mirror.J.search_jql')
+def test_incremental_sync_prunes_tests_deleted_in_jira(mock_search):
+    """Tests that an incremental sync drops Tests that no longer exist, so dedupe never reports them."""
+    mock_search.side_effect = _jira(ISSUES)
+    mirror = TestMirror(":memory:")
+    mirror.sync("T")
+
+    mock_search.side_effect = _jira([], alive=["T-2", "T-3"])
+    assert mirror.sync("T") == {"upserted": 0, "removed": 1}
+    keep, drop = dedupe.find_duplicates("S-1", "T", mirror=mirror)
+    assert drop == []
+
+def test_only_tests_links_count_as_parents():
+    """Tests that Relates/Test<->Test links don't make the other issue a parent; the summary prefix still does."""
+    mirror = TestMirror(":memory:")
+    mirror.upsert_issues([
+        _issue("QA-8", "ST-1 | TC03 | Validate signup", "Given a form", "2024-01-04T10:00:00.000+0000",
+               links=[{"type": RELATES_LINK, "outwardIssue": {"key": "QA-1"}}]),
+        _issue("QA-9", "Validate reset", "Given an email", "2024-01-05T10:00:00.000+0000",
+               links=[{"type": RELATES_LINK, "inwardIssue": {"key": "ST-3"}},
+                      {"type": TESTS_LINK, "outwardIssue": {"key": "ST-2"}}]),
+    ])
+
+    assert [t["key"] for t in mirror.existing_tests_with_details("ST-1")] == ["QA-8"]
+    assert mirror.existing_tests_with_details("QA-1") == []
+    assert mirror.existing_tests_with_details("ST-3") == []
+    assert [t["key"] for t in mirror.existing_tests_with_details("ST-2")] == ["QA-9"]
+    assert mirror.next_tc_index("ST-1", "T") == 4
+
+def test_write_through_keeps_tc_numbering_and_details():
+    """Tests that Tests created by this process are visible to next_tc_index and sync planning."""
+    from core.gherkin import build_feature_single
+    mirror = TestMirror(":memory:")
+    feature = build_feature_single("Login", "S-1", {"title": "Validate that login works", "steps": "Given a user"})
+    mirror.put_test("T-7", "T", "S-1 | TC07 | Validate that login works", feature, parents=["S-1"])
+
+    assert mirror.next_tc_index("S-1", "T") == 8
+    details = mirror.existing_tests_with_details("S-1")
+    assert details[0]["key"] == "T-7" and details[0]["gherkin"] == feature
+
+def test_ensure_synced_disabled_by_default(monkeypatch):
+    from core import mirror as MR
+    monkeypatch.setattr(MR, "MIRROR_ENABLED", False)
+    assert MR.ensure_synced("T") is None
+
+@patch('core.mirror.J.search_jql')
+def test_ensure_synced_resyncs_only_when_stale(mock_search, monkeypatch):
+    from core import mirror as MR
+    mock_search.side_effect = _jira(ISSUES)
+    monkeypatch.setattr(MR, "MIRROR_ENABLED", True)
+    monkeypatch.setattr(MR, "_MIRROR", TestMirror(":memory:"))
+
+    assert MR.ensure_synced("T", max_age=60).next_tc_index("S-1", "T") == 6
+    calls = mock_search.call_count
+    MR.ensure_synced("T", max_age=60)
+    assert mock_search.call_count == calls
+
+@patch('core.jira.search_issues_by_keys')
+@patch('core.mirror.J.search_jql')
+def test_issue_snapshot_reads_tests_from_mirror(mock_search, mock_by_keys):
+    """Tests that with a mirror the snapshot never asks Jira for the linked Tests."""
+    from core import jira as J
+    mock_search.side_effect = _jira(ISSUES)
+    mirror = TestMirror(":memory:")
+    mirror.sync("T")
+
+    snap = J.IssueSnapshot("S-1", "T", mirror=mirror)
+    assert sorted(t["key"] for t in snap.existing_tests_with_details()) == ["T-1", "T-2", "T-3"]
+    assert snap.next_tc_index() == 6
+    mock_by_keys.assert_not_called()
@@ -0,0 +1,48 @@
+# tests/test_near_dupe.py
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from core.near_dupe import NearDuplicateIndex, index_existing_tests, split_near_duplicates
+
+STEPS = "\n".join([
+    "Given the user is on the login page",
+    "When the user enters valid credentials and clicks the login button",
+    "Then the user is redirected to the dashboard",
+    "And a welcome message is displayed",
+])
+REPHRASED = STEPS.replace("a welcome message is displayed", "a welcome message is shown")
+OTHER = "Given the cart has 3 items\nWhen the user removes one item\nThen the cart shows 2 items"
+
+
+def test_index_finds_rephrased_scenario():
+    """Tests that a slightly rephrased scenario is flagged and an unrelated one is not."""
+    index = NearDuplicateIndex(threshold=0.7)
+    index.add("T-1", STEPS)
+    index.add("T-2", OTHER)
+
+    hits = index.query(REPHRASED)
+    assert [h[0]["key"] for h in hits] == ["T-1"]
+    assert index.query("Given something else entirely\nThen nothing matches here") == []
+
+def test_split_near_duplicates_against_existing_and_batch():
+    """Tests that near duplicates of existing tests and within the batch are split out."""
+    index = index_existing_tests([{"key": "T-1", "gherkin": STEPS}], threshold=0.7)
+    scenarios = [
+        {"title": "Validate that login redirects", "steps": REPHRASED},
+        {"title": "Validate that removing items updates the cart", "steps": OTHER},
+        {"title": "Validate that the cart updates after removal", "steps": OTHER},
+    ]
+
+    fresh, dupes = split_near_duplicates(scenarios, index)
+
+    assert [sc["steps"] for sc in fresh] == [OTHER]
+    assert dupes[0]["match"]["key"] == "T-1"
+    assert dupes[1]["match"]["key"] is None
+
+def test_default_bands_catch_pairs_at_the_thresholds_in_use():
+    index = NearDuplicateIndex()
+    assert index.candidate_probability(0.8) > 0.999
+    assert index.candidate_probability(0.7) > 0.98
+    assert round(index.candidate_probability(0.5), 2) == 0.64
@@ -0,0 +1,94 @@
+# tests/test_structured.py
+import sys
+import os
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from core import structured as S
+
+
+def _fake_client(replies, calls):
+    def generate_content(**kw):
+        calls.append(kw)
+        return SimpleNamespace(text=replies.pop(0), usage_metadata=None)
+    return SimpleNamespace(models=SimpleNamespace(generate_content=generate_content))
+
+
+@pytest.fixture(autouse=True)
+def _memory_usage_store(monkeypatch):
+    monkeypatch.setattr(S.U, "_STORE", S.U.UsageStore(":memory:"))
+
+
+def test_salvage_valid_json_with_fences_and_trailing_comma():
+    """Tests that the fast path tolerates fences, trailing commas and raw newlines inside strings."""
+    text = '```json\n{"scenarios": [{"title": "A", "steps": "Given a\nWhen b"},]}\n```'
+    items, broken = S.salvage(text, "scenarios")
+    assert items == [{"title": "A", "steps": "Given a\nWhen b"}]
+    assert broken == []
+
+
+def test_salvage_keeps_good_objects_around_a_broken_one():
+    """Tests that one bad object does not discard its siblings."""
+    text = '{"scenarios": [{"title": "A", "steps": "s"}, {"title": "B" "steps": "s"}, {"title": "C", "steps": "s"}]}'
+    items, broken = S.salvage(text, "scenarios")
+    assert [i["title"] for i in items] == ["A", "C"]
+    assert broken == ['{"title": "B" "steps": "s"}']
+
+
+def test_salvage_truncated_response():
+    """Tests that a cut-off response yields the complete objects plus the unterminated tail."""
+    text = '{"tests_from_docs": [{"title": "A", "steps": "s"}, {"title": "B", "ste'
+    items, broken = S.salvage(text, "tests_from_docs")
+    assert items == [{"title": "A", "steps": "s"}]
+    assert broken == ['{"title": "B", "ste']
+
+
+def test_salvage_without_array_raises():
+    with pytest.raises(ValueError):
+        S.salvage("I cannot help with that.", "scenarios")
+
+
+def test_parse_list_reasks_only_the_broken_fragment():
+    """Tests that only the broken object is sent back to the model, with the item schema."""
+    calls = []
+    client = _fake_client(['{"title": "B", "steps": "s"}'], calls)
+    text = '{"scenarios": [{"title": "A", "steps": "s"}, {"title": "B" "steps": "s"}]}'
+
+    items = S.parse_list(text, "scenarios", client, "T-1")
+
+    assert [i["title"] for i in items] == ["A", "B"]
+    assert len(calls) == 1
+    assert '{"title": "B" "steps": "s"}' in calls[0]["contents"][0]
+    assert calls[0]["config"].response_schema == S.ITEM_SCHEMAS["scenarios"]
+    assert S.U.get_store().summarize(by="operation")[0]["key"] == "repair_fragment"
+
+
+def test_parse_list_puts_repaired_items_back_in_place():
+    """Tests that a repaired object keeps its original position instead of moving to the end."""
+    client = _fake_client(['{"title": "B", "steps": "s"}'], [])
+    text = ('{"scenarios": [{"title": "A", "steps": "s"}, {"title": "B" "steps": "s"}, '
+            '{"title": "C", "steps": "s"}]}')
+
+    assert [i["title"] for i in S.parse_list(text, "scenarios", client)] == ["A", "B", "C"]
+
+
+def test_restore_order_skips_unrepaired_positions():
+    items = [{"t": "A"}, {"t": "D"}]
+    assert S.restore_order(items, [1, 2], [{"t": "B"}, None]) == [{"t": "A"}, {"t": "B"}, {"t": "D"}]
+
+
+def test_parse_list_drops_fragment_when_repair_fails():
+    calls = []
+    client = _fake_client(["not json"], calls)
+    text = '{"final_tests": [{"title": "A", "steps": "s", "status": "Missing_in_UI"}, {"title": "B", '
+    items = S.parse_list(text, "final_tests", client)
+    assert [i["title"] for i in items] == ["A"]
+    assert len(calls) == 1
+
+
+def test_parse_list_without_client_skips_reask():
+    text = '{"scenarios": [{"title": "A", "steps": "s"}, {broken}]}'
+    assert S.parse_list(text, "scenarios") == [{"title": "A", "steps": "s"}]
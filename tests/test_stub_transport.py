@@ -0,0 +1,72 @@
+# tests/test_stub_transport.py
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from core import clickup as C
+from core import clickup_async as CA
+from core import gemini as GM
+from core import jira as J
+from core import llm as L
+from core import mirror as MR
+from core import providers as P
+from core import stub_transport as ST
+
+
+class _Tools:
+    def tool(self):
+        def register(fn):
+            setattr(self, fn.__name__, fn)
+            return fn
+        return register
+
+
+@pytest.fixture
+def offline(monkeypatch):
+    """Stub LLM, no cache/mirror, and the transport globals restored afterwards."""
+    monkeypatch.setenv("LLM_PROVIDER", "stub")
+    monkeypatch.setattr(P, "STUB_ITEMS", 3)
+    monkeypatch.setattr(L.LC, "ENABLED", False)
+    monkeypatch.setattr(L.U, "_STORE", L.U.UsageStore(":memory:"))
+    monkeypatch.setattr(MR, "MIRROR_ENABLED", False)
+    for module, name in ((J, "_SESSION"), (J, "_LINK_TYPE_IDS"), (C, "clickup_request"), (CA, "clickup_request"),
+                         (C, "_CACHED_TEAM_ID"), (C, "_CACHED_TEST_TYPE_ID")):
+        monkeypatch.setattr(module, name, getattr(module, name))
+    GM.reset_client()
+    import jt
+    tools = _Tools()
+    jt.register_tools(tools)
+    yield tools
+    GM.reset_client()
+
+
+def test_jira_pipeline_runs_end_to_end_against_stub(offline):
+    """Tests that fetch -> generate -> create runs offline and the created Tests are linked to the story."""
+    stub = ST.install_jira(ST.StubJira())
+
+    res = offline.jira_generate_tests("BENCH-1", target_project_key="BENCH", max_tests=3, use_cache=False)
+
+    assert res["ok"] and len(res["report"]["created"]) == 3
+    links = stub.issues["BENCH-1"]["fields"]["issuelinks"]
+    assert sorted(l["outwardIssue"]["key"] for l in links) == sorted(res["report"]["created"])
+    assert all(l["type"] == {"id": "10001"} for l in links)  # "Tests", resuelto por /issueLinkType
+
+    again = offline.jira_generate_tests("BENCH-1", target_project_key="BENCH", max_tests=3, use_cache=False)
+    assert again["report"]["created"] == []  # el segundo run ve los Tests del primero
+
+
+def test_clickup_pipeline_runs_end_to_end_against_stub(offline):
+    stub = ST.install_clickup(ST.StubClickUp())
+
+    res = offline.clickup_generate_tests("task1", list_id="list1", max_tests=3, use_cache=False)
+
+    assert res["ok"] and len(res["created_tasks"]) == 3
+    assert all(stub.tasks[k]["name"].startswith("[TEST] Validate that") for k in res["created_tasks"])
+
+
+def test_backend_requires_generate():
+    with pytest.raises(TypeError):
+        P.Backend()
@@ -0,0 +1,91 @@
+# tests/test_usage.py
+import sys
+import os
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from core import usage as U
+
+
+@pytest.fixture
+def store(monkeypatch):
+    s = U.UsageStore(":memory:")
+    monkeypatch.setattr(U, "_STORE", s)
+    monkeypatch.setattr(U, "BACKOFF", 0)
+    return s
+
+
+def _response(prompt=100, out=20):
+    usage = SimpleNamespace(prompt_token_count=prompt, candidates_token_count=out, thoughts_token_count=None,
+                            cached_content_token_count=None, total_token_count=prompt + out)
+    return SimpleNamespace(text="{}", usage_metadata=usage)
+
+
+class _Flaky(Exception):
+    code = 503
+
+
+def test_generate_records_usage_and_retries(store):
+    """Tests that a retried call is recorded once with its attempts, tokens, cost and tags."""
+    calls = []
+
+    def fake_generate(**kw):
+        calls.append(kw)
+        if len(calls) == 1:
+            raise _Flaky("overloaded")
+        return _response()
+
+    client = SimpleNamespace(models=SimpleNamespace(generate_content=fake_generate))
+    with U.tags(rid="r1"):
+        U.generate(client, "generate_scenarios", "PROJ-1", model="gemini-2.5-flash", contents=["hello"])
+
+    (row,) = store.summarize(by="issue_key")
+    assert row["key"] == "PROJ-1"
+    assert row["calls"] == 1 and row["retries"] == 1
+    assert row["prompt_tokens"] == 100 and row["output_tokens"] == 20
+    assert row["cost_usd"] == pytest.approx((100 * 0.30 + 20 * 2.50) / 1e6)
+    assert store.summarize(by="rid")[0]["key"] == "r1"
+
+def test_generate_records_final_error(store):
+    """Tests that non-retryable errors are raised and still logged."""
+    def boom(**kw):
+        raise ValueError("bad request")
+
+    client = SimpleNamespace(models=SimpleNamespace(generate_content=boom))
+    with pytest.raises(ValueError):
+        U.generate(client, "docs_extract", model="m", contents="x")
+    (row,) = store.summarize(by="operation")
+    assert row["errors"] == 1 and row["retries"] == 0
+
+def test_stream_takes_usage_from_last_chunk(store):
+    """Tests that streamed calls are recorded after the stream is consumed."""
+    chunks = [SimpleNamespace(text="a", usage_metadata=None), _response(50, 5)]
+    client = SimpleNamespace(models=SimpleNamespace(generate_content_stream=lambda **kw: iter(chunks)))
+    assert len(list(U.stream(client, "stream_scenarios", "PROJ-2", model="m", contents="x"))) == 2
+    (row,) = store.summarize(by="issue_key")
+    assert row["total_tokens"] == 55
+
+def test_source_tag_keeps_issue_key_empty(store):
+    """Tests that calls tagged with a source (module, file) are grouped apart from issue keys."""
+    client = SimpleNamespace(models=SimpleNamespace(generate_content=lambda **kw: _response()))
+    with U.tags(source="manual.pdf"):
+        U.generate(client, "docs_extract", model="m", contents="x")
+
+    (row,) = store.summarize(by="source")
+    assert row["key"] == "manual.pdf"
+    assert store.summarize(by="issue_key")[0]["key"] is None
+
+def test_store_adds_source_column_to_old_logs(tmp_path):
+    import sqlite3
+    path = str(tmp_path / "usage.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE llm_calls (id INTEGER PRIMARY KEY, ts REAL, rid TEXT, issue_key TEXT)")
+    conn.close()
+
+    U.UsageStore(path)
+
+    conn = sqlite3.connect(path)
+    assert "source" in [r[1] for r in conn.execute("PRAGMA table_info(llm_calls)")]